@@ -7,25 +7,26 @@
 #
 
 # General python imports
+import argparse
 import json
-from time import sleep
+import os
+import math
 import random
+from time import sleep, time, perf_counter, monotonic_ns
+import signal
+from collections import deque
+import subprocess
 import sys
 from enum import Enum
 
 # Project local imports
-from modules.mqtt_interface import MqttInterface
+# MQTT client and pyfiglet are imported on demand in init_runtime() and
+# print_banner(), loguru on the first logger call
 from modules.sensors import SensorDirections, Sensor
+from modules.downsampling import DashboardFeed
 from modules.log_manager import LogManager
 from modules.log_manager import logger
 
-# 3d party imports
-try:
-    from pyfiglet import Figlet
-except ImportError:
-    print("Module pyfiglet not found. Please use pip install -r requirements.txt")
-    sys.exit(1)
-
 
 CONFIG_PATH = 'config/mqtt_conf.json'
 
@@ -39,6 +40,80 @@ LOG_RETENTION = 3
 
 # MQTT service topic
 MQTT_SERVICE_TOPIC = 'simulator/status'
+MQTT_CONTROL_TOPIC = 'simulator/control'
+
+# MQTT outbound queue defaults, overridden by the config file
+MQTT_MAX_QUEUE_DEPTH = 10000
+MQTT_MAX_INFLIGHT = 100
+MQTT_OVERFLOW_POLICY = 'block'
+MQTT_BLOCK_TIMEOUT = 1.0
+MQTT_SPOOL_SEGMENT_SIZE = 16 * 1024 * 1024
+MQTT_SPOOL_REPLAY_RATE = 500
+MQTT_PROTOCOL = 'v311'
+MQTT_TELEMETRY_QOS = 1
+MQTT_HASH_REPLICAS = 128
+
+# Dashboard feed settings
+DASHBOARD_CHART_WINDOW_SIZE = 50
+DASHBOARD_CHART_WINDOW_PERIOD = 5.0
+DASHBOARD_CHART_OUTPUT_SIZE = 5
+DASHBOARD_GAUGE_RATE_HZ = 1
+
+# Thermocouple channels affected by the cold-junction error (all but room_temp)
+THERMOCOUPLE_CHANNELS = [0, 1, 2, 3, 5, 6, 7, 8, 9]
+
+# Noise settings
+NOISE_BLOCK_SIZE = 256
+NOISE_BLOCK_BUDGET = 1 << 22
+THERMAL_NOISE_STREAM = 0
+CALIBRATION_NOISE_STREAM = 1
+VOLTAGE_NOISE_STREAM = 2
+THERMAL_STEADY_STATE_MEAN = [1707.5, 1620.5, 745.5, 25.0, 25.0, 1630.0, 1630.0, 1630.0, 1630.0, 1630.0]
+THERMAL_WHITE_NOISE_SIGMA = [2.5, 3.0, 1.8, 0.3, 0.3, 3.0, 3.0, 3.0, 3.0, 3.0]
+THERMAL_AR1_PHI = 0.9
+THERMAL_AR1_SIGMA = [1.0, 1.2, 0.7, 0.1, 0.1, 1.2, 1.2, 1.2, 1.2, 1.2]
+COLD_JUNCTION_PHI = 0.995
+COLD_JUNCTION_SIGMA = 0.05
+THERMAL_QUANTIZATION_STEP = 1.0
+CALIBRATION_STEP_MIN = 1
+CALIBRATION_STEP_MAX = 10
+CALIBRATION_CACHE_SIZE = 128
+
+# Heater voltage waveform settings
+VOLTAGE_SAMPLE_RATE = 10000
+VOLTAGE_FRAME_SAMPLES = 1000
+MAINS_FREQUENCY = 50.0
+MAINS_VOLTAGE_RMS = 230.0
+MAINS_HARMONICS = [(3, 0.03), (5, 0.015)]
+MAINS_RIPPLE_DEPTH = 0.01
+MAINS_RIPPLE_FREQUENCY = 100.0
+VOLTAGE_NOISE_SIGMA = 0.5
+HEATER_RESISTANCE = 10.0
+SCR_FIRING_ANGLE = 60.0
+
+# Sampling profiler settings
+PROFILER_DIR = 'profiles'
+PROFILER_DURATION = 10.0
+PROFILER_MAX_DURATION = 300.0
+PROFILER_INTERVAL = 0.005
+
+# Device model settings
+THERMAL_PAYLOAD_WIDTH = 6
+DEVICE_BYTES_PER_CHANNEL_BUDGET = 128
+
+# Batched command ingestion
+COMMAND_MAX_PENDING = 1000
+
+# Runtime fleet scaling
+FLEET_MAX_FURNACES = 100000
+FLEET_CONTROL_TIMEOUT = 10.0
+
+# Process timing
+CALIBRATION_TICKS = 400
+CALIBRATION_TICK_PERIOD = 0.1
+STEADY_STATE_TICK_PERIOD = 1.0
+SCHEDULER_RESOLUTION = 0.001
+CONTROL_TICK_PERIOD = 0.05
 
 # Global flags
 calibration_process_start_flag = 0
@@ -47,24 +122,51 @@ manufacturing_process_start_flag = 0
 sensor_mqtt_topic_send_list = {
     'thermal_sensor':'sensors/thremal/send',
     'voltage_sensor':'sensor/voltage/send',
-    'actuator_sensor':'actuator/send'
+    'actuator_sensor':'actuator/send',
+    'thermal_sensor_chart':'sensors/thremal/chart',
+    'thermal_sensor_gauge':'sensors/thremal/gauge'
 }
 
 sensor_mqtt_topic_recv_list = {
     'actuator':'actuator/receive'
 }
 
-# Load config file
-try:
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as config_file:
-        config = json.loads(config_file.read())
-        config_file.close()
-except FileNotFoundError:
-    print(f"Config file {CONFIG_PATH} not found!")
-    sys.exit(1)
-except json.JSONDecodeError:
-    print(f"Config file {CONFIG_PATH} is not valid JSON!")
-    sys.exit(1)
+# Runtime objects, created by init_runtime() and init_fleet()
+mqtt_client = None
+simulator_fleet = None
+simulator_profiler = None
+thermal_payload_encoder = None
+command_ingestor = None
+fleet_controller = None
+tick_scheduler = None
+
+# Calibration seed root and number of distinct calibration seeds of the fleet,
+# set by init_fleet(), see fleet_calibration_seeds()
+fleet_calibration_seed = 0
+fleet_calibration_configs = 1
+
+# Furnace publishing on the plain telemetry topics, the other furnaces
+# publish raw thermal data on the thermal topic suffixed by their id. With
+# MQTT v5 every furnace publishes on the plain topic and is identified by
+# the furnace_id user property, set by init_runtime()
+primary_furnace_id = 0
+furnace_topic_suffix = True
+
+# Profile capture requested by SIGUSR1 or the PROFILING_BEGIN command, started
+# by the tick loop: (requested flag, capture time in seconds or None)
+profiling_requested = False
+profiling_request_duration = None
+
+# Correlated commands waiting for their first telemetry message, and the
+# correlation of the running calibration: (correlation id, command sent, received)
+pending_telemetry_correlations = deque()
+calibration_correlation = None
+
+# Thermal tick job per furnace id, whether a calibration is running and the
+# checkpoint written after it, set by init_tick_scheduler()
+tick_jobs = {}
+calibration_running = False
+simulation_checkpoint_path = None
 
 # Enums
 class ProcessStatus(Enum):
@@ -81,100 +183,403 @@ class ProcessStatus(Enum):
     MANUFACTURING_PROCESS_BEGIN     = 0xB0
     MANUFACTURING_PROCESS_FINISHED  = 0xC0
     MANUFACTURING_PROCESS_ERROR     = 0xF2
+    PROFILING_BEGIN                 = 0xD0
+    PROFILING_FINISHED              = 0xD1
+    COMMAND_BATCH_APPLIED           = 0xE0
+    FLEET_CONTROL_APPLIED           = 0xE1
 
 # Classes
-# logger object configuration
-log_manager_obj = LogManager(
-    log_file_path=LOG_FILE_PATH,
-    log_filter_name=LOG_FILTER_NAME,
-    log_level=LOG_LEVEL,
-    log_rotation_size=LOG_ROTATION_SIZE,
-    log_compression_method=LOG_COMPRESSION_METHOD,
-    log_retention=LOG_RETENTION
-)
-
-mqtt_client = MqttInterface(
-    broker=config['broker'],
-    port=config['port'],
-    username=config['username'],
-    password=config['password'],
-    alias=config['alias'],
-    service_topic=MQTT_SERVICE_TOPIC
-)
-
 pot_temp_sensor = Sensor(
     sensor_label="pot_thermal_couple",
     sensor_number=1,
     sensor_bot_boundry=25,
-    sensor_top_boundry=1700
+    sensor_top_boundry=1700,
+    sensor_type="thermocouple"
 )
 
 alloy_temp_sensor = Sensor(
     sensor_label="alloy_thermal_couple",
     sensor_number=1,
     sensor_bot_boundry=25,
-    sensor_top_boundry=1650
+    sensor_top_boundry=1650,
+    sensor_type="thermocouple"
 )
 
 coolant_temp_sensor = Sensor(
     sensor_label="coolant_thermal_couple",
     sensor_number=1,
     sensor_bot_boundry=25,
-    sensor_top_boundry=750
+    sensor_top_boundry=750,
+    sensor_type="thermocouple"
 )
 
 cold_weld_thermalcouple_sensor = Sensor(
     sensor_label="cold_weld_thermalcouple_sensor",
     sensor_number=1,
     sensor_bot_boundry=15,
-    sensor_top_boundry=25
+    sensor_top_boundry=25,
+    sensor_type="thermocouple"
 )
 
 room_temp_sensor = Sensor(
     sensor_label="room_temp",
     sensor_number=1,
     sensor_bot_boundry=15,
-    sensor_top_boundry=25
+    sensor_top_boundry=25,
+    sensor_type="room_temp_sensor"
 )
 
 ppf_one_sensor = Sensor(
     sensor_label="ppf_one_sensor",
     sensor_number=1,
     sensor_bot_boundry=20,
-    sensor_top_boundry=1623
+    sensor_top_boundry=1623,
+    sensor_type="ppf_sensor"
 )
 
 ppf_two_sensor = Sensor(
     sensor_label="ppf_two_sensor",
     sensor_number=1,
     sensor_bot_boundry=20,
-    sensor_top_boundry=1624
+    sensor_top_boundry=1624,
+    sensor_type="ppf_sensor"
 )
 
 ppf_three_sensor = Sensor(
     sensor_label="ppf_three_sensor",
     sensor_number=1,
     sensor_bot_boundry=20,
-    sensor_top_boundry=1625
+    sensor_top_boundry=1625,
+    sensor_type="ppf_sensor"
 )
 
 ppf_four_sensor = Sensor(
     sensor_label="ppf_four_sensor",
     sensor_number=1,
     sensor_bot_boundry=20,
-    sensor_top_boundry=1626
+    sensor_top_boundry=1626,
+    sensor_type="ppf_sensor"
 )
 
 ppf_five_sensor = Sensor(
     sensor_label="ppf_five_sensor",
     sensor_number=1,
     sensor_bot_boundry=20,
-    sensor_top_boundry=1625
+    sensor_top_boundry=1625,
+    sensor_type="ppf_sensor"
 )
 
+# Thermal sensors, in fleet column order
+THERMAL_SENSORS = [
+    pot_temp_sensor,
+    alloy_temp_sensor,
+    coolant_temp_sensor,
+    cold_weld_thermalcouple_sensor,
+    room_temp_sensor,
+    ppf_one_sensor,
+    ppf_two_sensor,
+    ppf_three_sensor,
+    ppf_four_sensor,
+    ppf_five_sensor
+]
+
+# Decimated dashboard feed per furnace id, created on the first publish
+dashboard_feeds = {}
+
+
+def load_config(config_path: str) -> dict:
+    """
+    Load MQTT config file
+
+    Args:
+        config_path (str): path to config file
+
+    Returns:
+        dict: config
+    """
+
+    with open(config_path, 'r', encoding='utf-8') as config_file:
+        return json.loads(config_file.read())
+
+
+def create_mqtt_interface(config: dict, alias: str, furnace_id: int = None):
+    """
+    Create MQTT client of one broker
+
+    Args:
+        config (dict): MQTT config
+        alias (str): MQTT client alias
+        furnace_id (int): furnace id sent as MQTT v5 user property
+
+    Returns:
+        modules.mqtt_interface.MqttInterface: MQTT client
+    """
+
+    from modules.mqtt_interface import MqttInterface
+
+    return MqttInterface(
+        broker=config['broker'],
+        port=config['port'],
+        username=config['username'],
+        password=config['password'],
+        alias=alias,
+        service_topic=MQTT_SERVICE_TOPIC,
+        max_queue_depth=config.get('max_queue_depth', MQTT_MAX_QUEUE_DEPTH),
+        max_inflight=config.get('max_inflight', MQTT_MAX_INFLIGHT),
+        overflow_policy=config.get('overflow_policy', MQTT_OVERFLOW_POLICY),
+        block_timeout=config.get('block_timeout', MQTT_BLOCK_TIMEOUT),
+        spool_dir=config.get('spool_dir'),
+        spool_segment_size=config.get('spool_segment_size', MQTT_SPOOL_SEGMENT_SIZE),
+        spool_replay_rate=config.get('spool_replay_rate', MQTT_SPOOL_REPLAY_RATE),
+        protocol=config.get('protocol', MQTT_PROTOCOL),
+        furnace_id=furnace_id,
+        telemetry_topics=list(sensor_mqtt_topic_send_list.values()),
+        telemetry_qos=config.get('telemetry_qos', MQTT_TELEMETRY_QOS),
+        message_expiry_interval=config.get('message_expiry_interval'),
+        shared_group=config.get('shared_group')
+    )
+
+
+def create_broker_cluster(config: dict, alias: str, furnace_id: int = None):
+    """
+    Create MQTT clients of every broker of the config "brokers" list, the
+    broker entries override the top-level config keys
+
+    Args:
+        config (dict): MQTT config
+        alias (str): MQTT client alias prefix
+        furnace_id (int): furnace whose broker carries the messages without a furnace
+
+    Returns:
+        modules.broker_cluster.BrokerCluster: sharded MQTT client
+    """
+
+    from modules.broker_cluster import BrokerCluster, broker_name
+
+    def interface_factory(broker_config: dict):
+        broker_config = dict(config, **broker_config)
+        name = broker_name(broker_config)
+        if broker_config.get('spool_dir'):
+            broker_config['spool_dir'] = os.path.join(broker_config['spool_dir'], name.replace(':', '_'))
+
+        return create_mqtt_interface(config=broker_config, alias=f"{alias}@{name}", furnace_id=furnace_id)
+
+    return BrokerCluster(brokers=config['brokers'],
+                         interface_factory=interface_factory,
+                         default_furnace_id=furnace_id or 0,
+                         replicas=MQTT_HASH_REPLICAS)
 
-log_manager_obj.create_logger()
-figlet = Figlet(font='slant')
+
+def init_runtime(config: dict, alias: str, log_file_path: str, furnace_id: int = None) -> None:
+    """
+    Create log sinks and MQTT client, sharded over several brokers if the
+    config has a non-empty "brokers" list
+
+    Args:
+        config (dict): MQTT config
+        alias (str): MQTT client alias, config alias is used if None
+        log_file_path (str): path to log file
+        furnace_id (int): furnace id sent as MQTT v5 user property
+    """
+
+    global mqtt_client
+    global furnace_topic_suffix
+
+    from modules.mqtt_interface import MqttProtocol
+
+    log_manager_obj = LogManager(
+        log_file_path=log_file_path,
+        log_filter_name=LOG_FILTER_NAME,
+        log_level=LOG_LEVEL,
+        log_rotation_size=LOG_ROTATION_SIZE,
+        log_compression_method=LOG_COMPRESSION_METHOD,
+        log_retention=LOG_RETENTION
+    )
+    log_manager_obj.create_logger()
+
+    if config.get('brokers'):
+        mqtt_client = create_broker_cluster(config=config, alias=alias or config['alias'], furnace_id=furnace_id)
+    else:
+        mqtt_client = create_mqtt_interface(config=config, alias=alias or config['alias'], furnace_id=furnace_id)
+
+    furnace_topic_suffix = MqttProtocol(config.get('protocol', MQTT_PROTOCOL)) != MqttProtocol.MQTT_V5
+
+
+def noise_block_size(n_furnaces: int) -> int:
+    """
+    Noise bank block size of a fleet size, within NOISE_BLOCK_BUDGET
+
+    Args:
+        n_furnaces (int): number of furnaces
+
+    Returns:
+        int: number of pre-drawn ticks
+    """
+
+    return min(NOISE_BLOCK_SIZE, max(1, NOISE_BLOCK_BUDGET // (max(1, n_furnaces) * len(THERMAL_SENSORS))))
+
+
+def fleet_calibration_seeds(furnace_ids: list) -> list:
+    """
+    Calibration seeds of furnaces
+
+    Args:
+        furnace_ids (list): furnace ids
+
+    Returns:
+        list: calibration seed per furnace
+    """
+
+    return [fleet_calibration_seed + furnace_id % fleet_calibration_configs for furnace_id in furnace_ids]
+
+
+def init_fleet(seed: int,
+               furnace_ids: list,
+               calibration_configs: int = 1,
+               calibration_cache_dir: str = None,
+               clock=None) -> None:
+    """
+    Create simulated furnace fleet, its noise bank and calibration cache
+
+    Args:
+        seed (int): root noise seed, random entropy if None
+        furnace_ids (list): furnace ids selecting the independent noise streams
+        calibration_configs (int): number of distinct calibration seeds shared by the furnaces
+        calibration_cache_dir (str): calibration curve disk cache directory, memory only if None
+        clock (modules.clock.SimClock): simulation clock, real-time clock if None
+    """
+
+    global simulator_fleet
+    global fleet_calibration_seed
+    global fleet_calibration_configs
+
+    from modules.noise import NoiseBank, WhiteNoise, Ar1Noise, ColdJunctionError, QuantizationNoise
+    from modules.calibration_cache import CalibrationCache
+    from modules.fleet import FurnaceFleet
+
+    n_channels = len(THERMAL_SENSORS)
+
+    thermal_noise_bank = NoiseBank(
+        models=[
+            WhiteNoise(sigma=THERMAL_WHITE_NOISE_SIGMA),
+            Ar1Noise(phi=THERMAL_AR1_PHI, sigma=THERMAL_AR1_SIGMA),
+            ColdJunctionError(channels=THERMOCOUPLE_CHANNELS,
+                              phi=COLD_JUNCTION_PHI,
+                              sigma=COLD_JUNCTION_SIGMA),
+            QuantizationNoise(step=THERMAL_QUANTIZATION_STEP)
+        ],
+        n_channels=n_channels,
+        furnace_ids=furnace_ids,
+        seed=seed,
+        stream=THERMAL_NOISE_STREAM,
+        block_size=noise_block_size(len(furnace_ids))
+    )
+
+    calibration_cache = CalibrationCache(
+        step_min=CALIBRATION_STEP_MIN,
+        step_max=CALIBRATION_STEP_MAX,
+        stream=CALIBRATION_NOISE_STREAM,
+        maxsize=CALIBRATION_CACHE_SIZE,
+        cache_dir=calibration_cache_dir
+    )
+
+    fleet_calibration_seed = seed if seed is not None else random.getrandbits(62)
+    fleet_calibration_configs = calibration_configs
+
+    simulator_fleet = FurnaceFleet(
+        sensors=THERMAL_SENSORS,
+        furnace_ids=furnace_ids,
+        thermal_noise_bank=thermal_noise_bank,
+        calibration_cache=calibration_cache,
+        calibration_seeds=fleet_calibration_seeds(furnace_ids),
+        steady_state_mean=THERMAL_STEADY_STATE_MEAN,
+        calibration_ticks=CALIBRATION_TICKS,
+        publish_period=STEADY_STATE_TICK_PERIOD,
+        clock=clock
+    )
+
+    init_payload_encoder()
+
+
+def init_payload_encoder() -> None:
+    """
+    Create thermal payload encoder for the current fleet size
+    """
+
+    global thermal_payload_encoder
+
+    from modules.device_model import JsonPayloadEncoder
+
+    thermal_payload_encoder = JsonPayloadEncoder(labels=simulator_fleet.sensor_labels,
+                                                 n_rows=len(simulator_fleet.furnace_ids),
+                                                 width=THERMAL_PAYLOAD_WIDTH)
+
+
+def scenario_fleet(seed: int, furnace_ids: list, calibration_configs: int, clock):
+    """
+    Fleet factory of the scenario batch runner
+
+    Args:
+        seed (int): root noise seed
+        furnace_ids (list): furnace ids
+        calibration_configs (int): number of distinct calibration seeds
+        clock (modules.clock.SimClock): accelerated scenario clock
+
+    Returns:
+        modules.fleet.FurnaceFleet: simulated furnace fleet
+    """
+
+    init_fleet(seed=seed, furnace_ids=furnace_ids, calibration_configs=calibration_configs, clock=clock)
+
+    return simulator_fleet
+
+
+def init_voltage_waveform(seed: int, furnace_id: int):
+    """
+    Create heater voltage waveform generator
+
+    Args:
+        seed (int): root noise seed, random entropy if None
+        furnace_id (int): furnace id selecting the noise stream
+
+    Returns:
+        modules.waveform.VoltageWaveform: waveform generator
+    """
+
+    from modules.waveform import VoltageWaveform
+
+    return VoltageWaveform(
+        sample_rate=VOLTAGE_SAMPLE_RATE,
+        frame_samples=VOLTAGE_FRAME_SAMPLES,
+        mains_frequency=MAINS_FREQUENCY,
+        mains_voltage_rms=MAINS_VOLTAGE_RMS,
+        harmonics=MAINS_HARMONICS,
+        ripple_depth=MAINS_RIPPLE_DEPTH,
+        ripple_frequency=MAINS_RIPPLE_FREQUENCY,
+        noise_sigma=VOLTAGE_NOISE_SIGMA,
+        heater_resistance=HEATER_RESISTANCE,
+        firing_angle=SCR_FIRING_ANGLE,
+        furnace_id=furnace_id,
+        seed=seed,
+        stream=VOLTAGE_NOISE_STREAM
+    )
+
+
+def print_banner(text: str) -> None:
+    """
+    Print figlet banner
+
+    Args:
+        text (str): banner text
+    """
+
+    try:
+        from pyfiglet import Figlet
+    except ImportError:
+        print("Module pyfiglet not found. Please use pip install -r requirements.txt")
+        sys.exit(1)
+
+    print(Figlet(font='slant').renderText(text))
 
 
 def temp_sensor_control(sensor: Sensor, direction: int, val: int) -> int:
@@ -251,119 +656,440 @@ def calibrate_temp_sensors(value: int, direction: SensorDirections) -> list:
     return sensor_data_list
 
 
-def temp_sensors_mock() -> None:
+def dashboard_feed(furnace_id: int) -> DashboardFeed:
     """
-    Create sensor mock
+    Decimated dashboard feed of a furnace, created on first use
+
+    Args:
+        furnace_id (int): furnace id
+
+    Returns:
+        DashboardFeed: dashboard feed
     """
 
-    pot_thermal_couple_val = random.randint(1700, 1715)
-    alloy_thermal_couple_val = random.randint(1611, 1630)
-    coolant_thermal_couple_val = random.randint(740, 751)
-    cold_weld_therm_sensor_val = random.randint(24, 26)
-    room_temp_val = random.randint(24, 26)
-    ppf_one_sensor_val = random.randint(1620, 1640)
-    ppf_two_sensor_val = random.randint(1620, 1640)
-    ppf_three_sensor_val = random.randint(1620, 1640)
-    ppf_four_sensor_val = random.randint(1620, 1640)
-    ppf_five_sensor_val = random.randint(1620, 1640)
+    feed = dashboard_feeds.get(furnace_id)
+    if feed is None:
+        feed = DashboardFeed(
+            chart_window_size=DASHBOARD_CHART_WINDOW_SIZE,
+            chart_output_size=DASHBOARD_CHART_OUTPUT_SIZE,
+            gauge_rate_hz=DASHBOARD_GAUGE_RATE_HZ,
+            chart_window_period=DASHBOARD_CHART_WINDOW_PERIOD
+        )
+        dashboard_feeds[furnace_id] = feed
 
-    sensor_data_list = {
-        "pot_thermal_couple":pot_thermal_couple_val,
-        "alloy_thermal_couple":alloy_thermal_couple_val,
-        "coolant_thermal_couple":coolant_thermal_couple_val,
-        "cold_weld_thermalcouple_sensor":cold_weld_therm_sensor_val,
-        "room_temp":room_temp_val,
-        "ppf_one_sensor":ppf_one_sensor_val,
-        "ppf_two_sensor":ppf_two_sensor_val,
-        "ppf_three_sensor":ppf_three_sensor_val,
-        "ppf_four_sensor":ppf_four_sensor_val,
-        "ppf_five_sensor":ppf_five_sensor_val
-    }
+    return feed
+
+
+def sync_dashboard_feeds() -> None:
+    """
+    Drop the dashboard feeds of furnaces that left the fleet
+    """
 
-    data = json.dumps(sensor_data_list)
-    mqtt_client.send_message(topic=sensor_mqtt_topic_send_list['thermal_sensor'],
-                                msg=str(data))
-    sleep(1)
+    for furnace_id in set(dashboard_feeds) - set(simulator_fleet.furnace_ids.tolist()):
+        del dashboard_feeds[furnace_id]
 
 
-def start_calibration_process() -> bool:
+def publish_dashboard_feed(sensor_data_list: dict, furnace_id: int = None) -> None:
+    """
+    Publish decimated chart and gauge feeds of a furnace for the dashboard
+
+    Args:
+        sensor_data_list (dict): raw sensor data
+        furnace_id (int): furnace id, primary furnace if None
     """
-    Emulate furnace callibration process
+
+    if furnace_id is None:
+        furnace_id = primary_furnace_id
+
+    chart_msg, gauge_msg = dashboard_feed(furnace_id).push(timestamp=int(time() * 1000),
+                                                           values=sensor_data_list)
+
+    if chart_msg is not None:
+        mqtt_client.send_message(topic=furnace_topic('thermal_sensor_chart', furnace_id),
+                                 msg=json.dumps(chart_msg),
+                                 furnace_id=furnace_id)
+
+    if gauge_msg is not None:
+        mqtt_client.send_message(topic=furnace_topic('thermal_sensor_gauge', furnace_id),
+                                 msg=json.dumps(gauge_msg),
+                                 furnace_id=furnace_id)
+
+
+def fleet_sensor_data(readings, index: int = 0) -> dict:
+    """
+    Sensor data of one fleet furnace
+
+    Args:
+        readings (numpy.ndarray): fleet readings
+        index (int): furnace index
 
     Returns:
-        bool: calibration status
+        dict: sensor data
     """
 
-    for _ in range(400):
-        sensor_data_list = {}
-        value = random.randint(1, 10)
-        pot_temp_value = temp_sensor_control(sensor=pot_temp_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE.value,
-                                        val=value)
-        value = random.randint(1, 10)
-        alloy_temp_value = temp_sensor_control(sensor=alloy_temp_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE.value,
-                                        val=value)
+    return dict(zip(simulator_fleet.sensor_labels, readings[index].astype(int).tolist()))
 
-        value = random.randint(1, 10)
-        coolant_temp_value = temp_sensor_control(sensor=coolant_temp_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE.value,
-                                        val=value)
 
-        value = random.randint(1, 10)
-        cold_weld_sensor_value = temp_sensor_control(sensor=cold_weld_thermalcouple_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE,
-                                        val=value)
+def read_temp_sensors_mock() -> dict:
+    """
+    Read steady-state sensor mock values
 
-        value = random.randint(1, 10)
-        room_temp_sensor_value = temp_sensor_control(sensor=room_temp_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE,
-                                        val=value)
+    Returns:
+        dict: sensor data
+    """
 
-        value = random.randint(1, 10)
-        ppf_one_value = temp_sensor_control(sensor=ppf_one_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE,
-                                        val=value)
+    return fleet_sensor_data(simulator_fleet.step())
 
-        value = random.randint(1, 10)
-        ppf_two_value = temp_sensor_control(sensor=ppf_two_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE,
-                                        val=value)
 
-        value = random.randint(1, 10)
-        ppf_three_value = temp_sensor_control(sensor=ppf_three_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE.value,
-                                        val=value)
+def furnace_topic(name: str, furnace_id: int) -> str:
+    """
+    Thermal data topic of a furnace, the primary furnace (and with MQTT v5,
+    where the furnace id is a user property, every furnace) publishes on
+    the plain topic
 
-        value = random.randint(1, 10)
-        ppf_four_value = temp_sensor_control(sensor=ppf_four_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE.value,
-                                        val=value)
+    Args:
+        name (str): sensor_mqtt_topic_send_list key
+        furnace_id (int): furnace id
 
-        value = random.randint(1, 10)
-        ppf_five_value = temp_sensor_control(sensor=ppf_five_sensor,
-                                        direction=SensorDirections.SENSOR_VALUE_INCREASE.value,
-                                        val=value)
+    Returns:
+        str: MQTT topic
+    """
 
-        sensor_data_list = {
-            pot_temp_sensor.sensor_label:pot_temp_value,
-            alloy_temp_sensor.sensor_label:alloy_temp_value,
-            coolant_temp_sensor.sensor_label:coolant_temp_value,
-            cold_weld_thermalcouple_sensor.sensor_label:cold_weld_sensor_value,
-            room_temp_sensor.sensor_label:room_temp_sensor_value,
-            ppf_one_sensor.sensor_label:ppf_one_value,
-            ppf_two_sensor.sensor_label:ppf_two_value,
-            ppf_three_sensor.sensor_label:ppf_three_value,
-            ppf_four_sensor.sensor_label:ppf_four_value,
-            ppf_five_sensor.sensor_label:ppf_five_value
-        }
+    if furnace_id == primary_furnace_id or not furnace_topic_suffix:
+        return sensor_mqtt_topic_send_list[name]
+
+    return f"{sensor_mqtt_topic_send_list[name]}/{furnace_id}"
+
+
+def publish_thermal_data(readings, indices=None) -> None:
+    """
+    Publish raw thermal sensor data and the dashboard feeds of the furnaces
+
+    Only the rows of the published furnaces are encoded into the
+    preallocated payload buffer; each message takes one copy of its row
+    because the queued message outlives the next encode().
+
+    Args:
+        readings (numpy.ndarray): fleet readings
+        indices (numpy.ndarray): indices of the published furnaces, all furnaces if None
+    """
+
+    import numpy as np
+    from modules.latency_probe import TELEMETRY_STATUS
+
+    if indices is None:
+        indices = np.arange(len(simulator_fleet.furnace_ids))
+
+    if not len(indices):
+        return
+
+    thermal_payload_encoder.encode(readings, indices)
+    for index, furnace_id in zip(indices.tolist(), simulator_fleet.furnace_ids[indices].tolist()):
+        mqtt_client.send_message(topic=furnace_topic('thermal_sensor', furnace_id),
+                                 msg=bytes(thermal_payload_encoder.payload(index)),
+                                 furnace_id=furnace_id)
+        publish_dashboard_feed(fleet_sensor_data(readings, index), furnace_id)
+
+    while pending_telemetry_correlations:
+        send_status(text=sensor_mqtt_topic_send_list['thermal_sensor'],
+                    status=TELEMETRY_STATUS,
+                    correlation=pending_telemetry_correlations.popleft())
+
+
+def send_status(text: str, status=None, correlation: tuple = None) -> None:
+    """
+    Send status message on the service topic, as JSON with correlation id
+    and monotonic timestamps if it answers a correlated command
+
+    Args:
+        text (str): status text
+        status (int | str): status code of a correlated reply
+        correlation (tuple): (correlation id, command sent, received) or None
+    """
+
+    from modules.latency_probe import correlated_reply
+
+    if correlation is None:
+        mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC, msg=text)
+        return
+
+    correlation_id, command_sent, received = correlation
+    mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC,
+                             msg=correlated_reply(status=status,
+                                                  correlation_id=correlation_id,
+                                                  command_sent=command_sent,
+                                                  received=received,
+                                                  message=text))
+
+
+def apply_command_batches() -> None:
+    """
+    Apply every parsed batched command to the fleet in one update and
+    report the result on the service topic
+    """
+
+    if command_ingestor is None:
+        return
+
+    records = command_ingestor.drain()
+    if records is None:
+        return
+
+    applied = simulator_fleet.apply_commands(records)
+    logger.info(f"Applied {applied} of {len(records)} batched commands")
+    mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC,
+                             msg=str({"status":ProcessStatus.COMMAND_BATCH_APPLIED.value,
+                                      "applied":applied,
+                                      "rejected":len(records) - applied}))
+
+
+def apply_fleet_control() -> None:
+    """
+    Apply queued fleet scaling requests
+    """
+
+    if fleet_controller is not None:
+        fleet_controller.apply()
+
+
+def submit_fleet_control(request: dict) -> None:
+    """
+    Queue a fleet scaling request received over MQTT, the result is
+    published on the service topic once the tick loop applied it
+
+    Args:
+        request (dict): control request
+    """
+
+    def on_applied(future) -> None:
+        mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC,
+                                 msg=json.dumps(dict(future.result(),
+                                                     status=ProcessStatus.FLEET_CONTROL_APPLIED.value)))
+
+    fleet_controller.submit(request).add_done_callback(on_applied)
+
+
+def tick_periods(indices):
+    """
+    Tick period of furnaces, calibrating furnaces tick at the calibration
+    rate and the others at their publish rate
+
+    Args:
+        indices (numpy.ndarray): furnace indices
+
+    Returns:
+        numpy.ndarray: periods in seconds
+    """
+
+    import numpy as np
+    from modules.fleet import FurnaceProcessState
+
+    calibrating = simulator_fleet.process_state[indices] == FurnaceProcessState.FURNACE_CALIBRATION.value
+
+    return np.where(calibrating, CALIBRATION_TICK_PERIOD, simulator_fleet.publish_period[indices])
+
+
+def sync_tick_jobs(reschedule: bool = False) -> None:
+    """
+    Match the thermal jobs of the tick scheduler to the fleet, one job per
+    furnace
+
+    Args:
+        reschedule (bool): restart every job with its current tick period, due on the next scheduler tick
+    """
+
+    import numpy as np
+
+    furnace_ids = simulator_fleet.furnace_ids.tolist()
+    present = set(furnace_ids)
+
+    for furnace_id in list(tick_jobs):
+        if reschedule or furnace_id not in present:
+            tick_scheduler.remove_job(tick_jobs.pop(furnace_id))
+
+    periods = tick_periods(np.arange(len(furnace_ids))).tolist()
+    for furnace_id, period in zip(furnace_ids, periods):
+        if furnace_id not in tick_jobs:
+            tick_jobs[furnace_id] = tick_scheduler.add_job('thermal', period, payload=furnace_id)
+
+
+def on_fleet_resize() -> None:
+    """
+    Resize the payload encoder, the tick jobs and the dashboard feeds after
+    fleet scaling
+    """
+
+    init_payload_encoder()
+    sync_tick_jobs()
+    sync_dashboard_feeds()
+
+
+def tick_thermal(now: float, furnace_ids: list) -> None:
+    """
+    Tick scheduler callback: advance and publish the due furnaces with one
+    vectorized step, idle furnaces are skipped
+
+    Args:
+        now (float): scheduler time in seconds
+        furnace_ids (list): ids of the due furnaces
+    """
+
+    from modules.fleet import FurnaceProcessState
+
+    indices = simulator_fleet.rows(furnace_ids)
+    indices = indices[indices >= 0]
+    indices = indices[simulator_fleet.process_state[indices] != FurnaceProcessState.FURNACE_IDLE.value]
+
+    publish_thermal_data(simulator_fleet.step(indices), indices)
+
+    # Period changes (set_rate, end of calibration) apply from the next tick
+    for furnace_id, period in zip(simulator_fleet.furnace_ids[indices].tolist(), tick_periods(indices).tolist()):
+        tick_scheduler.set_period(tick_jobs[furnace_id], period)
+
+
+def tick_control(now: float, payloads: list) -> None:
+    """
+    Tick scheduler callback: apply fleet scaling requests, batched
+    commands and process commands between two thermal ticks
+
+    Args:
+        now (float): scheduler time in seconds
+        payloads (list): unused
+    """
+
+    global calibration_process_start_flag
+    global calibration_correlation
+    global calibration_running
+
+    from modules.fleet import FurnaceProcessState
+
+    apply_fleet_control()
+    apply_command_batches()
+    start_requested_profiling()
+
+    if calibration_process_start_flag == 1:
+        calibration_process_start_flag = 0
+        calibration_running = True
+        simulator_fleet.start_calibration()
+        sync_tick_jobs(reschedule=True)
+
+    calibrating = simulator_fleet.process_state == FurnaceProcessState.FURNACE_CALIBRATION.value
+    if calibration_running and not calibrating.any():
+        calibration_running = False
+        logger.info("Calibration process finished!")
+        send_status(text=str(ProcessStatus.CALIBRATION_PROCESS_FINISHED.value),
+                    status=ProcessStatus.CALIBRATION_PROCESS_FINISHED.value,
+                    correlation=calibration_correlation)
+        calibration_correlation = None
+        if simulation_checkpoint_path:
+            simulator_fleet.save(simulation_checkpoint_path)
+
+
+def init_tick_scheduler(checkpoint_path: str = None) -> None:
+    """
+    Create the timing wheel driving the simulation: one thermal job per
+    furnace at its own rate and the control job
+
+    Args:
+        checkpoint_path (str): checkpoint written after calibration, None for none
+    """
+
+    global tick_scheduler
+    global tick_jobs
+    global calibration_running
+    global simulation_checkpoint_path
+
+    from modules.fleet import FurnaceProcessState
+    from modules.scheduler import TimingWheelScheduler
+
+    tick_scheduler = TimingWheelScheduler(resolution=SCHEDULER_RESOLUTION, clock=simulator_fleet.clock)
+    tick_scheduler.add_group('thermal', tick_thermal)
+    tick_scheduler.add_group('control', tick_control)
+    tick_scheduler.add_job('control', CONTROL_TICK_PERIOD)
+
+    tick_jobs = {}
+    sync_tick_jobs()
+
+    # A calibration restored from a checkpoint continues
+    calibration_running = bool((simulator_fleet.process_state == FurnaceProcessState.FURNACE_CALIBRATION.value).any())
+    simulation_checkpoint_path = checkpoint_path
+
+
+def init_profiler(output_dir: str, duration: float) -> None:
+    """
+    Create sampling profiler and request a capture on SIGUSR1, the handler
+    only sets a flag since logging and starting threads are not safe there
+
+    Args:
+        output_dir (str): directory of the written profiles
+        duration (float): capture time in seconds
+    """
+
+    global simulator_profiler
+
+    from modules.profiler import SamplingProfiler
 
-        data = json.dumps(sensor_data_list)
-        mqtt_client.send_message(topic=sensor_mqtt_topic_send_list['thermal_sensor'],
-                                msg=str(data))
-        sleep(0.1)
+    simulator_profiler = SamplingProfiler(output_dir=output_dir,
+                                          duration=duration,
+                                          interval=PROFILER_INTERVAL)
 
-    return True
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: request_profiling())
+
+
+def request_profiling(duration: float = None) -> None:
+    """
+    Request a sampling profile capture, started by the tick loop
+
+    Args:
+        duration (float): capture time in seconds, profiler default if None
+    """
+
+    global profiling_requested
+    global profiling_request_duration
+
+    profiling_request_duration = duration
+    profiling_requested = True
+
+
+def start_requested_profiling() -> None:
+    """
+    Start the requested sampling profile capture, called from the tick loop
+    """
+
+    global profiling_requested
+
+    if not profiling_requested:
+        return
+
+    profiling_requested = False
+    start_profiling(duration=profiling_request_duration)
+
+
+def start_profiling(duration: float = None) -> None:
+    """
+    Start a sampling profile capture, the finished capture is reported on
+    the service topic
+
+    Args:
+        duration (float): capture time in seconds, profiler default if None
+    """
+
+    def on_finished(path: str, samples: int) -> None:
+        logger.info(f"Profile written to {path} ({samples} samples)")
+        mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC,
+                                 msg=str({"status":ProcessStatus.PROFILING_FINISHED.value,
+                                          "profile":path,
+                                          "samples":samples}))
+
+    if simulator_profiler is None:
+        return
+
+    path = simulator_profiler.start(duration=duration, on_finished=on_finished)
+    if path is None:
+        logger.info("Profile capture already running")
+    else:
+        logger.info(f"Profiling for {duration or simulator_profiler.duration} s into {path}")
 
 
 def mqtt_callback_func(_, userdata, message) -> None:
@@ -378,63 +1104,822 @@ def mqtt_callback_func(_, userdata, message) -> None:
 
     global calibration_process_start_flag
     global manufacturing_process_start_flag
+    global calibration_correlation
+
+    from modules.mqtt_interface import get_furnace_id
+    from modules.latency_probe import parse_command, command_argument
+    from modules.command_batch import is_command_batch
 
-    recv_message = message.payload.decode()
+    received = monotonic_ns()
+
+    # Batched commands are parsed by the ingestor thread and applied between ticks
+    if command_ingestor is not None and is_command_batch(message.payload):
+        if not command_ingestor.submit(message.payload):
+            logger.warning("Command batch queue full, batch dropped")
+        return
+
+    # MQTT v5 commands may address a single furnace, a command for a furnace
+    # of another shard is forwarded to the per-furnace command topic
+    try:
+        furnace_id = get_furnace_id(message, command_topic=sensor_mqtt_topic_recv_list['actuator'])
+        recv_message = message.payload.decode()
+    except (ValueError, UnicodeDecodeError) as err:
+        logger.error(f"Invalid command on {message.topic}: {err}")
+        return
+
+    if furnace_id is not None and furnace_id not in simulator_fleet.furnace_ids:
+        if mqtt_client.forward_command(message=message, furnace_id=furnace_id):
+            logger.info(f"Command for furnace {furnace_id} forwarded to its shard")
+        return
 
     logger.info(f"Message Recieved from Server: {recv_message}")
     logger.info(f"Userdata: {userdata}")
 
-    if int(recv_message) == ProcessStatus.CALIBRATION_PROCESS_BEGIN.value:
+    try:
+        command, correlation_id, command_sent = parse_command(message.payload)
+    except (ValueError, KeyError, TypeError):
+        logger.error(f"Invalid command: {recv_message}")
+        return
+
+    correlation = None
+    if correlation_id is not None:
+        correlation = (correlation_id, command_sent, received)
+        pending_telemetry_correlations.append(correlation)
+
+    if command == ProcessStatus.CALIBRATION_PROCESS_BEGIN.value:
         logger.info("Calibration Process started")
-        mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC,
-                                 msg="Calibration process started")
+        send_status(text="Calibration process started", status=command, correlation=correlation)
+        calibration_correlation = correlation
         calibration_process_start_flag = 1
 
-    if int(recv_message) == ProcessStatus.MANUFACTURING_PROCESS_BEGIN.value:
+    if command == ProcessStatus.MANUFACTURING_PROCESS_BEGIN.value:
         logger.info("Manufacturing Process started")
-        mqtt_client.send_message(topic=MQTT_SERVICE_TOPIC,
-                                 msg="Manufacturing process started")
+        send_status(text="Manufacturing process started", status=command, correlation=correlation)
         manufacturing_process_start_flag = 1
 
+    if command == ProcessStatus.PROFILING_BEGIN.value:
+        duration = command_argument(message.payload, 'duration')
+        if duration is not None:
+            if isinstance(duration, bool) or not isinstance(duration, (int, float)) \
+                    or not math.isfinite(duration) or duration <= 0:
+                logger.error(f"Invalid profiling duration: {duration}")
+                return
+            if duration > PROFILER_MAX_DURATION:
+                logger.warning(f"Profiling duration {duration} s capped to {PROFILER_MAX_DURATION} s")
+                duration = PROFILER_MAX_DURATION
+        if correlation is not None:
+            send_status(text="Profiling started", status=command, correlation=correlation)
+        request_profiling(duration=duration)
+
+
+def broker_control_ops() -> dict:
+    """
+    Fleet control ops of a sharded MQTT client: add_broker with a broker
+    config entry, remove_broker by name and brokers
 
-def main() -> None:
+    Returns:
+        dict: op name to handler, empty for a single broker
     """
-    Main function
+
+    from modules.broker_cluster import BrokerCluster
+
+    if not isinstance(mqtt_client, BrokerCluster):
+        return {}
+
+    def add_broker(request: dict) -> dict:
+        return mqtt_client.add_broker({key:value for key, value in request.items()
+                                       if key not in ('op', 'correlation_id')})
+
+    def brokers(request: dict) -> dict:
+        return {"brokers":mqtt_client.brokers(), "rebalanced":mqtt_client.rebalanced}
+
+    return {
+        "add_broker":add_broker,
+        "remove_broker":lambda request: mqtt_client.remove_broker(request["name"]),
+        "brokers":brokers
+    }
+
+
+def control_callback_func(_, userdata, message) -> None:
+    """
+    MQTT fleet control callback function
+
+    Args:
+        client (_type_): MQTT client
+        userdata (_type_): MQTT userdata
+        message (_type_): MQTT message
+    """
+
+    try:
+        request = json.loads(message.payload)
+    except ValueError:
+        request = None
+    if not isinstance(request, dict):
+        logger.error(f"Invalid fleet control request: {message.payload[:200]}")
+        return
+
+    submit_fleet_control(request)
+
+
+def run_simulate(args: argparse.Namespace) -> int:
+    """
+    Run furnace simulation
+
+    Args:
+        args (argparse.Namespace): command line arguments
+
+    Returns:
+        int: exit code
     """
 
-    global calibration_process_start_flag
     global manufacturing_process_start_flag
+    global command_ingestor
+    global fleet_controller
+    global primary_furnace_id
+
+    from modules.command_batch import CommandIngestor
+    from modules.fleet_control import FleetController
+    from modules.waveform import WaveformStreamer
+
+    primary_furnace_id = args.furnace_id
+    init_fleet(seed=args.seed,
+               furnace_ids=[args.furnace_id],
+               calibration_cache_dir=args.calibration_cache)
+
+    command_ingestor = CommandIngestor(channel_labels=simulator_fleet.sensor_labels,
+                                       max_pending=COMMAND_MAX_PENDING)
+    command_ingestor.start()
+
+    fleet_controller = FleetController(fleet=simulator_fleet,
+                                       calibration_seeds=fleet_calibration_seeds,
+                                       noise_block_size=noise_block_size,
+                                       on_resize=on_fleet_resize,
+                                       max_furnaces=FLEET_MAX_FURNACES,
+                                       extra_ops=broker_control_ops())
+
+    voltage_streamer = None
+    if args.waveform:
+        voltage_streamer = WaveformStreamer(
+            waveform=init_voltage_waveform(seed=args.seed, furnace_id=args.furnace_id),
+            publish_func=lambda frame: mqtt_client.send_message(msg=frame,
+                                                                topic=sensor_mqtt_topic_send_list['voltage_sensor'])
+        )
 
     try:
-        print(figlet.renderText('Furnace Simulator'))
+        if not args.headless:
+            print_banner('Furnace Simulator')
 
         mqtt_client.init_client(topic=sensor_mqtt_topic_recv_list['actuator'],
                         callback_func=mqtt_callback_func)
+        mqtt_client.subscribe_topic(topic=MQTT_CONTROL_TOPIC, callback_func=control_callback_func)
+
+        if args.restore:
+            simulator_fleet.restore(args.restore)
+            init_payload_encoder()
+        else:
+            simulator_fleet.reset()
+
+        if args.control_socket:
+            fleet_controller.start_socket(path=args.control_socket, timeout=FLEET_CONTROL_TIMEOUT)
+
+        if voltage_streamer is not None:
+            voltage_streamer.start()
+
+        # Every furnace ticks at its own rate on the timing wheel
+        init_tick_scheduler(checkpoint_path=args.checkpoint)
+        tick_scheduler.run()
+
+    except KeyboardInterrupt:
+        if tick_scheduler is not None:
+            logger.info(f"Tick scheduler stats: {tick_scheduler.stats()}")
+        if args.checkpoint:
+            simulator_fleet.save(args.checkpoint)
+        logger.info("Exit through keyboard interrupt")
+        return 0
+
+    except OSError:
+        logger.error("OS error occured")
+        return 1
+
+    # Every started thread is stopped on every exit path
+    finally:
+        if voltage_streamer is not None:
+            voltage_streamer.stop()
+        fleet_controller.stop()
+        command_ingestor.stop()
+        logger.info(f"Command batch stats: {command_ingestor.stats()}")
+        mqtt_client.close()
+
 
-        temp_sensor_reset_all()
+def run_replay(args: argparse.Namespace) -> int:
+    """
+    Republish captured MQTT traffic
+
+    The capture file holds one "<topic> <payload>" message per line, the
+    format written by mosquitto_sub -v.
+
+    Args:
+        args (argparse.Namespace): command line arguments
 
-        calibration_state = False
+    Returns:
+        int: exit code
+    """
 
-        while True:
-            if calibration_process_start_flag == 1:
-                calibration_state = start_calibration_process()
-                calibration_process_start_flag = 0
-                logger.info("Calibration process finished!")
-                mqtt_client.send_message(msg=str(ProcessStatus.CALIBRATION_PROCESS_FINISHED.value),
-                                         topic=MQTT_SERVICE_TOPIC)
+    period = 1.0 / args.rate
 
-            if calibration_state:
-                temp_sensors_mock()
+    try:
+        if not args.headless:
+            print_banner('Furnace Replay')
+
+        mqtt_client.init_client(topic=sensor_mqtt_topic_recv_list['actuator'],
+                        callback_func=mqtt_callback_func)
+
+        with open(args.capture_file, 'r', encoding='utf-8') as capture_file:
+            for line in capture_file:
+                topic, _, payload = line.rstrip('\n').partition(' ')
+                if not topic:
+                    continue
+
+                mqtt_client.send_message(msg=payload, topic=topic)
+                sleep(period)
+
+        logger.info(f"Replay of {args.capture_file} finished")
+        mqtt_client.close()
+        return 0
 
     except KeyboardInterrupt:
         mqtt_client.close()
         logger.info("Exit through keyboard interrupt")
-        sys.exit(0)
+        return 0
 
     except OSError:
         mqtt_client.close()
         logger.error("OS error occured")
-        sys.exit(1)
+        return 1
+
+
+def run_bench_schedule(args: argparse.Namespace) -> None:
+    """
+    Benchmark multi-rate ticking on the timing wheel scheduler: half of
+    the furnaces step their thermal channels at the steady-state rate, the
+    other half at the calibration rate, the voltage waveform runs at its
+    frame rate
+
+    Args:
+        args (argparse.Namespace): command line arguments
+    """
+
+    from modules.clock import SimClock
+    from modules.scheduler import TimingWheelScheduler
+
+    scheduler = TimingWheelScheduler(resolution=SCHEDULER_RESOLUTION, clock=SimClock(accelerated=True))
+    waveform = init_voltage_waveform(seed=args.seed, furnace_id=0)
+
+    def thermal_step(now: float, indices: list) -> None:
+        simulator_fleet.step(indices)
+
+    def voltage_step(now: float, payloads: list) -> None:
+        for _ in payloads:
+            waveform.next_frame(timestamp_ns=int(now * 1e9))
+
+    scheduler.add_group('thermal', thermal_step)
+    scheduler.add_group('voltage', voltage_step)
+
+    for index in range(len(simulator_fleet.furnace_ids)):
+        period = STEADY_STATE_TICK_PERIOD if index % 2 == 0 else CALIBRATION_TICK_PERIOD
+        scheduler.add_job('thermal', period, payload=index)
+    scheduler.add_job('voltage', VOLTAGE_FRAME_SAMPLES / VOLTAGE_SAMPLE_RATE)
+
+    start = perf_counter()
+    scheduler.run(duration=args.schedule)
+    elapsed = perf_counter() - start
+
+    stats = scheduler.stats()
+    print(f"Scheduled {args.schedule:.0f} s in {elapsed:.3f} s: {stats['jobs_run']} jobs in "
+          f"{stats['batches']} batches ({stats['jobs_run'] / elapsed:.0f} jobs/s)")
+
+
+def measure_device_footprint(seed: int, n_furnaces: int, ticks: int = 0) -> dict:
+    """
+    Measure the memory of a simulated fleet, including its noise bank and
+    payload encoder, and of stepping and encoding it; the simulator fleet
+    and payload encoder are restored afterwards
+
+    Args:
+        seed (int): root noise seed
+        n_furnaces (int): number of furnaces
+        ticks (int): number of measured steps after the first one
+
+    Returns:
+        dict: channels, footprint bytes after the first step, noise block
+            bytes within NOISE_BLOCK_BUDGET, bytes retained and peak bytes
+            above the footprint while stepping, step time
+    """
+
+    global simulator_fleet
+    global thermal_payload_encoder
+
+    import tracemalloc
+    import numpy as np
+
+    bench_fleet, bench_payload_encoder = simulator_fleet, thermal_payload_encoder
+
+    tracemalloc.start()
+    try:
+        init_fleet(seed=seed, furnace_ids=list(range(n_furnaces)))
+        simulator_fleet.start_steady_state()
+        indices = np.arange(n_furnaces)
+
+        # The first tick draws the noise blocks
+        thermal_payload_encoder.encode(simulator_fleet.step(indices), indices)
+        footprint = tracemalloc.get_traced_memory()[0]
+        noise_block = simulator_fleet.thermal_noise_bank.block
+        noise_block_bytes = min(noise_block.nbytes, NOISE_BLOCK_BUDGET * noise_block.itemsize)
+
+        tracemalloc.reset_peak()
+        start = perf_counter()
+        for _ in range(ticks):
+            thermal_payload_encoder.encode(simulator_fleet.step(indices), indices)
+        elapsed = perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+
+        return {
+            "channels":simulator_fleet.readings.size,
+            "footprint":footprint,
+            "noise_block":noise_block_bytes,
+            "retained":current - footprint,
+            "peak":peak - footprint,
+            "elapsed":elapsed
+        }
+    finally:
+        tracemalloc.stop()
+        simulator_fleet, thermal_payload_encoder = bench_fleet, bench_payload_encoder
+
+
+def device_bytes_per_channel(seed: int, n_furnaces: int) -> float:
+    """
+    Memory per channel of a simulated fleet, the slope of the footprint
+    between n_furnaces and a fleet half that size, so the fixed allocations
+    (calibration curves, labels, module state) do not count. The pre-drawn
+    noise block is sized to NOISE_BLOCK_BUDGET whatever the fleet size and
+    is left out as well, and both fleets have at least FLEET_TICK_CHUNK
+    furnaces so that the chunked scratch buffers are full-size
+
+    Args:
+        seed (int): root noise seed
+        n_furnaces (int): number of furnaces of the larger fleet
+
+    Returns:
+        float: bytes per channel
+    """
+
+    from modules.fleet import FLEET_TICK_CHUNK
+
+    small = max(n_furnaces // 2, FLEET_TICK_CHUNK)
+    large = max(n_furnaces, 2 * small)
+
+    # Caches filled by the first fleet would only count for one of the sizes
+    measure_device_footprint(seed=seed, n_furnaces=small)
+    small_footprint = measure_device_footprint(seed=seed, n_furnaces=small)
+    large_footprint = measure_device_footprint(seed=seed, n_furnaces=large)
+
+    state_bytes = [footprint["footprint"] - footprint["noise_block"] for footprint in (small_footprint, large_footprint)]
+
+    return (state_bytes[1] - state_bytes[0]) / (large_footprint["channels"] - small_footprint["channels"])
+
+
+def run_bench_footprint(args: argparse.Namespace) -> bool:
+    """
+    Check the memory per channel of a simulated fleet of the requested
+    number of channels, including its noise bank and payload encoder, and
+    that stepping and encoding it allocates no channel-sized memory per tick
+
+    Args:
+        args (argparse.Namespace): command line arguments
+
+    Returns:
+        bool: True if the memory per channel is within DEVICE_BYTES_PER_CHANNEL_BUDGET
+    """
+
+    n_furnaces = max(1, args.footprint // len(THERMAL_SENSORS))
+
+    bytes_per_channel = device_bytes_per_channel(seed=args.seed, n_furnaces=n_furnaces)
+    footprint = measure_device_footprint(seed=args.seed, n_furnaces=n_furnaces, ticks=args.ticks)
+    n_channels = footprint["channels"]
+
+    within_budget = bytes_per_channel <= DEVICE_BYTES_PER_CHANNEL_BUDGET
+    print(f"{n_furnaces} furnaces, {n_channels} channels: {footprint['footprint']} bytes "
+          f"({footprint['noise_block']} bytes noise block), "
+          f"{bytes_per_channel:.1f} bytes per channel "
+          f"(budget {DEVICE_BYTES_PER_CHANNEL_BUDGET}, {'ok' if within_budget else 'EXCEEDED'})")
+    print(f"Stepped and encoded {n_furnaces} furnaces {args.ticks} times in {footprint['elapsed']:.3f} s, "
+          f"{footprint['retained']} bytes retained, peak {footprint['peak'] / n_channels:.1f} bytes "
+          f"per channel above the footprint")
+
+    return within_budget
+
+
+def run_bench_commands(args: argparse.Namespace) -> None:
+    """
+    Benchmark batched command parsing and applying
+
+    Args:
+        args (argparse.Namespace): command line arguments
+    """
+
+    import numpy as np
+    from modules.command_batch import COMMAND_TARGET_SETPOINT, pack_command_frame, parse_command_batch
+
+    furnace_ids = simulator_fleet.furnace_ids[np.arange(args.commands) % len(simulator_fleet.furnace_ids)]
+    channels = np.arange(args.commands) % len(THERMAL_SENSORS)
+    setpoints = simulator_fleet.steady_state_mean[channels] - 10.0
+
+    frame = pack_command_frame(furnace_ids, COMMAND_TARGET_SETPOINT, channels, setpoints)
+    batch = json.dumps([{"furnace_id":furnace_id, "channel":channel, "setpoint":setpoint}
+                        for furnace_id, channel, setpoint in zip(furnace_ids.tolist(), channels.tolist(),
+                                                                 setpoints.tolist())]).encode()
+
+    for name, payload in (('binary', frame), ('JSON', batch)):
+        start = perf_counter()
+        records = parse_command_batch(payload, simulator_fleet.sensor_labels)
+        parsed = perf_counter()
+        applied = simulator_fleet.apply_commands(records)
+        elapsed = perf_counter() - start
+        print(f"{applied} {name} commands ({len(payload)} bytes) in {elapsed * 1000:.1f} ms "
+              f"(parse {(parsed - start) * 1000:.1f} ms, {applied / elapsed:.0f} commands/s)")
+
+
+def run_bench_sharding(args: argparse.Namespace) -> None:
+    """
+    Benchmark consistent-hash furnace sharding: balance over the brokers
+    and furnaces moved when a broker is added
+
+    Args:
+        args (argparse.Namespace): command line arguments
+    """
+
+    from collections import Counter
+    from modules.broker_cluster import ConsistentHashRing
+
+    ring = ConsistentHashRing(nodes=[f"broker-{index}:1883" for index in range(args.brokers)],
+                              replicas=MQTT_HASH_REPLICAS)
+    furnace_ids = range(args.furnaces)
+
+    start = perf_counter()
+    assignment = [ring.node_for(furnace_id) for furnace_id in furnace_ids]
+    elapsed = perf_counter() - start
+
+    shares = Counter(assignment)
+    mean = args.furnaces / args.brokers
+    print(f"{args.furnaces} furnaces on {args.brokers} brokers in {elapsed * 1000:.1f} ms: "
+          f"{min(shares.values())}..{max(shares.values())} per broker "
+          f"(max {max(shares.values()) / mean:.2f}x mean)")
+
+    ring.add(f"broker-{args.brokers}:1883")
+    moved = sum(1 for furnace_id, node in zip(furnace_ids, assignment) if ring.node_for(furnace_id) != node)
+    print(f"Adding a broker moved {moved} furnaces ({moved / args.furnaces:.1%}, "
+          f"ideal {1 / (args.brokers + 1):.1%})")
+
+
+def run_bench(args: argparse.Namespace) -> int:
+    """
+    Benchmark telemetry generation without a broker
+
+    Args:
+        args (argparse.Namespace): command line arguments
+
+    Returns:
+        int: exit code
+    """
+
+    init_fleet(seed=args.seed,
+               furnace_ids=list(range(args.furnaces)),
+               calibration_configs=args.calibration_configs,
+               calibration_cache_dir=args.calibration_cache)
+
+    if args.restore:
+        start = perf_counter()
+        simulator_fleet.restore(args.restore)
+        print(f"Restored {len(simulator_fleet.furnace_ids)} furnaces in {(perf_counter() - start) * 1000:.1f} ms")
+    elif args.calibrate:
+        start = perf_counter()
+        simulator_fleet.start_calibration()
+        for _ in range(CALIBRATION_TICKS):
+            simulator_fleet.step()
+        cache = simulator_fleet.calibration_cache
+        print(f"Calibrated {len(simulator_fleet.furnace_ids)} furnaces in {perf_counter() - start:.3f} s "
+              f"(calibration cache hits: {cache.hits}, misses: {cache.misses})")
+    else:
+        simulator_fleet.start_steady_state()
+
+    start = perf_counter()
+    for _ in range(args.ticks):
+        sensor_data_list = read_temp_sensors_mock()
+        json.dumps(sensor_data_list)
+        dashboard_feed(primary_furnace_id).push(timestamp=int(time() * 1000), values=sensor_data_list)
+    elapsed = perf_counter() - start
+
+    samples = args.ticks * simulator_fleet.readings.size
+    print(f"{args.ticks} ticks in {elapsed:.3f} s ({args.ticks / elapsed:.0f} ticks/s, "
+          f"{samples / elapsed:.0f} samples/s)")
+
+    if args.schedule:
+        run_bench_schedule(args)
+
+    if args.footprint and not run_bench_footprint(args):
+        return 1
+
+    if args.commands:
+        run_bench_commands(args)
+
+    if args.brokers:
+        run_bench_sharding(args)
+
+    if args.waveform_frames:
+        waveform = init_voltage_waveform(seed=args.seed, furnace_id=0)
+        start = perf_counter()
+        for _ in range(args.waveform_frames):
+            bytes(waveform.next_frame(timestamp_ns=0))
+        elapsed = perf_counter() - start
+        print(f"{args.waveform_frames} waveform frames in {elapsed:.3f} s "
+              f"({args.waveform_frames * VOLTAGE_FRAME_SAMPLES / elapsed:.0f} samples/s per channel)")
+
+    if args.checkpoint:
+        simulator_fleet.save(args.checkpoint)
+
+    return 0
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Run a directory of scenarios in parallel without a broker
+
+    Args:
+        args (argparse.Namespace): command line arguments
+
+    Returns:
+        int: exit code, 1 if a scenario failed
+    """
+
+    from modules.scenario import run_batch as run_scenario_batch
+
+    report = run_scenario_batch(scenario_dir=args.scenario_dir,
+                                fleet_factory=scenario_fleet,
+                                workers=args.workers)
+
+    with open(args.report, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
+
+    for summary in report["scenarios"]:
+        status = "PASS" if summary["passed"] else "FAIL"
+        detail = summary.get("error") or f"{summary['throughput']['ticks_per_s']} ticks/s"
+        print(f"{status} {summary['name']} ({detail})")
+    print(f"{report['passed']}/{report['total']} scenarios passed in {report['wall_time']:.3f} s, "
+          f"report: {args.report}")
+
+    return 0 if report["failed"] == 0 else 1
+
+
+def run_probe(args: argparse.Namespace, config: dict) -> int:
+    """
+    Measure command round-trip latency of a running simulator, on the
+    broker of --furnace-id if the config has a "brokers" list
+
+    Args:
+        args (argparse.Namespace): command line arguments
+        config (dict): MQTT config
+
+    Returns:
+        int: exit code, 1 if replies are missing
+    """
+
+    from modules.latency_probe import LatencyProbe
+
+    if config.get('brokers'):
+        from modules.broker_cluster import ConsistentHashRing, broker_name
+
+        # Status replies and telemetry of the furnace are on the broker it is sharded to
+        brokers = {broker_name(dict(config, **entry)):dict(config, **entry) for entry in config['brokers']}
+        ring = ConsistentHashRing(nodes=list(brokers), replicas=MQTT_HASH_REPLICAS)
+        config = brokers[ring.node_for(args.furnace_id)]
+
+    probe = LatencyProbe(broker=config['broker'],
+                         port=config['port'],
+                         username=config['username'],
+                         password=config['password'],
+                         alias=args.alias or f"{config['alias']}-probe",
+                         command_topic=sensor_mqtt_topic_recv_list['actuator'],
+                         status_topic=MQTT_SERVICE_TOPIC)
+
+    report = probe.run(command=args.command_code, rate=args.rate, count=args.count, timeout=args.timeout)
+
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    return 0 if report["missing_acks"] == 0 and report["missing_telemetry"] == 0 else 1
+
+
+def run_fleet(args: argparse.Namespace, config: dict) -> int:
+    """
+    Run several headless simulator processes
+
+    Args:
+        args (argparse.Namespace): command line arguments
+        config (dict): MQTT config
+
+    Returns:
+        int: exit code
+    """
+
+    alias = args.alias or config['alias']
+    processes = []
+
+    for index in range(args.count):
+        process_alias = f"{alias}-{index}"
+        command = [sys.executable, __file__, 'simulate',
+                   '--headless',
+                   '--config', args.config,
+                   '--alias', process_alias,
+                   '--log-file', f"logs/{process_alias}.log",
+                   '--furnace-id', str(args.furnace_id + index)]
+        if args.seed is not None:
+            command += ['--seed', str(args.seed)]
+
+        processes.append(subprocess.Popen(command))
+
+    try:
+        return max(process.wait() for process in processes)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.wait()
+        return 0
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """
+    Parse command line arguments
+
+    Args:
+        argv (list): command line arguments without the program name
+
+    Returns:
+        argparse.Namespace: parsed arguments
+    """
+
+    runtime_parser = argparse.ArgumentParser(add_help=False)
+    runtime_parser.add_argument('--config', default=CONFIG_PATH,
+                                help='path to MQTT config file')
+    runtime_parser.add_argument('--alias', default=None,
+                                help='MQTT client alias (defaults to config alias)')
+    runtime_parser.add_argument('--headless', action='store_true',
+                                help='skip the banner')
+    runtime_parser.add_argument('--log-file', default=LOG_FILE_PATH,
+                                help='path to log file')
+    runtime_parser.add_argument('--seed', type=int, default=None,
+                                help='noise seed for reproducible runs')
+    runtime_parser.add_argument('--furnace-id', type=int, default=0,
+                                help='furnace id selecting the noise streams')
+    runtime_parser.add_argument('--checkpoint', default=None,
+                                help='save simulator state to this file after calibration and on exit')
+    runtime_parser.add_argument('--restore', default=None,
+                                help='warm-start from a checkpoint file instead of resetting')
+    runtime_parser.add_argument('--calibration-cache', default=None,
+                                help='calibration curve disk cache directory')
+    runtime_parser.add_argument('--profile-dir', default=PROFILER_DIR,
+                                help='directory of sampling profiles (SIGUSR1 or PROFILING_BEGIN command)')
+    runtime_parser.add_argument('--profile-duration', type=float, default=PROFILER_DURATION,
+                                help='sampling profile capture time in seconds')
+
+    parser = argparse.ArgumentParser(description='Furnace simulator')
+    subparsers = parser.add_subparsers(dest='command')
+
+    simulate_parser = subparsers.add_parser('simulate', parents=[runtime_parser],
+                                            help='run furnace simulation (default)')
+    simulate_parser.add_argument('--waveform', action='store_true',
+                                 help='stream heater voltage waveform frames on the voltage topic')
+    simulate_parser.add_argument('--control-socket', default=None,
+                                 help='serve fleet scaling requests on this unix socket')
+
+    replay_parser = subparsers.add_parser('replay', parents=[runtime_parser],
+                                          help='republish captured MQTT traffic')
+    replay_parser.add_argument('capture_file',
+                               help='file with "<topic> <payload>" lines (mosquitto_sub -v)')
+    replay_parser.add_argument('--rate', type=float, default=10.0,
+                               help='messages per second')
+
+    bench_parser = subparsers.add_parser('bench',
+                                         help='benchmark telemetry generation without a broker')
+    bench_parser.add_argument('--ticks', type=int, default=10000,
+                              help='number of generated ticks')
+    bench_parser.add_argument('--seed', type=int, default=None,
+                              help='noise seed for reproducible runs')
+    bench_parser.add_argument('--furnaces', type=int, default=1,
+                              help='number of simulated furnaces')
+    bench_parser.add_argument('--checkpoint', default=None,
+                              help='save fleet state to this file after the benchmark')
+    bench_parser.add_argument('--restore', default=None,
+                              help='warm-start the fleet from a checkpoint file')
+    bench_parser.add_argument('--calibrate', action='store_true',
+                              help='run the calibration of the whole fleet before the benchmark')
+    bench_parser.add_argument('--calibration-configs', type=int, default=1,
+                              help='number of distinct calibration configs shared by the furnaces')
+    bench_parser.add_argument('--brokers', type=int, default=0,
+                              help='shard the furnaces over this many brokers by consistent hashing')
+    bench_parser.add_argument('--commands', type=int, default=0,
+                              help='parse and apply a setpoint batch of this many commands')
+    bench_parser.add_argument('--footprint', type=int, default=0,
+                              help='check bytes per channel of a fleet with this many channels')
+    bench_parser.add_argument('--schedule', type=float, default=0.0,
+                              help='also run this many simulated seconds of multi-rate ticking on the scheduler')
+    bench_parser.add_argument('--waveform-frames', type=int, default=0,
+                              help='also generate this many voltage waveform frames')
+    bench_parser.add_argument('--calibration-cache', default=None,
+                              help='calibration curve disk cache directory')
+
+    batch_parser = subparsers.add_parser('batch',
+                                         help='run scenario files in parallel without a broker')
+    batch_parser.add_argument('scenario_dir',
+                              help='directory of scenario JSON files')
+    batch_parser.add_argument('--workers', type=int, default=None,
+                              help='number of worker processes (defaults to CPU count)')
+    batch_parser.add_argument('--report', default='scenario_report.json',
+                              help='JSON report file')
+
+    probe_parser = subparsers.add_parser('probe',
+                                         help='measure command to ack and command to telemetry latency')
+    probe_parser.add_argument('--config', default=CONFIG_PATH,
+                              help='path to MQTT config file')
+    probe_parser.add_argument('--alias', default=None,
+                              help='MQTT client alias (defaults to config alias + "-probe")')
+    probe_parser.add_argument('--furnace-id', type=int, default=0,
+                              help='furnace id of the probed simulator, selects its broker of the "brokers" list')
+    probe_parser.add_argument('--rate', type=float, default=2.0,
+                              help='commands per second')
+    probe_parser.add_argument('--count', type=int, default=20,
+                              help='number of commands')
+    probe_parser.add_argument('--command', dest='command_code', type=lambda value: int(value, 0),
+                              default=ProcessStatus.MANUFACTURING_PROCESS_BEGIN.value,
+                              help='command code (default MANUFACTURING_PROCESS_BEGIN)')
+    probe_parser.add_argument('--timeout', type=float, default=5.0,
+                              help='seconds to wait for outstanding replies')
+    probe_parser.add_argument('--report', default=None,
+                              help='also write the JSON report to this file')
+
+    fleet_parser = subparsers.add_parser('fleet', parents=[runtime_parser],
+                                         help='run several headless simulator processes')
+    fleet_parser.add_argument('--count', type=int, default=2,
+                              help='number of simulator processes')
+
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ['simulate'] + argv
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+    """
+    Main function
+
+    Args:
+        argv (list): command line arguments without the program name
+
+    Returns:
+        int: exit code
+    """
+
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == 'bench':
+        return run_bench(args)
+
+    if args.command == 'batch':
+        return run_batch(args)
+
+    try:
+        config = load_config(args.config)
+    except FileNotFoundError:
+        print(f"Config file {args.config} not found!")
+        return 1
+    except json.JSONDecodeError:
+        print(f"Config file {args.config} is not valid JSON!")
+        return 1
+
+    if args.command == 'fleet':
+        return run_fleet(args, config)
+
+    if args.command == 'probe':
+        return run_probe(args, config)
+
+    init_runtime(config=config, alias=args.alias, log_file_path=args.log_file, furnace_id=args.furnace_id)
+    init_profiler(output_dir=args.profile_dir, duration=args.profile_duration)
+
+    if args.command == 'replay':
+        return run_replay(args)
+
+    return run_simulate(args)
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
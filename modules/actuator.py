@@ -1,14 +1,20 @@
+import sys
+
+
 class Actuator:
     """
     Actuator class
     """
 
+    __slots__ = ('actuator_label', 'actuator_bot_speed', 'actuator_top_speed',
+                 'actuator_max_position', 'actuator_min_position', 'actuator_position')
+
     def __init__(self,
                  actuator_label: str,
                  actuator_bot_speed: int,
                  actuator_top_speed: int) -> None:
 
-        self.actuator_label = actuator_label
+        self.actuator_label = sys.intern(actuator_label)
         self.actuator_bot_speed = actuator_bot_speed
         self.actuator_top_speed = actuator_top_speed
         self.actuator_max_position = 150
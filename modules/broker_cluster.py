@@ -0,0 +1,376 @@
+import hashlib
+from bisect import bisect_right
+
+from modules.log_manager import logger
+
+
+def _hash64(key: str) -> int:
+    """
+    Stable 64-bit hash, the same in every process
+
+    Args:
+        key (str): key
+
+    Returns:
+        int: hash
+    """
+
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def broker_name(broker_config: dict) -> str:
+    """
+    Ring node name of a broker
+
+    Args:
+        broker_config (dict): broker entry of the MQTT config
+
+    Returns:
+        str: config name, "host:port" if the entry has none
+    """
+
+    return broker_config.get('name') or f"{broker_config['broker']}:{broker_config['port']}"
+
+
+class ConsistentHashRing:
+    """
+    Consistent hash ring with virtual nodes
+
+    Every node owns replicas points on a 64-bit ring and a key belongs to
+    the node of the first point after the key hash, so adding or removing
+    a node only moves the keys of the arcs that node gains or loses.
+    Hashes are stable, so every simulator process computes the same
+    assignment.
+    """
+
+    def __init__(self, nodes: list = None, replicas: int = 128) -> None:
+        """ConsistentHashRing class constructor
+
+        Args:
+            nodes (list): node names
+            replicas (int): virtual nodes per node
+        """
+
+        self.replicas = replicas
+
+        self.__points = []
+        self.__owners = []
+        for node in nodes or []:
+            self.add(node)
+
+
+    # Public methods
+    def add(self, node: str) -> None:
+        """
+        Add node
+
+        Args:
+            node (str): node name
+        """
+
+        if node in self.nodes():
+            return
+
+        ring = list(zip(self.__points, self.__owners))
+        ring += [(_hash64(f"{node}#{replica}"), node) for replica in range(self.replicas)]
+        ring.sort()
+        self.__points = [point for point, _ in ring]
+        self.__owners = [owner for _, owner in ring]
+
+
+    def remove(self, node: str) -> None:
+        """
+        Remove node
+
+        Args:
+            node (str): node name
+        """
+
+        ring = [(point, owner) for point, owner in zip(self.__points, self.__owners) if owner != node]
+        self.__points = [point for point, _ in ring]
+        self.__owners = [owner for _, owner in ring]
+
+
+    def nodes(self) -> list:
+        """
+        Node names
+
+        Returns:
+            list: sorted node names
+        """
+
+        return sorted(set(self.__owners))
+
+
+    def node_for(self, key) -> str:
+        """
+        Node of a key
+
+        Args:
+            key (any): key, hashed by its string form
+
+        Returns:
+            str: node name, None for an empty ring
+        """
+
+        if not self.__points:
+            return None
+
+        index = bisect_right(self.__points, _hash64(str(key)))
+
+        return self.__owners[index % len(self.__points)]
+
+
+class BrokerCluster:
+    """
+    Furnaces sharded over several broker connections
+
+    Every broker gets its own MqttInterface, with its own paho network
+    thread, outbound queue and publisher thread. Furnaces are assigned to
+    brokers by consistent hashing on the furnace id; messages without a
+    furnace (status, dashboard feeds, waveform) go to the broker of the
+    default furnace. Inbound topics (commands, fleet control) are only
+    subscribed on the primary broker, so every command is handled once; the
+    primary is the first broker and the next one takes over its
+    subscriptions when it is removed.
+    """
+
+    def __init__(self,
+                 brokers: list,
+                 interface_factory,
+                 default_furnace_id: int = 0,
+                 replicas: int = 128) -> None:
+        """BrokerCluster class constructor
+
+        Args:
+            brokers (list): broker entries of the MQTT config
+            interface_factory (callable): interface_factory(broker_config) -> modules.mqtt_interface.MqttInterface
+            default_furnace_id (int): furnace whose broker carries the messages without a furnace
+            replicas (int): virtual nodes per broker
+        """
+
+        if not brokers:
+            raise ValueError("Broker cluster needs at least one broker")
+
+        self.interface_factory = interface_factory
+        self.default_furnace_id = default_furnace_id
+        self.ring = ConsistentHashRing(replicas=replicas)
+        self.rebalanced = 0
+
+        self.__interfaces = {}
+        self.__shards = {}
+        self.__subscriptions = []
+        for broker_config in brokers:
+            name = broker_name(broker_config)
+            self.__interfaces[name] = interface_factory(broker_config)
+            self.ring.add(name)
+        self.primary = next(iter(self.__interfaces))
+
+
+    # Private methods
+    def __interface(self, furnace_id: int):
+        """
+        Connection of a furnace, cached until the next rebalance
+
+        Args:
+            furnace_id (int): furnace id, default furnace if None
+
+        Returns:
+            modules.mqtt_interface.MqttInterface: broker connection
+        """
+
+        if furnace_id is None:
+            furnace_id = self.default_furnace_id
+
+        interface = self.__shards.get(furnace_id)
+        if interface is None:
+            interface = self.__interfaces[self.ring.node_for(furnace_id)]
+            self.__shards[furnace_id] = interface
+
+        return interface
+
+
+    def __rebalance(self) -> int:
+        """
+        Drop the shard cache after a ring change
+
+        Returns:
+            int: number of known furnaces that moved to another broker
+        """
+
+        shards = self.__shards
+        self.__shards = {}
+        moved = sum(1 for furnace_id, interface in shards.items() if self.__interface(furnace_id) is not interface)
+        self.rebalanced += moved
+
+        return moved
+
+
+    # Public methods
+    def init_client(self, topic: str, callback_func) -> None:
+        """
+        Connect every broker and subscribe the command topic on the primary
+
+        Args:
+            topic (str): MQTT topic
+            callback_func (_type_): MQTT callback function
+        """
+
+        self.__subscriptions.append((topic, callback_func))
+        for name, interface in self.__interfaces.items():
+            if name == self.primary:
+                interface.init_client(topic=topic, callback_func=callback_func)
+            else:
+                interface.init_client(topic=None, callback_func=None)
+
+
+    def subscribe_topic(self, topic: str, callback_func) -> None:
+        """
+        Subscribe to a further topic on the primary broker
+
+        Args:
+            topic (str): MQTT topic
+            callback_func (_type_): MQTT callback function
+        """
+
+        self.__subscriptions.append((topic, callback_func))
+        self.__interfaces[self.primary].subscribe_topic(topic=topic, callback_func=callback_func)
+
+
+    def send_message(self, msg: str, topic: str, furnace_id: int = None) -> bool:
+        """
+        Send MQTT message on the broker of a furnace
+
+        Args:
+            msg (str): message
+            topic (str): MQTT topic
+            furnace_id (int): furnace id, default furnace if None
+
+        Returns:
+            bool: False if the message was dropped by the overflow policy
+        """
+
+        return self.__interface(furnace_id).send_message(msg=msg, topic=topic, furnace_id=furnace_id)
+
+
+    def forward_command(self, message, furnace_id: int) -> bool:
+        """
+        Forward a command of the shared command subscription on the primary
+        broker, see MqttInterface.forward_command
+
+        Args:
+            message (paho.mqtt.client.MQTTMessage): received command
+            furnace_id (int): addressed furnace id
+
+        Returns:
+            bool: True if the command was forwarded
+        """
+
+        return self.__interfaces[self.primary].forward_command(message=message, furnace_id=furnace_id)
+
+
+    def add_broker(self, broker_config: dict) -> dict:
+        """
+        Connect a broker and move its share of the furnaces to it, the
+        cluster is left unchanged if the broker cannot be connected
+
+        Args:
+            broker_config (dict): broker entry of the MQTT config
+
+        Returns:
+            dict: broker name and number of moved furnaces
+        """
+
+        name = broker_name(broker_config)
+        if name in self.__interfaces:
+            raise ValueError(f"Broker {name} is already connected")
+
+        interface = self.interface_factory(broker_config)
+        if self.__subscriptions:
+            try:
+                interface.init_client(topic=None, callback_func=None)
+            except OSError as err:
+                interface.close()
+                raise ValueError(f"Cannot connect broker {name}: {err!r}") from err
+
+        self.__interfaces = dict(self.__interfaces, **{name:interface})
+        self.ring.add(name)
+        moved = self.__rebalance()
+        logger.info(f"Broker {name} added, {moved} furnaces moved")
+
+        return {"broker":name, "moved":moved}
+
+
+    def remove_broker(self, name: str) -> dict:
+        """
+        Move the furnaces of a broker to the others and disconnect it
+
+        Args:
+            name (str): broker name
+
+        Returns:
+            dict: broker name and number of moved furnaces
+        """
+
+        if name not in self.__interfaces:
+            raise ValueError(f"Unknown broker: {name}")
+        if len(self.__interfaces) == 1:
+            raise ValueError("Cannot remove the last broker")
+
+        interface = self.__interfaces[name]
+        self.ring.remove(name)
+        self.__interfaces = {other:value for other, value in self.__interfaces.items() if other != name}
+        moved = self.__rebalance()
+
+        # The next broker takes over the inbound topics before the primary disconnects
+        if name == self.primary:
+            self.primary = next(iter(self.__interfaces))
+            for topic, callback_func in self.__subscriptions:
+                self.__interfaces[self.primary].subscribe_topic(topic=topic, callback_func=callback_func)
+            logger.info(f"Broker {self.primary} is the primary broker")
+
+        interface.close()
+        logger.info(f"Broker {name} removed, {moved} furnaces moved")
+
+        return {"broker":name, "moved":moved}
+
+
+    def brokers(self) -> dict:
+        """
+        Furnaces assigned to each broker, of the furnaces that published
+
+        Returns:
+            dict: broker name to number of furnaces
+        """
+
+        counts = dict.fromkeys(self.__interfaces, 0)
+        for furnace_id in list(self.__shards):
+            counts[self.ring.node_for(furnace_id)] += 1
+
+        return counts
+
+
+    def get_queue_stats(self) -> dict:
+        """
+        Outbound queue counters of every broker and their totals
+
+        Returns:
+            dict: counters
+        """
+
+        stats = {name:interface.get_queue_stats() for name, interface in self.__interfaces.items()}
+        totals = {}
+        for broker_stats in stats.values():
+            for key, value in broker_stats.items():
+                totals[key] = totals.get(key, 0) + value
+
+        return dict(totals, brokers=stats)
+
+
+    def close(self) -> None:
+        """
+        Close every broker connection
+        """
+
+        for interface in self.__interfaces.values():
+            interface.close()
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+class CalibrationCache:
+    """
+    LRU and disk-backed cache of calibration curves
+
+    A curve is the reading of one sensor after every calibration tick. It
+    only depends on (sensor type, boundries, noise seed, number of ticks),
+    so identical sensors of any number of furnaces, and sensors of the
+    same type and boundries within a furnace, share one computed curve.
+    """
+
+    def __init__(self,
+                 step_min: int,
+                 step_max: int,
+                 stream: int,
+                 maxsize: int = 128,
+                 cache_dir: str = None) -> None:
+        """CalibrationCache class constructor
+
+        Args:
+            step_min (int): lowest calibration increment
+            step_max (int): highest calibration increment
+            stream (int): noise stream number of the calibration increments
+            maxsize (int): number of curves kept in memory
+            cache_dir (str): directory of the disk cache, memory only if None
+        """
+
+        self.step_min = step_min
+        self.step_max = step_max
+        self.stream = stream
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+
+        self.hits = 0
+        self.misses = 0
+        self.__curves = OrderedDict()
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+
+    # Private methods
+    def __compute_curve(self, sensor_type: str, bot: float, top: float, seed: int, ticks: int) -> np.ndarray:
+        """
+        Compute calibration curve
+
+        The reading starts at the low boundry and grows by a random
+        increment every tick while it is within the boundries, like
+        modules.sensors.Sensor.set_sensor_value(). The increments are drawn
+        from a stream of the sensor configuration, so sensors of the same
+        type and boundries get the same curve and any other sensor its own.
+
+        Args:
+            sensor_type (str): sensor type, see modules.sensors.Sensor
+            bot (float): sensor min value
+            top (float): sensor max value
+            seed (int): noise seed
+            ticks (int): number of calibration ticks
+
+        Returns:
+            numpy.ndarray: (ticks,) readings after every tick
+        """
+
+        config = f"{sensor_type}:{float(bot)!r}:{float(top)!r}"
+        seed_sequence = np.random.SeedSequence(entropy=seed,
+                                               spawn_key=(self.stream, zlib.crc32(config.encode('utf-8'))))
+        rng = np.random.Generator(np.random.PCG64(seed_sequence))
+        increments = rng.integers(self.step_min, self.step_max, size=ticks, endpoint=True)
+
+        curve = bot + np.cumsum(increments, dtype=np.float64)
+        above = np.flatnonzero(curve > top)
+        if above.size:
+            curve[above[0]:] = curve[above[0]]
+
+        return curve
+
+
+    def __disk_path(self, key: tuple) -> str:
+        """
+        Disk cache file of a curve
+
+        Args:
+            key (tuple): curve key
+
+        Returns:
+            str: file path
+        """
+
+        digest = hashlib.sha1(repr((key, self.step_min, self.step_max, self.stream)).encode('utf-8')).hexdigest()
+
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+
+    # Public methods
+    def get_curve(self, sensor_type: str, bot: float, top: float, seed: int, ticks: int) -> np.ndarray:
+        """
+        Calibration curve of one sensor configuration
+
+        Args:
+            sensor_type (str): sensor type, see modules.sensors.Sensor
+            bot (float): sensor min value
+            top (float): sensor max value
+            seed (int): noise seed
+            ticks (int): number of calibration ticks
+
+        Returns:
+            numpy.ndarray: (ticks,) read-only readings after every tick
+        """
+
+        key = (sensor_type, float(bot), float(top), int(seed), int(ticks))
+
+        curve = self.__curves.get(key)
+        if curve is not None:
+            self.__curves.move_to_end(key)
+            self.hits += 1
+            return curve
+
+        if self.cache_dir is not None and os.path.exists(self.__disk_path(key)):
+            curve = np.load(self.__disk_path(key), mmap_mode='r')
+            self.hits += 1
+        else:
+            curve = self.__compute_curve(*key)
+            curve.flags.writeable = False
+            self.misses += 1
+            if self.cache_dir is not None:
+                tmp_path = f"{self.__disk_path(key)}.{os.getpid()}.tmp.npy"
+                np.save(tmp_path, curve)
+                os.replace(tmp_path, self.__disk_path(key))
+
+        self.__curves[key] = curve
+        if len(self.__curves) > self.maxsize:
+            self.__curves.popitem(last=False)
+
+        return curve
+
+
+    def get_profile(self, sensors: list, seed: int, ticks: int) -> np.ndarray:
+        """
+        Calibration profile of a sensor layout
+
+        Args:
+            sensors (list): (sensor_type, bot, top) tuples
+            seed (int): noise seed
+            ticks (int): number of calibration ticks
+
+        Returns:
+            numpy.ndarray: (ticks, n_sensors) readings after every tick
+        """
+
+        return np.stack([self.get_curve(sensor_type, bot, top, seed, ticks)
+                         for sensor_type, bot, top in sensors], axis=1)
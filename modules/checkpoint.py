@@ -0,0 +1,108 @@
+import json
+import os
+import struct
+
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+CHECKPOINT_MAGIC = b'FSIMCKPT'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_ALIGNMENT = 64
+
+# magic, version, header length
+CHECKPOINT_PREAMBLE = struct.Struct('<8sII')
+
+
+def align(offset: int) -> int:
+    """
+    Round offset up to the checkpoint array alignment
+
+    Args:
+        offset (int): byte offset
+
+    Returns:
+        int: aligned byte offset
+    """
+
+    return (offset + CHECKPOINT_ALIGNMENT - 1) // CHECKPOINT_ALIGNMENT * CHECKPOINT_ALIGNMENT
+
+
+def save_checkpoint(path: str, arrays: dict, meta: dict) -> None:
+    """
+    Write named arrays and JSON metadata to a checkpoint file
+
+    The file is a small JSON header followed by the raw, aligned array
+    data, so it can be memory-mapped back by load_checkpoint(). It is
+    written to a temporary file first and atomically renamed.
+
+    Args:
+        path (str): checkpoint file path
+        arrays (dict): name to numpy array
+        meta (dict): JSON serializable metadata
+    """
+
+    entries = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        entries.append({
+            "name":name,
+            "dtype":array.dtype.str,
+            "shape":list(array.shape),
+            "offset":offset
+        })
+        offset = align(offset + array.nbytes)
+
+    header = json.dumps({"meta":meta, "arrays":entries}).encode('utf-8')
+    data_start = align(CHECKPOINT_PREAMBLE.size + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(CHECKPOINT_PREAMBLE.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(header)))
+        checkpoint_file.write(header)
+        for entry in entries:
+            checkpoint_file.seek(data_start + entry["offset"])
+            checkpoint_file.write(arrays[entry["name"]].tobytes())
+        checkpoint_file.truncate(data_start + offset)
+
+    os.replace(tmp_path, path)
+    logger.info(f"Checkpoint saved to {path}")
+
+
+def load_checkpoint(path: str) -> tuple:
+    """
+    Memory-map checkpoint file
+
+    Arrays are copy-on-write views of the file, pages are read on first
+    access and modifications are never written back.
+
+    Args:
+        path (str): checkpoint file path
+
+    Returns:
+        tuple: (name to numpy array dict, metadata dict)
+    """
+
+    with open(path, 'rb') as checkpoint_file:
+        magic, version, header_len = CHECKPOINT_PREAMBLE.unpack(checkpoint_file.read(CHECKPOINT_PREAMBLE.size))
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} simulator checkpoint")
+        header = json.loads(checkpoint_file.read(header_len).decode('utf-8'))
+
+    data_start = align(CHECKPOINT_PREAMBLE.size + header_len)
+    buffer = np.memmap(path, dtype=np.uint8, mode='c')
+
+    arrays = {}
+    for entry in header["arrays"]:
+        dtype = np.dtype(entry["dtype"])
+        start = data_start + entry["offset"]
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        arrays[entry["name"]] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+
+    return arrays, header["meta"]
@@ -0,0 +1,49 @@
+from time import sleep
+
+
+class SimClock:
+    """
+    Simulation clock
+
+    In real-time mode sleep() blocks like time.sleep(), in accelerated mode
+    it only advances the simulated time.
+    """
+
+    def __init__(self,
+                 accelerated: bool = False,
+                 start_time: float = 0.0) -> None:
+        """SimClock class constructor
+
+        Args:
+            accelerated (bool): advance simulated time without sleeping
+            start_time (float): simulated time in seconds
+        """
+
+        self.accelerated = accelerated
+        self.time = start_time
+
+
+    # Public methods
+    def now(self) -> float:
+        """
+        Simulated time
+
+        Returns:
+            float: simulated time in seconds
+        """
+
+        return self.time
+
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Advance simulated time
+
+        Args:
+            seconds (float): time step in seconds
+        """
+
+        if not self.accelerated:
+            sleep(seconds)
+
+        self.time = self.time + seconds
@@ -0,0 +1,255 @@
+import json
+import queue
+import struct
+import threading
+
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+# Frame header: magic, version, reserved, record size, record count.
+# The header is followed by count little-endian COMMAND_RECORD_DTYPE records.
+COMMAND_FRAME_HEADER = struct.Struct('<4sBBHI')
+COMMAND_FRAME_MAGIC = b'FCMD'
+COMMAND_FRAME_VERSION = 1
+
+COMMAND_RECORD_DTYPE = np.dtype([
+    ('furnace_id', '<u4'),
+    ('target', 'u1'),
+    ('index', 'u1'),
+    ('reserved', '<u2'),
+    ('value', '<f4')
+])
+
+# Command targets, index is the actuator or the thermal channel
+COMMAND_TARGET_ACTUATOR = 0
+COMMAND_TARGET_SETPOINT = 1
+
+# Furnace id of a command addressing every furnace
+COMMAND_ALL_FURNACES = 0xFFFFFFFF
+
+
+def is_command_batch(payload: bytes) -> bool:
+    """
+    Check for a batched command payload
+
+    Args:
+        payload (bytes): MQTT payload
+
+    Returns:
+        bool: True for a binary command frame or a JSON array
+    """
+
+    return payload[:4] == COMMAND_FRAME_MAGIC or payload.lstrip()[:1] == b'['
+
+
+def pack_command_frame(furnace_ids, targets, indices, values) -> bytes:
+    """
+    Encode commands as a binary command frame
+
+    Args:
+        furnace_ids (array_like): furnace id per command, COMMAND_ALL_FURNACES for every furnace
+        targets (array_like): COMMAND_TARGET_* per command
+        indices (array_like): actuator or thermal channel index per command
+        values (array_like): actuator position or setpoint per command
+
+    Returns:
+        bytes: command frame
+    """
+
+    furnace_ids = np.asarray(furnace_ids)
+    records = np.zeros(furnace_ids.size, dtype=COMMAND_RECORD_DTYPE)
+    records['furnace_id'] = furnace_ids
+    records['target'] = targets
+    records['index'] = indices
+    records['value'] = values
+
+    return COMMAND_FRAME_HEADER.pack(COMMAND_FRAME_MAGIC, COMMAND_FRAME_VERSION, 0,
+                                     COMMAND_RECORD_DTYPE.itemsize, records.size) + records.tobytes()
+
+
+def parse_command_batch(payload: bytes, channel_labels: list) -> np.ndarray:
+    """
+    Decode a batched command payload
+
+    A JSON batch is an array of {"furnace_id": 3, "channel": "pot_thermal_couple",
+    "setpoint": 1650} and {"furnace_id": 3, "actuator": 0, "position": 75}
+    objects, a missing furnace_id addresses every furnace.
+
+    Args:
+        payload (bytes): binary command frame or JSON array
+        channel_labels (list): thermal channel labels, in setpoint index order
+
+    Returns:
+        numpy.ndarray: COMMAND_RECORD_DTYPE records
+    """
+
+    if payload[:4] == COMMAND_FRAME_MAGIC:
+        if len(payload) < COMMAND_FRAME_HEADER.size:
+            raise ValueError("Truncated command frame header")
+        _, version, _, record_size, count = COMMAND_FRAME_HEADER.unpack_from(payload)
+        if version != COMMAND_FRAME_VERSION or record_size != COMMAND_RECORD_DTYPE.itemsize:
+            raise ValueError(f"Unsupported command frame version {version}, record size {record_size}")
+        if len(payload) != COMMAND_FRAME_HEADER.size + count * record_size:
+            raise ValueError(f"Command frame of {count} records has {len(payload)} bytes")
+
+        return np.frombuffer(payload, dtype=COMMAND_RECORD_DTYPE, count=count, offset=COMMAND_FRAME_HEADER.size)
+
+    commands = json.loads(payload)
+    if not isinstance(commands, list):
+        raise ValueError("Command batch is not a JSON array")
+
+    channels = {label:index for index, label in enumerate(channel_labels)}
+    records = np.zeros(len(commands), dtype=COMMAND_RECORD_DTYPE)
+    for record, command in zip(records, commands):
+        if not isinstance(command, dict):
+            raise ValueError(f"Command {command!r} is not a JSON object")
+        record['furnace_id'] = command.get('furnace_id', COMMAND_ALL_FURNACES)
+        if 'setpoint' in command:
+            channel = command['channel']
+            record['target'] = COMMAND_TARGET_SETPOINT
+            record['index'] = channels[channel] if isinstance(channel, str) else channel
+            record['value'] = command['setpoint']
+        else:
+            record['target'] = COMMAND_TARGET_ACTUATOR
+            record['index'] = command.get('actuator', 0)
+            record['value'] = command['position']
+
+    return records
+
+
+class CommandIngestor:
+    """
+    Batched command ingestion
+
+    The MQTT network thread only queues the raw payloads, a worker thread
+    parses them into command records and the tick loop drains every parsed
+    record at once, so a burst of batches is applied to the fleet as one
+    vectorized update between two ticks.
+    """
+
+    def __init__(self, channel_labels: list, max_pending: int = 1000) -> None:
+        """CommandIngestor class constructor
+
+        Args:
+            channel_labels (list): thermal channel labels, in setpoint index order
+            max_pending (int): maximum number of queued payloads, newer payloads are dropped
+        """
+
+        self.channel_labels = list(channel_labels)
+
+        self.received = 0
+        self.dropped = 0
+        self.invalid = 0
+        self.parsed_records = 0
+
+        self.__payloads = queue.Queue(maxsize=max_pending)
+        self.__parsed = []
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+
+    # Private methods
+    def __run(self) -> None:
+        """
+        Parser thread loop, a None payload stops it
+        """
+
+        while True:
+            payload = self.__payloads.get()
+            if payload is None:
+                return
+
+            # A malformed payload must never stop the parser thread
+            try:
+                records = parse_command_batch(payload, self.channel_labels)
+            except Exception as err:
+                self.invalid += 1
+                logger.error(f"Invalid command batch: {err!r}")
+                continue
+
+            with self.__lock:
+                self.__parsed.append(records)
+                self.parsed_records += len(records)
+
+
+    # Public methods
+    def start(self) -> None:
+        """
+        Start parser thread
+        """
+
+        self.__thread = threading.Thread(target=self.__run, name='command-ingest', daemon=True)
+        self.__thread.start()
+
+
+    def stop(self) -> None:
+        """
+        Stop parser thread after the queued payloads
+        """
+
+        if self.__thread is None:
+            return
+
+        self.__payloads.put(None)
+        self.__thread.join()
+        self.__thread = None
+
+
+    def submit(self, payload: bytes) -> bool:
+        """
+        Queue a batched command payload, called from the network thread
+
+        Args:
+            payload (bytes): binary command frame or JSON array
+
+        Returns:
+            bool: False if the payload was dropped
+        """
+
+        self.received += 1
+        try:
+            self.__payloads.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        return True
+
+
+    def drain(self) -> np.ndarray:
+        """
+        Take every parsed command record, in arrival order
+
+        Returns:
+            numpy.ndarray: COMMAND_RECORD_DTYPE records, None if there are none
+        """
+
+        with self.__lock:
+            parsed, self.__parsed = self.__parsed, []
+
+        if not parsed:
+            return None
+
+        return parsed[0] if len(parsed) == 1 else np.concatenate(parsed)
+
+
+    def stats(self) -> dict:
+        """
+        Ingestion counters
+
+        Returns:
+            dict: counters
+        """
+
+        return {
+            "received":self.received,
+            "dropped":self.dropped,
+            "invalid":self.invalid,
+            "parsed_records":self.parsed_records,
+            "pending":self.__payloads.qsize()
+        }
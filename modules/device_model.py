@@ -0,0 +1,351 @@
+import sys
+
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+class LabelTable:
+    """
+    Interned device labels
+
+    Every distinct label is stored once and referenced by a small integer,
+    so a million channels of ten sensor types hold ten label strings.
+    """
+
+    def __init__(self) -> None:
+        """LabelTable class constructor"""
+
+        self.labels = []
+        self.__index = {}
+
+
+    # Public methods
+    def intern(self, label: str) -> int:
+        """
+        Index of a label, added on first use
+
+        Args:
+            label (str): device label
+
+        Returns:
+            int: label index
+        """
+
+        index = self.__index.get(label)
+        if index is None:
+            index = len(self.labels)
+            self.labels.append(sys.intern(label))
+            self.__index[self.labels[index]] = index
+
+        return index
+
+
+class SensorStore:
+    """
+    Array-backed state of many sensor channels
+
+    Per channel only the reading, the label index and the channel number
+    are stored; boundries are stored once per label.
+    """
+
+    def __init__(self, capacity: int, labels: LabelTable = None) -> None:
+        """SensorStore class constructor
+
+        Args:
+            capacity (int): number of channels allocated up front, see reserve()
+            labels (LabelTable): shared label table, a new one if None
+        """
+
+        self.labels = labels or LabelTable()
+        self.size = 0
+
+        self.readings = np.zeros(capacity, dtype=np.float32)
+        self.label_index = np.zeros(capacity, dtype=np.uint16)
+        self.sensor_number = np.zeros(capacity, dtype=np.uint32)
+
+        self.bot_boundry = np.zeros(0, dtype=np.float32)
+        self.top_boundry = np.zeros(0, dtype=np.float32)
+
+
+    # Private methods
+    def __intern(self, sensor_label: str, sensor_bot_boundry, sensor_top_boundry) -> int:
+        """
+        Label index of a sensor type, its boundries are stored on first use
+
+        Args:
+            sensor_label (str): label of the sensor type
+            sensor_bot_boundry (_type_): sensor min value
+            sensor_top_boundry (_type_): sensor max value
+
+        Returns:
+            int: label index
+        """
+
+        label = self.labels.intern(sensor_label)
+        if label >= len(self.bot_boundry):
+            self.bot_boundry = np.resize(self.bot_boundry, len(self.labels.labels))
+            self.top_boundry = np.resize(self.top_boundry, len(self.labels.labels))
+            self.bot_boundry[label] = sensor_bot_boundry
+            self.top_boundry[label] = sensor_top_boundry
+
+        return label
+
+
+    # Public methods
+    def reserve(self, capacity: int) -> None:
+        """
+        Grow the channel arrays to hold at least capacity channels
+
+        Args:
+            capacity (int): number of channels
+        """
+
+        if capacity <= len(self.readings):
+            return
+
+        for name in ('readings', 'label_index', 'sensor_number'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+
+    def add(self, sensor_label: str, sensor_number: int, sensor_bot_boundry, sensor_top_boundry) -> int:
+        """
+        Add sensor channel
+
+        Args:
+            sensor_label (str): label of the sensor type
+            sensor_number (int): number of the sensor
+            sensor_bot_boundry (_type_): sensor min value, the same for every channel of a label
+            sensor_top_boundry (_type_): sensor max value, the same for every channel of a label
+
+        Returns:
+            int: channel index
+        """
+
+        if self.size >= len(self.readings):
+            raise IndexError("Sensor store is full")
+
+        index = self.size
+        self.label_index[index] = self.__intern(sensor_label, sensor_bot_boundry, sensor_top_boundry)
+        self.sensor_number[index] = sensor_number
+        self.readings[index] = sensor_bot_boundry
+        self.size += 1
+
+        return index
+
+
+    def add_layout(self, sensors: list, count: int) -> None:
+        """
+        Add count copies of a sensor layout in one step
+
+        Args:
+            sensors (list): modules.sensors.Sensor objects of one device
+            count (int): number of devices
+        """
+
+        start = self.size
+        end = start + count * len(sensors)
+        if end > len(self.readings):
+            raise IndexError("Sensor store is full")
+
+        labels = np.array([self.__intern(sensor.sensor_label, sensor.sensor_bot_boundry, sensor.sensor_top_boundry)
+                           for sensor in sensors], dtype=np.uint16)
+        numbers = np.array([sensor.sensor_number for sensor in sensors], dtype=np.uint32)
+
+        self.label_index[start:end] = np.tile(labels, count)
+        self.sensor_number[start:end] = np.tile(numbers, count)
+        self.readings[start:end] = self.bot_boundry[self.label_index[start:end]]
+        self.size = end
+
+
+    def remove(self, keep: np.ndarray) -> None:
+        """
+        Drop channels and compact the store to the remaining ones
+
+        Args:
+            keep (numpy.ndarray): boolean mask of the channels that stay, one entry per stored channel
+        """
+
+        self.readings = self.readings[:self.size][keep]
+        self.label_index = self.label_index[:self.size][keep]
+        self.sensor_number = self.sensor_number[:self.size][keep]
+        self.size = len(self.readings)
+
+
+    def view(self, n_columns: int) -> np.ndarray:
+        """
+        Readings of equally sized devices as a (n_devices, n_columns) view
+
+        Args:
+            n_columns (int): channels per device
+
+        Returns:
+            numpy.ndarray: readings view, writes go to the store
+        """
+
+        return self.readings[:self.size].reshape(-1, n_columns)
+
+
+    def reset(self) -> None:
+        """
+        Reset every channel to its low boundry
+        """
+
+        self.readings[:self.size] = self.bot_boundry[self.label_index[:self.size]]
+
+
+    def nbytes(self) -> int:
+        """
+        Memory used by the channel state
+
+        Returns:
+            int: bytes
+        """
+
+        return self.readings.nbytes + self.label_index.nbytes + self.sensor_number.nbytes + \
+            self.bot_boundry.nbytes + self.top_boundry.nbytes
+
+
+class JsonPayloadEncoder:
+    """
+    Preallocated JSON payloads of a fixed channel layout
+
+    Each row of the buffer is one JSON object {"label": value, ...} with
+    fixed-width integer fields. encode() writes the digits of the rows in
+    place with numpy, chunk_rows rows at a time on preallocated scratch
+    arrays, so re-encoding the payloads every tick creates no dicts,
+    strings or per-value objects and the scratch does not grow with the
+    number of rows.
+    """
+
+    def __init__(self, labels: list, n_rows: int, width: int = 6, chunk_rows: int = 1024) -> None:
+        """JsonPayloadEncoder class constructor
+
+        Args:
+            labels (list): channel labels in value column order
+            n_rows (int): number of payloads, e.g. one per furnace
+            width (int): characters per value, values are clipped to fit
+            chunk_rows (int): number of rows encoded at once
+        """
+
+        self.labels = labels
+        self.width = width
+
+        template = bytearray(b'{')
+        offsets = []
+        for column, label in enumerate(labels):
+            template += (', "' if column else '"').encode('utf-8') + label.encode('utf-8') + b'": '
+            offsets.append(len(template))
+            template += b' ' * width
+        template += b'}'
+
+        self.buffer = np.tile(np.frombuffer(bytes(template), dtype=np.uint8), (n_rows, 1))
+        self.__positions = (np.asarray(offsets)[:, None] + np.arange(width)).ravel()
+        self.__powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+        self.__low = -(10 ** (width - 1) - 1)
+        self.__high = 10 ** width - 1
+
+        # Values up to 10 ** 7 are exact in single precision
+        shape = (max(1, min(n_rows, chunk_rows)), len(labels))
+        self.__rounded = np.empty(shape, dtype=np.float32 if width <= 7 else np.float64)
+        self.__values = np.empty(shape, dtype=np.int64)
+        self.__negative = np.empty(shape, dtype=bool)
+        self.__digits = np.empty(shape + (width,), dtype=np.int64)
+        self.__blank = np.empty(shape + (width,), dtype=bool)
+        self.__chars = np.empty((shape[0], len(labels) * width), dtype=np.uint8)
+
+
+    # Private methods
+    def __encode_chunk(self, n_rows: int) -> np.ndarray:
+        """
+        Digits of the first n_rows rows of the rounded value scratch
+
+        Args:
+            n_rows (int): number of rows
+
+        Returns:
+            numpy.ndarray: (n_rows, n_channels * width) uint8 characters
+        """
+
+        rounded = self.__rounded[:n_rows]
+        values = self.__values[:n_rows]
+        negative = self.__negative[:n_rows]
+        digits = self.__digits[:n_rows]
+        blank = self.__blank[:n_rows]
+        chars = self.__chars[:n_rows]
+
+        np.rint(rounded, out=rounded)
+        np.clip(rounded, self.__low, self.__high, out=rounded)
+        np.copyto(values, rounded, casting='unsafe')
+        np.less(values, 0, out=negative)
+        np.abs(values, out=values)
+
+        np.floor_divide(values[..., None], self.__powers, out=digits)
+        np.remainder(digits, 10, out=digits)
+        np.add(digits, ord('0'), out=digits)
+
+        # Leading zeros become spaces, the last digit is always printed
+        np.less(values[..., None], self.__powers, out=blank)
+        blank[..., -1] = False
+        np.copyto(digits, ord(' '), where=blank)
+
+        if negative.any():
+            rows, columns = np.nonzero(negative)
+            digits[rows, columns, blank[rows, columns].sum(axis=1) - 1] = ord('-')
+
+        np.copyto(chars, digits.reshape(chars.shape), casting='unsafe')
+
+        return chars
+
+
+    # Public methods
+    def encode(self, values: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """
+        Write values into the payload rows
+
+        Args:
+            values (numpy.ndarray): (n_rows, n_channels) values, rounded to integers
+            rows (numpy.ndarray): indices of the rows to encode, all rows if None
+
+        Returns:
+            numpy.ndarray: (n_rows, payload length) uint8 payload buffer
+        """
+
+        chunk_rows = len(self.__rounded)
+        n_rows = len(self.buffer) if rows is None else len(rows)
+
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            rounded = self.__rounded[:stop - start]
+            if rows is None:
+                rounded[:] = values[start:stop]
+                self.buffer[start:stop, self.__positions] = self.__encode_chunk(stop - start)
+            else:
+                chunk = rows[start:stop]
+                if values.dtype == rounded.dtype:
+                    np.take(values, chunk, axis=0, out=rounded, mode='clip')
+                else:
+                    rounded[:] = values[chunk]
+                self.buffer[chunk[:, None], self.__positions] = self.__encode_chunk(stop - start)
+
+        return self.buffer
+
+
+    def payload(self, row: int) -> memoryview:
+        """
+        Payload of one row, valid until the next encode()
+
+        Args:
+            row (int): row index
+
+        Returns:
+            memoryview: JSON payload bytes
+        """
+
+        return memoryview(self.buffer[row])
@@ -0,0 +1,258 @@
+from time import monotonic
+
+
+class LttbDownsampler:
+    """
+    Incremental Largest-Triangle-Three-Buckets downsampler
+
+    Raw points are collected into a window of at most window_size points
+    and window_period seconds. When the window closes it is reduced to
+    output_size points with LTTB and the last raw point is kept as the
+    anchor of the next window, so the emitted series stays continuous
+    across windows. The period keeps slow streams updating: at 1 Hz a
+    50 point window would only close every 50 seconds.
+    """
+
+    def __init__(self,
+                 window_size: int,
+                 output_size: int,
+                 window_period: float = None,
+                 clock=monotonic) -> None:
+        """LttbDownsampler class constructor
+
+        Args:
+            window_size (int): maximum number of raw points per window
+            output_size (int): number of points emitted per window
+            window_period (float): maximum window duration in seconds, None for size-only windows
+            clock (callable): monotonic time source in seconds
+        """
+
+        if output_size < 1 or window_size < output_size:
+            raise ValueError("window_size must be >= output_size >= 1")
+        if window_period is not None and window_period <= 0:
+            raise ValueError("window_period must be positive")
+
+        self.window_size = window_size
+        self.output_size = output_size
+        self.window_period = window_period
+        self.clock = clock
+
+        self.__window = []
+        self.__window_start = None
+        self.__anchor = None
+
+
+    # Private methods
+    @staticmethod
+    def __lttb(data: list, threshold: int) -> list:
+        """
+        Largest-Triangle-Three-Buckets selection
+
+        Args:
+            data (list): list of (x, y) points
+            threshold (int): number of points to select
+
+        Returns:
+            list: selected points (first and last are always kept)
+        """
+
+        data_len = len(data)
+        if threshold >= data_len:
+            return list(data)
+        if threshold == 1:
+            return [data[-1]]
+        if threshold == 2:
+            return [data[0], data[-1]]
+
+        sampled = [data[0]]
+        every = (data_len - 2) / (threshold - 2)
+        point_a = 0
+
+        for i in range(threshold - 2):
+            avg_start = int((i + 1) * every) + 1
+            avg_end = min(int((i + 2) * every) + 1, data_len)
+            avg_len = avg_end - avg_start
+            avg_x = sum(point[0] for point in data[avg_start:avg_end]) / avg_len
+            avg_y = sum(point[1] for point in data[avg_start:avg_end]) / avg_len
+
+            range_start = int(i * every) + 1
+            range_end = int((i + 1) * every) + 1
+            a_x, a_y = data[point_a]
+
+            max_area = -1.0
+            next_a = range_start
+            for j in range(range_start, range_end):
+                area = abs((a_x - avg_x) * (data[j][1] - a_y) -
+                           (a_x - data[j][0]) * (avg_y - a_y))
+                if area > max_area:
+                    max_area = area
+                    next_a = j
+
+            sampled.append(data[next_a])
+            point_a = next_a
+
+        sampled.append(data[-1])
+
+        return sampled
+
+
+    # Public methods
+    def push(self, timestamp: float, value: float) -> list:
+        """
+        Push raw point into the current window
+
+        Args:
+            timestamp (float): point timestamp
+            value (float): point value
+
+        Returns:
+            list: selected (timestamp, value) points when the window closes, otherwise empty list
+        """
+
+        now = self.clock()
+        if not self.__window:
+            self.__window_start = now
+
+        self.__window.append((timestamp, value))
+        if len(self.__window) < self.window_size and \
+           (self.window_period is None or now - self.__window_start < self.window_period):
+            return []
+
+        if self.__anchor is None:
+            selected = self.__lttb(self.__window, self.output_size)
+        else:
+            selected = self.__lttb([self.__anchor] + self.__window, self.output_size + 1)[1:]
+
+        self.__anchor = self.__window[-1]
+        self.__window = []
+
+        return selected
+
+
+    def reset(self) -> None:
+        """
+        Drop buffered points and the window anchor
+        """
+
+        self.__window = []
+        self.__window_start = None
+        self.__anchor = None
+
+
+class GaugeThrottle:
+    """
+    Latest-value rate limiter for dashboard gauges
+    """
+
+    def __init__(self,
+                 rate_hz: float,
+                 clock=monotonic) -> None:
+        """GaugeThrottle class constructor
+
+        Args:
+            rate_hz (float): maximum number of emitted updates per second
+            clock (callable): monotonic time source in seconds
+        """
+
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+
+        self.period = 1.0 / rate_hz
+        self.clock = clock
+
+        self.__latest = {}
+        self.__next_emit = None
+
+
+    # Public methods
+    def update(self, values: dict) -> dict:
+        """
+        Store latest values and emit them if the rate allows it
+
+        Args:
+            values (dict): channel values
+
+        Returns:
+            dict: latest values of all channels or None if throttled
+        """
+
+        self.__latest.update(values)
+
+        now = self.clock()
+        if self.__next_emit is not None and now < self.__next_emit:
+            return None
+
+        self.__next_emit = now + self.period
+
+        return dict(self.__latest)
+
+
+class DashboardFeed:
+    """
+    Decimated dashboard feed for a multi-channel telemetry stream
+    """
+
+    def __init__(self,
+                 chart_window_size: int,
+                 chart_output_size: int,
+                 gauge_rate_hz: float,
+                 chart_window_period: float = None,
+                 clock=monotonic) -> None:
+        """DashboardFeed class constructor
+
+        Args:
+            chart_window_size (int): maximum number of raw samples per chart window
+            chart_output_size (int): number of chart points emitted per window
+            gauge_rate_hz (float): maximum gauge update rate
+            chart_window_period (float): maximum chart window duration in seconds
+            clock (callable): monotonic time source in seconds
+        """
+
+        self.chart_window_size = chart_window_size
+        self.chart_output_size = chart_output_size
+        self.chart_window_period = chart_window_period
+        self.clock = clock
+
+        self.__charts = {}
+        self.__gauge = GaugeThrottle(rate_hz=gauge_rate_hz, clock=clock)
+
+
+    # Public methods
+    def push(self, timestamp: float, values: dict) -> tuple:
+        """
+        Push raw telemetry sample
+
+        Args:
+            timestamp (float): sample timestamp
+            values (dict): channel values
+
+        Returns:
+            tuple: (chart message or None, gauge message or None)
+        """
+
+        chart_msg = {}
+        for channel, value in values.items():
+            downsampler = self.__charts.get(channel)
+            if downsampler is None:
+                downsampler = LttbDownsampler(window_size=self.chart_window_size,
+                                              output_size=self.chart_output_size,
+                                              window_period=self.chart_window_period,
+                                              clock=self.clock)
+                self.__charts[channel] = downsampler
+
+            points = downsampler.push(timestamp, value)
+            if points:
+                chart_msg[channel] = points
+
+        gauge_msg = self.__gauge.update(values)
+
+        return (chart_msg or None, gauge_msg)
+
+
+    def reset(self) -> None:
+        """
+        Drop all buffered chart windows
+        """
+
+        for downsampler in self.__charts.values():
+            downsampler.reset()
@@ -0,0 +1,512 @@
+from enum import Enum
+
+from modules.checkpoint import save_checkpoint, load_checkpoint
+from modules.clock import SimClock
+from modules.command_batch import COMMAND_ALL_FURNACES, COMMAND_TARGET_ACTUATOR, COMMAND_TARGET_SETPOINT
+from modules.device_model import SensorStore
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+# Steady-state furnaces stepped at once, bounds the tick scratch buffers
+FLEET_TICK_CHUNK = 1024
+
+
+class FurnaceProcessState(Enum):
+    """
+    Furnace process state enum
+
+    Args:
+        Enum (enum): per furnace process states
+    """
+
+    FURNACE_IDLE            = 0
+    FURNACE_CALIBRATION     = 1
+    FURNACE_STEADY_STATE    = 2
+
+
+class FurnaceFleet:
+    """
+    Array-backed state of several simulated furnaces
+
+    Every furnace has the same thermal sensor layout, one row of each state
+    array belongs to one furnace and a tick updates all furnaces at once.
+    The readings live in a modules.device_model.SensorStore, readings is a
+    (n_furnaces, n_channels) view of it.
+    """
+
+    def __init__(self,
+                 sensors: list,
+                 furnace_ids: list,
+                 thermal_noise_bank,
+                 calibration_cache,
+                 calibration_seeds: list,
+                 steady_state_mean: list,
+                 calibration_ticks: int,
+                 n_actuators: int = 1,
+                 actuator_min_position: float = 0,
+                 actuator_max_position: float = 150,
+                 publish_period: float = 1.0,
+                 clock: SimClock = None) -> None:
+        """FurnaceFleet class constructor
+
+        Args:
+            sensors (list): modules.sensors.Sensor objects describing the thermal channels
+            furnace_ids (list): furnace ids
+            thermal_noise_bank (modules.noise.NoiseBank): steady-state noise of the same furnace ids
+            calibration_cache (modules.calibration_cache.CalibrationCache): calibration curve cache
+            calibration_seeds (list): calibration noise seed per furnace
+            steady_state_mean (list): steady-state mean per thermal channel
+            calibration_ticks (int): number of calibration ticks
+            n_actuators (int): number of actuators per furnace
+            actuator_min_position (float): lowest commanded actuator position
+            actuator_max_position (float): highest commanded actuator position
+            publish_period (float): default telemetry publish period in seconds
+            clock (modules.clock.SimClock): simulation clock
+        """
+
+        self.sensors = list(sensors)
+        self.sensor_labels = [sensor.sensor_label for sensor in sensors]
+        self.sensor_bot_boundry = np.array([sensor.sensor_bot_boundry for sensor in sensors], dtype=np.float64)
+        self.sensor_top_boundry = np.array([sensor.sensor_top_boundry for sensor in sensors], dtype=np.float64)
+        self.thermal_noise_bank = thermal_noise_bank
+        self.calibration_cache = calibration_cache
+        self.steady_state_mean = np.asarray(steady_state_mean, dtype=np.float64)
+        self.calibration_ticks = calibration_ticks
+        self.actuator_min_position = actuator_min_position
+        self.actuator_max_position = actuator_max_position
+        self.default_publish_period = publish_period
+        self.clock = clock or SimClock()
+
+        n_furnaces = len(furnace_ids)
+        self.furnace_ids = np.asarray(furnace_ids, dtype=np.int64)
+        self.sensor_store = self.__sensor_store(n_furnaces)
+        self.process_state = np.full(n_furnaces, FurnaceProcessState.FURNACE_IDLE.value, dtype=np.int8)
+        self.calibration_tick = np.zeros(n_furnaces, dtype=np.int32)
+        self.calibration_seeds = np.asarray(calibration_seeds, dtype=np.int64)
+        self.actuator_positions = np.full((n_furnaces, n_actuators), actuator_min_position, dtype=np.float64)
+        self.setpoints = np.tile(self.steady_state_mean.astype(np.float32), (n_furnaces, 1))
+        self.publish_period = np.full(n_furnaces, publish_period, dtype=np.float64)
+
+        # Steady-state tick buffer, see step()
+        self.tick_values = np.empty((FLEET_TICK_CHUNK, len(self.sensors)), dtype=np.float32)
+
+        # Sorted furnace ids and their row indices, see rows()
+        self.id_order = None
+
+        # Calibration profiles of the distinct seeds, see __load_profiles()
+        self.profile_table = None
+        self.profile_index = None
+
+
+    @property
+    def readings(self) -> np.ndarray:
+        """
+        Readings of every furnace
+
+        Returns:
+            numpy.ndarray: (n_furnaces, n_channels) float32 view of the sensor store
+        """
+
+        return self.sensor_store.view(len(self.sensors))
+
+
+    # Private methods
+    def __sensor_store(self, n_furnaces: int) -> SensorStore:
+        """
+        Sensor store of n_furnaces furnaces at their low boundries
+
+        Args:
+            n_furnaces (int): number of furnaces
+
+        Returns:
+            SensorStore: sensor store
+        """
+
+        store = SensorStore(capacity=n_furnaces * len(self.sensors))
+        store.add_layout(self.sensors, n_furnaces)
+
+        return store
+
+
+    def __select(self, indices) -> np.ndarray:
+        """
+        Boolean furnace mask
+
+        Args:
+            indices (list): furnace indices, all furnaces if None
+
+        Returns:
+            numpy.ndarray: furnace mask
+        """
+
+        mask = np.zeros(len(self.furnace_ids), dtype=bool)
+        if indices is None:
+            mask[:] = True
+        else:
+            mask[indices] = True
+
+        return mask
+
+
+    def __load_profiles(self) -> None:
+        """
+        Fetch calibration profile of every distinct calibration seed
+        """
+
+        layout = [(sensor.sensor_type, bot, top) for sensor, bot, top in
+                  zip(self.sensors, self.sensor_bot_boundry.tolist(), self.sensor_top_boundry.tolist())]
+        seeds, self.profile_index = np.unique(self.calibration_seeds, return_inverse=True)
+        self.profile_table = np.stack([self.calibration_cache.get_profile(layout, seed, self.calibration_ticks)
+                                       for seed in seeds.tolist()])
+
+
+    # Public methods
+    def rows(self, furnace_ids: list) -> np.ndarray:
+        """
+        Row indices of furnace ids
+
+        Args:
+            furnace_ids (list): furnace ids
+
+        Returns:
+            numpy.ndarray: row index per furnace id, -1 for unknown ids
+        """
+
+        furnace_ids = np.asarray(furnace_ids, dtype=np.int64)
+
+        if not len(self.furnace_ids):
+            return np.full(len(furnace_ids), -1, dtype=np.int64)
+
+        if self.id_order is None:
+            self.id_order = np.argsort(self.furnace_ids, kind='stable')
+
+        sorted_ids = self.furnace_ids[self.id_order]
+        positions = np.minimum(np.searchsorted(sorted_ids, furnace_ids), len(sorted_ids) - 1)
+        rows = self.id_order[positions]
+
+        return np.where(sorted_ids[positions] == furnace_ids, rows, -1)
+
+
+    def reset(self, indices: list = None) -> None:
+        """
+        Reset sensors to the low boundry and set furnaces idle
+
+        Args:
+            indices (list): furnace indices, all furnaces if None
+        """
+
+        mask = self.__select(indices)
+        self.readings[mask] = self.sensor_bot_boundry
+        self.process_state[mask] = FurnaceProcessState.FURNACE_IDLE.value
+        self.calibration_tick[mask] = 0
+
+
+    def start_calibration(self, indices: list = None) -> None:
+        """
+        Reset sensors and start calibration ramp
+
+        Args:
+            indices (list): furnace indices, all furnaces if None
+        """
+
+        self.reset(indices)
+        self.process_state[self.__select(indices)] = FurnaceProcessState.FURNACE_CALIBRATION.value
+        self.profile_table = None
+
+
+    def start_steady_state(self, indices: list = None) -> None:
+        """
+        Switch furnaces to steady state without calibration
+
+        Args:
+            indices (list): furnace indices, all furnaces if None
+        """
+
+        self.process_state[self.__select(indices)] = FurnaceProcessState.FURNACE_STEADY_STATE.value
+
+
+    def step(self, indices: list = None) -> np.ndarray:
+        """
+        Advance furnaces by one tick
+
+        Calibrating furnaces stream their readings from the cached
+        calibration profile of their seed, steady-state furnaces read their
+        setpoints plus sensor noise, idle furnaces keep their readings. Only
+        the noise streams of the stepped steady-state furnaces advance.
+        Steady-state furnaces are stepped FLEET_TICK_CHUNK at a time on the
+        preallocated tick buffer.
+
+        Args:
+            indices (list): furnace indices, all furnaces if None
+
+        Returns:
+            numpy.ndarray: (n_furnaces, n_channels) readings
+        """
+
+        if indices is None:
+            indices = np.arange(len(self.furnace_ids))
+        else:
+            indices = np.asarray(indices, dtype=np.int64)
+
+        states = self.process_state[indices]
+        calibrating = indices[states == FurnaceProcessState.FURNACE_CALIBRATION.value]
+        steady = indices[states == FurnaceProcessState.FURNACE_STEADY_STATE.value]
+
+        if calibrating.size:
+            if self.profile_table is None:
+                self.__load_profiles()
+
+            ticks = self.calibration_tick[calibrating]
+            self.readings[calibrating] = self.profile_table[self.profile_index[calibrating], ticks]
+
+            ticks += 1
+            self.calibration_tick[calibrating] = ticks
+            self.process_state[calibrating[ticks >= self.calibration_ticks]] = \
+                FurnaceProcessState.FURNACE_STEADY_STATE.value
+
+        readings = self.readings
+        for start in range(0, steady.size, FLEET_TICK_CHUNK):
+            rows = steady[start:start + FLEET_TICK_CHUNK]
+            values = self.tick_values[:rows.size]
+            np.take(self.setpoints, rows, axis=0, out=values, mode='clip')
+            readings[rows] = self.thermal_noise_bank.apply(values, rows, out=values)
+
+        return readings
+
+
+    def add_furnaces(self,
+                     furnace_ids: list,
+                     calibration_seeds: list,
+                     state: FurnaceProcessState = FurnaceProcessState.FURNACE_STEADY_STATE,
+                     publish_period: float = None,
+                     noise_block_size: int = None) -> list:
+        """
+        Append furnaces to the fleet
+
+        Args:
+            furnace_ids (list): furnace ids, ids already in the fleet are skipped
+            calibration_seeds (list): calibration noise seed per furnace
+            state (FurnaceProcessState): process state of the new furnaces
+            publish_period (float): telemetry publish period in seconds, default period if None
+            noise_block_size (int): noise bank block size for the new fleet size, unchanged if None
+
+        Returns:
+            list: added furnace ids
+        """
+
+        furnace_ids = np.asarray(furnace_ids, dtype=np.int64)
+        new = self.rows(furnace_ids) < 0
+        _, first = np.unique(furnace_ids, return_index=True)
+        new[np.setdiff1d(np.arange(len(furnace_ids)), first)] = False
+        furnace_ids = furnace_ids[new]
+        calibration_seeds = np.asarray(calibration_seeds, dtype=np.int64)[new]
+        n_new = len(furnace_ids)
+        if not n_new:
+            return []
+
+        self.furnace_ids = np.concatenate([self.furnace_ids, furnace_ids])
+        self.sensor_store.reserve(self.sensor_store.size + n_new * len(self.sensors))
+        self.sensor_store.add_layout(self.sensors, n_new)
+        self.process_state = np.concatenate([self.process_state, np.full(n_new, state.value, dtype=np.int8)])
+        self.calibration_tick = np.concatenate([self.calibration_tick, np.zeros(n_new, dtype=np.int32)])
+        self.calibration_seeds = np.concatenate([self.calibration_seeds, calibration_seeds])
+        self.actuator_positions = np.concatenate([
+            self.actuator_positions,
+            np.full((n_new, self.actuator_positions.shape[1]), self.actuator_min_position, dtype=np.float64)
+        ])
+        self.setpoints = np.concatenate([self.setpoints,
+                                         np.tile(self.steady_state_mean.astype(np.float32), (n_new, 1))])
+        self.publish_period = np.concatenate([
+            self.publish_period,
+            np.full(n_new, publish_period or self.default_publish_period, dtype=np.float64)
+        ])
+        self.thermal_noise_bank.add_furnaces(furnace_ids.tolist(), block_size=noise_block_size)
+        self.id_order = None
+        self.profile_table = None
+
+        return furnace_ids.tolist()
+
+
+    def remove_furnaces(self, furnace_ids: list, noise_block_size: int = None) -> list:
+        """
+        Remove furnaces from the fleet
+
+        Args:
+            furnace_ids (list): furnace ids, unknown ids are skipped
+            noise_block_size (int): noise bank block size for the new fleet size, unchanged if None
+
+        Returns:
+            list: removed furnace ids
+        """
+
+        rows = self.rows(furnace_ids)
+        rows = np.unique(rows[rows >= 0])
+        if not rows.size:
+            return []
+
+        removed = self.furnace_ids[rows].tolist()
+        keep = np.ones(len(self.furnace_ids), dtype=bool)
+        keep[rows] = False
+
+        self.furnace_ids = self.furnace_ids[keep]
+        self.sensor_store.remove(np.repeat(keep, len(self.sensors)))
+        self.process_state = self.process_state[keep]
+        self.calibration_tick = self.calibration_tick[keep]
+        self.calibration_seeds = self.calibration_seeds[keep]
+        self.actuator_positions = self.actuator_positions[keep]
+        self.setpoints = self.setpoints[keep]
+        self.publish_period = self.publish_period[keep]
+        self.thermal_noise_bank.remove_furnaces(keep, block_size=noise_block_size)
+        self.id_order = None
+        self.profile_table = None
+
+        return removed
+
+
+    def set_publish_period(self, furnace_ids: list, period: float) -> int:
+        """
+        Change telemetry publish period, takes effect after the next publish
+
+        Args:
+            furnace_ids (list): furnace ids, all furnaces if None
+            period (float): publish period in seconds
+
+        Returns:
+            int: number of updated furnaces
+        """
+
+        if furnace_ids is None:
+            rows = np.arange(len(self.furnace_ids))
+        else:
+            rows = self.rows(furnace_ids)
+            rows = rows[rows >= 0]
+
+        self.publish_period[rows] = period
+
+        return len(rows)
+
+
+    def apply_commands(self, records: np.ndarray) -> int:
+        """
+        Apply batched actuator and setpoint commands as one vectorized update
+
+        Commands of unknown furnaces, actuators or channels and non-finite
+        values are rejected, actuator positions are clipped to the actuator
+        limits. When several commands hit the same actuator or setpoint the
+        last one wins.
+
+        Args:
+            records (numpy.ndarray): modules.command_batch.COMMAND_RECORD_DTYPE records
+
+        Returns:
+            int: number of applied commands
+        """
+
+        furnace_ids = records['furnace_id'].astype(np.int64)
+        targets = records['target']
+        indices = records['index'].astype(np.int64)
+        values = records['value'].astype(np.float64)
+
+        broadcast = furnace_ids == COMMAND_ALL_FURNACES
+        rows = np.where(broadcast, 0, self.rows(furnace_ids))
+        valid = (rows >= 0) & np.isfinite(values)
+
+        applied = 0
+        for target, array in ((COMMAND_TARGET_ACTUATOR, self.actuator_positions),
+                              (COMMAND_TARGET_SETPOINT, self.setpoints)):
+            selected = np.flatnonzero(valid & (targets == target) & (indices < array.shape[1]))
+            if not selected.size:
+                continue
+            applied += selected.size
+
+            target_values = values[selected]
+            if target == COMMAND_TARGET_ACTUATOR:
+                np.clip(target_values, self.actuator_min_position, self.actuator_max_position, out=target_values)
+
+            # Expand commands addressing every furnace to one cell per furnace
+            counts = np.where(broadcast[selected], array.shape[0], 1)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            cell_rows = np.where(np.repeat(broadcast[selected], counts), offsets, np.repeat(rows[selected], counts))
+            cells = cell_rows * array.shape[1] + np.repeat(indices[selected], counts)
+
+            # Last command per cell wins
+            _, last = np.unique(cells[::-1], return_index=True)
+            last = cells.size - 1 - last
+            array.reshape(-1)[cells[last]] = np.repeat(target_values, counts)[last]
+
+        return applied
+
+
+    def save(self, path: str) -> None:
+        """
+        Save fleet state to a checkpoint file
+
+        Args:
+            path (str): checkpoint file path
+        """
+
+        thermal_arrays, thermal_meta = self.thermal_noise_bank.get_state()
+
+        arrays = {
+            "furnace_ids":self.furnace_ids,
+            "readings":self.readings,
+            "process_state":self.process_state,
+            "calibration_tick":self.calibration_tick,
+            "calibration_seeds":self.calibration_seeds,
+            "actuator_positions":self.actuator_positions,
+            "setpoints":self.setpoints,
+            "publish_period":self.publish_period
+        }
+        arrays.update({f"thermal_noise.{name}":array for name, array in thermal_arrays.items()})
+
+        meta = {
+            "sensor_labels":self.sensor_labels,
+            "clock":self.clock.now(),
+            "thermal_noise":thermal_meta
+        }
+
+        save_checkpoint(path, arrays, meta)
+
+
+    def restore(self, path: str) -> None:
+        """
+        Restore fleet state from a checkpoint file
+
+        The state arrays are memory-mapped copy-on-write views of the file,
+        so restoring costs the same for one furnace and for thousands; only
+        the readings are copied into the sensor store.
+
+        Args:
+            path (str): checkpoint file path
+        """
+
+        arrays, meta = load_checkpoint(path)
+        if meta["sensor_labels"] != self.sensor_labels:
+            raise ValueError(f"Checkpoint {path} sensor layout does not match the fleet")
+
+        self.furnace_ids = arrays["furnace_ids"]
+        self.sensor_store = self.__sensor_store(len(self.furnace_ids))
+        self.readings[:] = arrays["readings"]
+        self.process_state = arrays["process_state"]
+        self.calibration_tick = arrays["calibration_tick"]
+        self.calibration_seeds = arrays["calibration_seeds"]
+        self.actuator_positions = arrays["actuator_positions"]
+        # Checkpoints written before setpoints existed run at the steady-state mean
+        self.setpoints = arrays.get("setpoints", np.tile(self.steady_state_mean, (len(self.furnace_ids), 1)))
+        if self.setpoints.dtype != np.float32:
+            self.setpoints = self.setpoints.astype(np.float32)
+        self.publish_period = arrays.get("publish_period",
+                                         np.full(len(self.furnace_ids), self.default_publish_period))
+        self.id_order = None
+        self.clock.time = meta["clock"]
+        self.profile_table = None
+
+        bank_arrays = {name[len("thermal_noise."):]:array for name, array in arrays.items()
+                       if name.startswith("thermal_noise.")}
+        self.thermal_noise_bank.set_state(bank_arrays, meta["thermal_noise"])
+
+        logger.info(f"Restored {len(self.furnace_ids)} furnaces from {path}")
@@ -0,0 +1,328 @@
+import json
+import math
+import os
+import socketserver
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from modules.fleet import FurnaceProcessState
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+FLEET_CONTROL_OPS = ('add', 'remove', 'scale', 'set_rate', 'status')
+
+FLEET_CONTROL_STATES = {
+    "idle":FurnaceProcessState.FURNACE_IDLE,
+    "calibration":FurnaceProcessState.FURNACE_CALIBRATION,
+    "steady_state":FurnaceProcessState.FURNACE_STEADY_STATE
+}
+
+
+class FleetController:
+    """
+    Runtime fleet scaling
+
+    Control requests from the MQTT network thread and the control socket
+    are queued and the tick loop applies them between two ticks, so the
+    fleet state arrays grow and shrink without locking the tick loop.
+
+    Requests are JSON objects:
+        {"op": "add", "count": 100, "rate": 2.0, "state": "steady_state"}
+        {"op": "add", "furnace_ids": [7, 8]}
+        {"op": "remove", "furnace_ids": [7]} or {"op": "remove", "count": 100}
+        {"op": "scale", "furnaces": 10000}
+        {"op": "set_rate", "rate": 10.0, "furnace_ids": [7]}
+        {"op": "status"}
+    Rates are publish rates in Hz, furnaces without furnace_ids are all
+    furnaces, count removes the newest furnaces.
+    """
+
+    def __init__(self,
+                 fleet,
+                 calibration_seeds,
+                 noise_block_size,
+                 on_resize=None,
+                 max_furnaces: int = 100000,
+                 extra_ops: dict = None) -> None:
+        """FleetController class constructor
+
+        Args:
+            fleet (modules.fleet.FurnaceFleet): controlled fleet
+            calibration_seeds (callable): calibration_seeds(furnace_ids) -> calibration seed per furnace
+            noise_block_size (callable): noise_block_size(n_furnaces) -> noise bank block size
+            on_resize (callable): called from the tick loop after the fleet size changed, may be None
+            max_furnaces (int): largest fleet size
+            extra_ops (dict): further op name to handler(request) -> result dict, applied like the fleet ops
+        """
+
+        self.fleet = fleet
+        self.calibration_seeds = calibration_seeds
+        self.noise_block_size = noise_block_size
+        self.on_resize = on_resize
+        self.max_furnaces = max_furnaces
+        self.extra_ops = extra_ops or {}
+
+        self.__requests = deque()
+        self.__server = None
+        self.__server_thread = None
+
+
+    # Private methods
+    def __period(self, rate) -> float:
+        """
+        Publish period of a publish rate
+
+        Args:
+            rate (float): publish rate in Hz, None for the fleet default
+
+        Returns:
+            float: period in seconds, None for the fleet default
+        """
+
+        if rate is None:
+            return None
+        if not (math.isfinite(float(rate)) and float(rate) > 0.0):
+            raise ValueError(f"Publish rate must be a positive finite number: {rate}")
+
+        return 1.0 / float(rate)
+
+
+    def __add(self, request: dict) -> dict:
+        """
+        Add furnaces
+
+        Args:
+            request (dict): add request
+
+        Returns:
+            dict: result
+        """
+
+        # Every argument is checked before the fleet changes, a rejected
+        # request must leave the fleet and the tick jobs in sync
+        if "furnace_ids" in request:
+            furnace_ids = [int(furnace_id) for furnace_id in request["furnace_ids"]]
+        else:
+            count = int(request["count"])
+            if count < 0:
+                raise ValueError(f"Furnace count must not be negative: {count}")
+            first = int(self.fleet.furnace_ids.max()) + 1 if len(self.fleet.furnace_ids) else 0
+            furnace_ids = list(range(first, first + count))
+
+        if len(self.fleet.furnace_ids) + len(furnace_ids) > self.max_furnaces:
+            raise ValueError(f"Fleet is limited to {self.max_furnaces} furnaces")
+
+        state = request.get("state", "steady_state")
+        if state not in FLEET_CONTROL_STATES:
+            raise ValueError(f"Unknown furnace state: {state}, expected one of {tuple(FLEET_CONTROL_STATES)}")
+        publish_period = self.__period(request.get("rate"))
+        calibration_seeds = self.calibration_seeds(furnace_ids)
+        noise_block_size = self.noise_block_size(len(self.fleet.furnace_ids) + len(furnace_ids))
+
+        added = self.fleet.add_furnaces(
+            furnace_ids=furnace_ids,
+            calibration_seeds=calibration_seeds,
+            state=FLEET_CONTROL_STATES[state],
+            publish_period=publish_period,
+            noise_block_size=noise_block_size
+        )
+
+        return {"added":len(added)}
+
+
+    def __remove(self, request: dict) -> dict:
+        """
+        Remove furnaces
+
+        Args:
+            request (dict): remove request
+
+        Returns:
+            dict: result
+        """
+
+        if "furnace_ids" in request:
+            furnace_ids = [int(furnace_id) for furnace_id in request["furnace_ids"]]
+        else:
+            count = int(request["count"])
+            if count < 0:
+                raise ValueError(f"Furnace count must not be negative: {count}")
+            count = min(count, len(self.fleet.furnace_ids))
+            furnace_ids = self.fleet.furnace_ids[len(self.fleet.furnace_ids) - count:].tolist()
+
+        removed = self.fleet.remove_furnaces(
+            furnace_ids=furnace_ids,
+            noise_block_size=self.noise_block_size(max(1, len(self.fleet.furnace_ids) - len(furnace_ids)))
+        )
+
+        return {"removed":len(removed)}
+
+
+    def __status(self) -> dict:
+        """
+        Fleet size and publish rates
+
+        Returns:
+            dict: status
+        """
+
+        rates, counts = np.unique(np.round(1.0 / self.fleet.publish_period, 6), return_counts=True)
+        states = np.bincount(self.fleet.process_state, minlength=len(FLEET_CONTROL_STATES))
+
+        return {
+            "rates":{str(rate):int(count) for rate, count in zip(rates.tolist(), counts.tolist())},
+            "states":{name:int(states[state.value]) for name, state in FLEET_CONTROL_STATES.items()}
+        }
+
+
+    def __handle(self, request: dict) -> dict:
+        """
+        Apply one control request
+
+        Args:
+            request (dict): control request
+
+        Returns:
+            dict: result
+        """
+
+        op = request.get("op")
+        n_furnaces = len(self.fleet.furnace_ids)
+
+        if op == 'add':
+            result = self.__add(request)
+        elif op == 'remove':
+            result = self.__remove(request)
+        elif op == 'scale':
+            if int(request["furnaces"]) < 0:
+                raise ValueError(f"Fleet size must not be negative: {request['furnaces']}")
+            delta = int(request["furnaces"]) - n_furnaces
+            if delta > 0:
+                result = self.__add(dict(request, count=delta))
+            else:
+                result = self.__remove({"count":-delta})
+        elif op == 'set_rate':
+            result = {"updated":self.fleet.set_publish_period(furnace_ids=request.get("furnace_ids"),
+                                                              period=self.__period(float(request["rate"])))}
+        elif op == 'status':
+            result = self.__status()
+        elif op in self.extra_ops:
+            result = self.extra_ops[op](request)
+        else:
+            raise ValueError(f"Unknown fleet control op: {op}, "
+                             f"expected one of {FLEET_CONTROL_OPS + tuple(self.extra_ops)}")
+
+        if len(self.fleet.furnace_ids) != n_furnaces and self.on_resize is not None:
+            self.on_resize()
+
+        return dict(result, op=op, ok=True, furnaces=len(self.fleet.furnace_ids))
+
+
+    # Public methods
+    def submit(self, request: dict) -> Future:
+        """
+        Queue a control request, safe to call from any thread
+
+        Args:
+            request (dict): control request
+
+        Returns:
+            concurrent.futures.Future: result dict, set by the tick loop
+        """
+
+        future = Future()
+        self.__requests.append((request, future))
+
+        return future
+
+
+    def apply(self) -> int:
+        """
+        Apply the queued control requests, called from the tick loop
+
+        Returns:
+            int: number of applied requests
+        """
+
+        applied = 0
+        while self.__requests:
+            request, future = self.__requests.popleft()
+            try:
+                result = self.__handle(request)
+                logger.info(f"Fleet control {request}: {result}")
+            except (ValueError, KeyError, TypeError) as err:
+                result = {"op":request.get("op"), "ok":False, "error":repr(err)}
+                logger.error(f"Fleet control {request} failed: {err!r}")
+            if "correlation_id" in request:
+                result["correlation_id"] = request["correlation_id"]
+            future.set_result(result)
+            applied += 1
+
+        return applied
+
+
+    def start_socket(self, path: str, timeout: float = 10.0) -> None:
+        """
+        Serve control requests on a local socket, one JSON request and
+        one JSON reply per line
+
+        Args:
+            path (str): unix socket path
+            timeout (float): time to wait for the tick loop to apply a request
+        """
+
+        if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+            logger.error("Unix sockets are not supported on this platform, control socket disabled")
+            return
+
+        controller = self
+
+        class ControlHandler(socketserver.StreamRequestHandler):
+            """
+            Control socket connection handler
+            """
+
+            def handle(self) -> None:
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError("Control request is not a JSON object")
+                        result = controller.submit(request).result(timeout=timeout)
+                    except ValueError as err:
+                        result = {"ok":False, "error":repr(err)}
+                    except FutureTimeoutError:
+                        result = {"ok":False, "error":"Request not applied within the timeout"}
+                    self.wfile.write(json.dumps(result).encode() + b'\n')
+
+        if os.path.exists(path):
+            os.remove(path)
+
+        self.__server = socketserver.ThreadingUnixStreamServer(path, ControlHandler)
+        self.__server.daemon_threads = True
+        self.__server_thread = threading.Thread(target=self.__server.serve_forever, name='fleet-control', daemon=True)
+        self.__server_thread.start()
+        logger.info(f"Fleet control socket listening on {path}")
+
+
+    def stop(self) -> None:
+        """
+        Stop the control socket
+        """
+
+        if self.__server is None:
+            return
+
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__server_thread.join()
+        os.remove(self.__server.server_address)
+        self.__server = None
@@ -0,0 +1,252 @@
+import json
+import threading
+from time import monotonic, monotonic_ns, sleep
+
+from modules.log_manager import logger
+try:
+    import numpy as np
+    import paho.mqtt.client as mqtt
+except ImportError:
+    logger.error("Module numpy or paho-mqtt not found. Please use pip install -r requirements.txt")
+    raise
+
+
+# Service topic status of the first telemetry message after a correlated command
+TELEMETRY_STATUS = 'telemetry'
+
+
+def parse_command(payload: bytes) -> tuple:
+    """
+    Parse a command payload
+
+    A command is either a bare integer or a JSON object
+    {"command": int, "correlation_id": str, "sent": monotonic ns}.
+
+    Args:
+        payload (bytes): MQTT payload
+
+    Returns:
+        tuple: (command, correlation id or None, sender timestamp or None)
+    """
+
+    text = payload.decode()
+    try:
+        return int(text), None, None
+    except ValueError:
+        pass
+
+    command = json.loads(text)
+
+    return int(command["command"]), command.get("correlation_id"), command.get("sent")
+
+
+def command_argument(payload: bytes, key: str):
+    """
+    Argument of a JSON object command, e.g. {"command": 208, "duration": 30}
+
+    Args:
+        payload (bytes): MQTT payload
+        key (str): argument name
+
+    Returns:
+        Any: argument value, None for a bare integer command or a missing argument
+    """
+
+    command = json.loads(payload.decode())
+    if not isinstance(command, dict):
+        return None
+
+    return command.get(key)
+
+
+def correlated_reply(status, correlation_id: str, command_sent: int, received: int, message: str = None) -> str:
+    """
+    Status reply of a correlated command
+
+    Args:
+        status (int | str): status code
+        correlation_id (str): command correlation id
+        command_sent (int): sender monotonic timestamp of the command in ns
+        received (int): simulator monotonic timestamp of the command in ns
+        message (str): human readable status
+
+    Returns:
+        str: JSON reply
+    """
+
+    reply = {
+        "status":status,
+        "correlation_id":correlation_id,
+        "command_sent":command_sent,
+        "received":received,
+        "sent":monotonic_ns()
+    }
+    if message is not None:
+        reply["message"] = message
+
+    return json.dumps(reply)
+
+
+def latency_summary(latencies_ns: list) -> dict:
+    """
+    Latency distribution in milliseconds
+
+    Args:
+        latencies_ns (list): latencies in ns
+
+    Returns:
+        dict: count, mean, p50, p90, p99 and max
+    """
+
+    if not latencies_ns:
+        return {"count":0}
+
+    values = np.asarray(latencies_ns, dtype=np.float64) / 1e6
+    p50, p90, p99, maximum = np.percentile(values, [50, 90, 99, 100])
+
+    return {
+        "count":len(latencies_ns),
+        "mean":round(float(values.mean()), 3),
+        "p50":round(p50, 3),
+        "p90":round(p90, 3),
+        "p99":round(p99, 3),
+        "max":round(maximum, 3)
+    }
+
+
+class LatencyProbe:
+    """
+    Command round-trip latency probe
+
+    Sends correlated commands at a fixed rate and measures command to
+    acknowledgement and command to first telemetry latency from the
+    correlated replies on the service topic. Timestamps are monotonic, so
+    the simulator part of the latency is only meaningful when probe and
+    simulator share the host.
+    """
+
+    def __init__(self,
+                 broker: str,
+                 port: int,
+                 username: str,
+                 password: str,
+                 alias: str,
+                 command_topic: str,
+                 status_topic: str) -> None:
+        """LatencyProbe class constructor
+
+        Args:
+            broker (str): broker host
+            port (int): broker port
+            username (str): broker user
+            password (str): broker password
+            alias (str): MQTT client id, prefix of the correlation ids
+            command_topic (str): simulator command topic
+            status_topic (str): simulator service topic
+        """
+
+        self.broker = broker
+        self.port = port
+        self.username = username
+        self.password = password
+        self.alias = alias
+        self.command_topic = command_topic
+        self.status_topic = status_topic
+
+        self.__sent = {}
+        self.__acks = {}
+        self.__telemetry = {}
+        self.__simulator = []
+        self.__lock = threading.Lock()
+
+
+    # Private methods
+    def __on_message(self, client, userdata, message) -> None:
+        """
+        Service topic callback
+
+        Args:
+            client (_type_): mqtt client
+            userdata (_type_): mqtt user data
+            message (_type_): mqtt message
+        """
+
+        received = monotonic_ns()
+        try:
+            reply = json.loads(message.payload.decode())
+        except ValueError:
+            return
+        if not isinstance(reply, dict):
+            return
+
+        correlation_id = reply.get("correlation_id")
+        with self.__lock:
+            sent = self.__sent.get(correlation_id)
+            if sent is None:
+                return
+
+            if reply.get("status") == TELEMETRY_STATUS:
+                self.__telemetry.setdefault(correlation_id, received - sent)
+            elif correlation_id not in self.__acks:
+                self.__acks[correlation_id] = received - sent
+                if "received" in reply and "sent" in reply:
+                    self.__simulator.append(reply["sent"] - reply["received"])
+
+
+    # Public methods
+    def run(self, command: int, rate: float, count: int, timeout: float) -> dict:
+        """
+        Send commands and collect the replies
+
+        Args:
+            command (int): command code
+            rate (float): commands per second
+            count (int): number of commands
+            timeout (float): time to wait for outstanding replies after the last command
+
+        Returns:
+            dict: latency report
+        """
+
+        client = mqtt.Client(self.alias)
+        client.username_pw_set(username=self.username, password=self.password)
+        client.on_message = self.__on_message
+        client.connect(host=self.broker, port=self.port)
+        client.subscribe(topic=self.status_topic, qos=1)
+        client.loop_start()
+
+        period = 1.0 / rate
+        start = monotonic()
+        for index in range(count):
+            delay = start + index * period - monotonic()
+            if delay > 0:
+                sleep(delay)
+
+            correlation_id = f"{self.alias}-{index}"
+            sent = monotonic_ns()
+            with self.__lock:
+                self.__sent[correlation_id] = sent
+            client.publish(topic=self.command_topic,
+                           payload=json.dumps({"command":command, "correlation_id":correlation_id, "sent":sent}),
+                           qos=1)
+
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
+            with self.__lock:
+                if len(self.__acks) == count and len(self.__telemetry) == count:
+                    break
+            sleep(0.01)
+
+        client.loop_stop()
+        client.disconnect()
+
+        with self.__lock:
+            return {
+                "commands":count,
+                "rate":rate,
+                "ack_latency_ms":latency_summary(list(self.__acks.values())),
+                "telemetry_latency_ms":latency_summary(list(self.__telemetry.values())),
+                "simulator_latency_ms":latency_summary(self.__simulator),
+                "missing_acks":count - len(self.__acks),
+                "missing_telemetry":count - len(self.__telemetry)
+            }
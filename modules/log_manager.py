@@ -1,10 +1,39 @@
 import sys
 
-try:
-    from loguru import logger
-except ImportError:
-    print("Module loguru not found. Please use pip install -r requirements.txt")
-    sys.exit(1)
+
+class LazyLogger():
+    """
+    loguru logger proxy
+
+    loguru is imported on the first attribute access, so importing this
+    module (and every module logging through it) stays cheap.
+    """
+
+    def __init__(self) -> None:
+        self.__logger = None
+
+
+    def __getattr__(self, name: str):
+        """
+        Resolve attribute on the real loguru logger
+
+        Args:
+            name (str): attribute name
+        """
+
+        if self.__logger is None:
+            try:
+                from loguru import logger as loguru_logger
+            except ImportError:
+                print("Module loguru not found. Please use pip install -r requirements.txt")
+                sys.exit(1)
+
+            self.__logger = loguru_logger
+
+        return getattr(self.__logger, name)
+
+
+logger = LazyLogger()
 
 
 class LogManager():
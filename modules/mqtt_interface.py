@@ -1,8 +1,13 @@
+import threading
 from enum import Enum
 from modules.log_manager import logger
+from modules.outbound_queue import OutboundQueue, OutboundPublisher, OverflowPolicy
+from modules.spool import SegmentSpool, SpoolReplayer
 try:
     import paho.mqtt.client as mqtt
     import paho.mqtt.publish as pub
+    from paho.mqtt.packettypes import PacketTypes
+    from paho.mqtt.properties import Properties
 except ImportError:
     logger.error("Module paho-mqtt not found. Please use pip install -r requirements.txt")
     raise
@@ -34,6 +39,140 @@ class MqttStatusRetCodes(Enum):
     MQTT_RET_FAILED = 1
 
 
+class MqttProtocol(Enum):
+    """
+    MQTT protocol versions
+
+    Args:
+        Enum (_type_): protocol name to paho protocol enum
+    """
+
+    MQTT_V311   = 'v311'
+    MQTT_V5     = 'v5'
+
+
+# MQTT v5 user property carrying the furnace id
+FURNACE_ID_PROPERTY = 'furnace_id'
+
+# Set while a message callback runs on a paho network thread
+_callback_context = threading.local()
+
+
+class TopicAliasRegistry:
+    """
+    MQTT v5 outgoing topic alias registry
+
+    The first message of a topic carries the full topic and registers an
+    alias, later messages carry the alias and an empty topic. Aliases are
+    only valid for one network connection, the registry is reset on every
+    connect with the broker's topic alias maximum.
+    """
+
+    def __init__(self) -> None:
+        """TopicAliasRegistry class constructor"""
+
+        self.maximum = 0
+        self.__aliases = {}
+        self.__lock = threading.Lock()
+
+
+    # Public methods
+    def reset(self, maximum: int) -> None:
+        """
+        Forget every alias
+
+        Args:
+            maximum (int): broker topic alias maximum, 0 disables aliases
+        """
+
+        with self.__lock:
+            self.maximum = maximum
+            self.__aliases = {}
+
+
+    def resolve(self, topic: str) -> tuple:
+        """
+        Topic and alias to publish a message with
+
+        Args:
+            topic (str): MQTT topic
+
+        Returns:
+            tuple: (publish topic, topic alias or None)
+        """
+
+        with self.__lock:
+            alias = self.__aliases.get(topic)
+            if alias is not None:
+                return "", alias
+
+            if len(self.__aliases) >= self.maximum:
+                return topic, None
+
+            alias = len(self.__aliases) + 1
+            self.__aliases[topic] = alias
+
+            return topic, alias
+
+
+def in_message_callback() -> bool:
+    """
+    Whether the calling thread runs a message callback, a paho network
+    thread must never block on a full outbound queue
+
+    Returns:
+        bool: True inside a message callback
+    """
+
+    return getattr(_callback_context, 'active', False)
+
+
+def guard_callback(callback_func):
+    """
+    Wrap a message callback, messages sent by the callback are never
+    blocked on a full outbound queue
+
+    Args:
+        callback_func (_type_): MQTT callback function
+
+    Returns:
+        _type_: wrapped MQTT callback function
+    """
+
+    def callback(client, userdata, message) -> None:
+        _callback_context.active = True
+        try:
+            callback_func(client, userdata, message)
+        finally:
+            _callback_context.active = False
+
+    return callback
+
+
+def get_furnace_id(message, command_topic: str = None) -> int:
+    """
+    Furnace id of an MQTT v5 message
+
+    Args:
+        message (paho.mqtt.client.MQTTMessage): received message
+        command_topic (str): command topic, the suffix of a per-furnace
+            command topic <command_topic>/<furnace id> is the furnace id
+
+    Returns:
+        int: furnace id of the per-furnace topic or user property, None if missing
+    """
+
+    if command_topic is not None and message.topic.startswith(f"{command_topic}/"):
+        return int(message.topic[len(command_topic) + 1:])
+
+    properties = getattr(message, 'properties', None)
+    for key, value in getattr(properties, 'UserProperty', []):
+        if key == FURNACE_ID_PROPERTY:
+            return int(value)
+
+    return None
+
+
 # MQTT interface main class
 class MqttInterface:
     """
@@ -46,7 +185,20 @@ class MqttInterface:
                  username: str,
                  password: str,
                  alias: str,
-                 service_topic) -> None:
+                 service_topic,
+                 max_queue_depth: int = 10000,
+                 max_inflight: int = 100,
+                 overflow_policy: str = OverflowPolicy.BLOCK.value,
+                 block_timeout: float = 1.0,
+                 spool_dir: str = None,
+                 spool_segment_size: int = 16 * 1024 * 1024,
+                 spool_replay_rate: float = 500.0,
+                 protocol: str = MqttProtocol.MQTT_V311.value,
+                 furnace_id: int = None,
+                 telemetry_topics: list = None,
+                 telemetry_qos: int = 1,
+                 message_expiry_interval: int = None,
+                 shared_group: str = None) -> None:
 
         self.broker = broker
         self.port = port
@@ -55,6 +207,33 @@ class MqttInterface:
         self.alias = alias
         self.client = None
         self.service_topic = service_topic
+        self.max_inflight = max_inflight
+
+        # MQTT v5 options, ignored with MQTT 3.1.1
+        self.protocol = mqtt.MQTTv5 if MqttProtocol(protocol) == MqttProtocol.MQTT_V5 else mqtt.MQTTv311
+        self.furnace_id = furnace_id
+        self.telemetry_topics = frozenset(telemetry_topics or [])
+        self.telemetry_qos = telemetry_qos
+        self.message_expiry_interval = message_expiry_interval
+        self.shared_group = shared_group
+        self.command_topic = None
+        self.topic_aliases = TopicAliasRegistry()
+
+        self.outbound_queue = OutboundQueue(max_depth=max_queue_depth,
+                                            policy=OverflowPolicy(overflow_policy),
+                                            block_timeout=block_timeout)
+        self.outbound_publisher = None
+        self.connected = False
+
+        # Messages sent while disconnected are spooled to disk if spool_dir is set
+        self.spool = None
+        self.spool_replayer = None
+        if spool_dir is not None:
+            self.spool = SegmentSpool(spool_dir=spool_dir, segment_size=spool_segment_size)
+            self.spool_replayer = SpoolReplayer(spool=self.spool,
+                                                outbound_queue=self.outbound_queue,
+                                                is_connected=lambda: self.connected,
+                                                rate=spool_replay_rate)
 
 
     # Private methods
@@ -66,25 +245,38 @@ class MqttInterface:
             message (str): _description_
         """
 
-        pub.single(topic=self.service_topic,
-                   payload=str(message),
-                   hostname=self.broker,
-                   port=self.port,
-                   retain=False,
-                   qos=1,
-                   keepalive=60,
-                   auth=None,
-                   tls=None,
-                   protocol=mqtt.MQTTv311,
-                   transport="tcp")
-
-
-    def __on_connect(self, client, userdata, flags, rc: int) -> None:
+        try:
+            pub.single(topic=self.service_topic,
+                       payload=str(message),
+                       hostname=self.broker,
+                       port=self.port,
+                       retain=False,
+                       qos=1,
+                       keepalive=60,
+                       auth=None,
+                       tls=None,
+                       protocol=self.protocol,
+                       transport="tcp")
+        except OSError as err:
+            logger.error(f"Status message not published: {err}")
+
+
+    def __on_connect(self, client, userdata, flags, rc: int, properties=None) -> None:
         """
         On connect callback
+
+        Args:
+            client (_type_): mqtt client
+            userdata (_type_): mqtt user data
+            flags (dict): connect flags
+            rc (int): mqtt return code
+            properties (paho.mqtt.properties.Properties): CONNACK properties, MQTT v5 only
         """
 
         if rc == 0:
+            self.topic_aliases.reset(getattr(properties, 'TopicAliasMaximum', 0))
+            self.outbound_publisher.reset_inflight()
+            self.connected = True
             message_on_connect = {
                 "status":MqttStatusCodes.MQTT_CONNECTED.value
             }
@@ -94,7 +286,7 @@ class MqttInterface:
             logger.info(f"Error occured during connection to the: {self.broker}")
 
 
-    def __on_disconnect(self, client, userdata, rc: int) -> None:
+    def __on_disconnect(self, client, userdata, rc: int, properties=None) -> None:
         """
         On disconnect callback
 
@@ -102,8 +294,12 @@ class MqttInterface:
             client (_type_): mqtt client
             userdata (_type_): mqtt user data
             rc (int): mqtt return code
+            properties (paho.mqtt.properties.Properties): DISCONNECT properties, MQTT v5 only
         """
 
+        self.connected = False
+        self.topic_aliases.reset(0)
+
         status = None
         if rc != 0:
             status = MqttStatusCodes.MQTT_UNEXPECTED_DISCONNECT.value
@@ -118,7 +314,71 @@ class MqttInterface:
         logger.info(f"Disconnected from {self.broker} with code: {rc}")
 
 
-    def __on_subscribe(self, client, userdata, mid, granted_qos: int) -> None:
+    def __on_publish(self, client, userdata, mid) -> None:
+        """
+        On publish callback
+
+        Args:
+            client (_type_): mqtt client
+            userdata (_type_): mqtt user data
+            mid (_type_): mqtt message id
+        """
+
+        self.outbound_publisher.on_publish(mid)
+
+
+    def __publish(self, topic: str, payload, furnace_id: int = None):
+        """
+        Hand message to paho, called by the outbound publisher thread
+
+        Args:
+            topic (str): MQTT topic
+            payload (str | bytes): message payload
+            furnace_id (int): furnace id user property, the connection furnace id if None
+
+        Returns:
+            tuple: (paho.mqtt.client.MQTTMessageInfo, True if paho keeps the message until it is acknowledged)
+        """
+
+        if self.protocol != mqtt.MQTTv5:
+            info = self.client.publish(topic=topic,
+                                       payload=payload,
+                                       qos=1,
+                                       retain=False)
+            return info, info.rc in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN)
+
+        qos = 1
+        properties = Properties(PacketTypes.PUBLISH)
+        if furnace_id is None:
+            furnace_id = self.furnace_id
+        if furnace_id is not None:
+            properties.UserProperty = (FURNACE_ID_PROPERTY, str(furnace_id))
+
+        if topic in self.telemetry_topics:
+            # paho resends unacknowledged messages as they were built, an
+            # empty aliased topic is only valid on the connection it was
+            # registered on, so only QoS 0 telemetry, which is never
+            # resent, uses topic aliases
+            qos = self.telemetry_qos
+            if qos == 0:
+                topic, alias = self.topic_aliases.resolve(topic)
+                if alias is not None:
+                    properties.TopicAlias = alias
+            if self.message_expiry_interval is not None:
+                properties.MessageExpiryInterval = self.message_expiry_interval
+
+        info = self.client.publish(topic=topic,
+                                   payload=payload,
+                                   qos=qos,
+                                   retain=False,
+                                   properties=properties)
+
+        # QoS 0 messages are never kept, QoS 1 messages are kept unless
+        # paho's queue is full
+        return info, qos > 0 and info.rc in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN)
+
+
+    def __on_subscribe(self, client, userdata, mid, granted_qos: int, properties=None) -> None:
         """
         On subscribe callback
 
@@ -126,7 +386,8 @@ class MqttInterface:
             client (_type_): mqtt client
             userdata (_type_): mqtt user data
             mid (_type_): mqtt message id
-            granted_qos (int): mqtt granted qos
+            granted_qos (int): mqtt granted qos, reason codes with MQTT v5
+            properties (paho.mqtt.properties.Properties): SUBACK properties, MQTT v5 only
         """
 
         logger.info("Client successfully subscribed to the topic")
@@ -134,7 +395,7 @@ class MqttInterface:
         logger.info(f"Userdata: {userdata}")
 
 
-    def __on_unsubscribe(self, client, userdata, mid) -> None:
+    def __on_unsubscribe(self, client, userdata, mid, properties=None, reason_codes=None) -> None:
         """
         On unsubscribe callback
 
@@ -142,6 +403,8 @@ class MqttInterface:
             client (_type_): mqtt client
             userdata (_type_): mqtt user data
             mid (_type_): mqtt message id
+            properties (paho.mqtt.properties.Properties): UNSUBACK properties, MQTT v5 only
+            reason_codes (list): unsubscribe reason codes, MQTT v5 only
         """
 
         message_on_unsub = {
@@ -159,15 +422,23 @@ class MqttInterface:
         Init MQTT client
 
         Args:
-            topic (list): MQTT topic
+            topic (list): MQTT topic, connect without subscribing if None
             callback_func (_type_): MQTT callback function
         """
 
-        self.client = mqtt.Client(self.alias)
+        self.client = mqtt.Client(self.alias, protocol=self.protocol)
         self.client.on_connect = self.__on_connect
         self.client.on_disconnect = self.__on_disconnect
         self.client.on_subscribe = self.__on_subscribe
         self.client.on_unsubscribe = self.__on_unsubscribe
+        self.client.on_publish = self.__on_publish
+        self.client.max_inflight_messages_set(self.max_inflight)
+        self.client.max_queued_messages_set(self.max_inflight)
+
+        self.outbound_publisher = OutboundPublisher(outbound_queue=self.outbound_queue,
+                                                    publish_func=self.__publish,
+                                                    max_inflight=self.max_inflight,
+                                                    is_connected=lambda: self.connected)
 
         logger.info(f"Connecting to broker: {self.broker}")
 
@@ -175,28 +446,110 @@ class MqttInterface:
                                     password=self.password)
 
         self.client.connect(host=self.broker, port=self.port)
-        self.client.subscribe(topic=topic, qos=1)
-        self.client.message_callback_add(sub=topic, callback=callback_func)
+
+        # Shards of the same shared group split the commands between them,
+        # the per-furnace command topics reach every shard so that the owner
+        # of an addressed command always receives it
+        if topic is not None:
+            subscription = topic
+            if self.protocol == mqtt.MQTTv5 and self.shared_group:
+                subscription = f"$share/{self.shared_group}/{topic}"
+                self.command_topic = topic
+                self.client.subscribe(topic=f"{topic}/+", qos=1)
+                self.client.message_callback_add(sub=f"{topic}/+", callback=guard_callback(callback_func))
+            self.client.subscribe(topic=subscription, qos=1)
+            self.client.message_callback_add(sub=topic, callback=guard_callback(callback_func))
 
         logger.info("Connected")
         logger.info("Init client infinite loop")
 
         self.client.loop_start()
+        self.outbound_publisher.start()
+        if self.spool_replayer is not None:
+            self.spool_replayer.start()
+
+
+    def subscribe_topic(self, topic: str, callback_func) -> None:
+        """
+        Subscribe to a further topic of the initialized client
+
+        Args:
+            topic (str): MQTT topic
+            callback_func (_type_): MQTT callback function
+        """
+
+        self.client.subscribe(topic=topic, qos=1)
+        self.client.message_callback_add(sub=topic, callback=guard_callback(callback_func))
 
 
-    def send_message(self, msg: str, topic: str) -> None:
+    def send_message(self, msg: str, topic: str, furnace_id: int = None) -> bool:
         """
-        Send MQTT message
+        Send MQTT message through the bounded outbound queue, or to the
+        offline spool while the broker is disconnected. Messages sent from a
+        message callback are dropped instead of blocking on a full queue
 
         Args:
             msg (str): message
             topic (str): MQTT topic
+            furnace_id (int): furnace id user property with MQTT v5, the connection furnace id if None
+
+        Returns:
+            bool: False if the message was dropped by the overflow policy
+        """
+
+        if self.spool is not None and not self.connected:
+            self.spool.append(topic=topic, payload=msg, furnace_id=furnace_id)
+            return True
+
+        timeout = 0 if in_message_callback() else None
+
+        return self.outbound_queue.put(topic=topic, payload=msg, timeout=timeout, furnace_id=furnace_id)
+
+
+    def forward_command(self, message, furnace_id: int) -> bool:
+        """
+        Forward a command received on the shared command subscription to the
+        per-furnace command topic, where the shard owning the furnace gets it
+
+        Args:
+            message (paho.mqtt.client.MQTTMessage): received command
+            furnace_id (int): addressed furnace id
+
+        Returns:
+            bool: True if the command was forwarded
+        """
+
+        if self.command_topic is None or message.topic != self.command_topic:
+            return False
+
+        return self.send_message(msg=message.payload,
+                                 topic=f"{self.command_topic}/{furnace_id}",
+                                 furnace_id=furnace_id)
+
+
+    def get_queue_stats(self) -> dict:
         """
+        Outbound queue depth, in-flight and drop counters
 
-        self.client.publish(topic=topic,
-                            payload=msg,
-                            qos=1,
-                            retain=False)
+        Returns:
+            dict: counters
+        """
+
+        if self.outbound_publisher is None:
+            stats = {
+                "queue_depth":self.outbound_queue.depth(),
+                "enqueued":self.outbound_queue.enqueued,
+                "dropped":self.outbound_queue.dropped,
+                "coalesced":self.outbound_queue.coalesced
+            }
+        else:
+            stats = self.outbound_publisher.stats()
+
+        if self.spool is not None:
+            stats["spooled"] = self.spool.spooled
+            stats["replayed"] = self.spool.replayed
+
+        return stats
 
 
     def unsub_from_topic(self, topic: list) -> int:
@@ -223,5 +576,12 @@ class MqttInterface:
         Close MQTT connection
         """
 
+        if self.spool_replayer is not None:
+            self.spool_replayer.stop()
+        self.outbound_publisher.stop()
+        logger.info(f"Outbound queue stats: {self.get_queue_stats()}")
+        if self.spool is not None:
+            self.spool.close()
+
         self.client.loop_stop()
         self.client.disconnect()
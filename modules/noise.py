@@ -0,0 +1,776 @@
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+class WhiteNoise:
+    """
+    Gaussian white noise model
+    """
+
+    # Models without state keep no per-furnace state arrays in the bank
+    stateful = False
+
+    def __init__(self, sigma) -> None:
+        """WhiteNoise class constructor
+
+        Args:
+            sigma (float | list): standard deviation, scalar or per channel
+        """
+
+        self.sigma = np.asarray(sigma, dtype=np.float64)
+
+
+    def draw(self, rng, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Draw innovations of every furnace stream
+
+        Args:
+            rng (CounterGenerator): furnace streams of the model
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) innovations
+        """
+
+        return rng.standard_normal(block_size, n_channels) * self.sigma
+
+
+    def filter(self, innovations: np.ndarray, state: np.ndarray) -> np.ndarray:
+        """
+        Turn innovations of all furnaces into noise
+
+        Args:
+            innovations (numpy.ndarray): (block_size, n_furnaces, n_channels) innovations
+            state (numpy.ndarray): (n_furnaces, 0) unused
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) noise block
+        """
+
+        return innovations
+
+
+class UniformIntNoise:
+    """
+    Uniform integer noise model (random.randint replacement, bounds inclusive)
+    """
+
+    stateful = False
+
+    def __init__(self, low: int, high: int) -> None:
+        """UniformIntNoise class constructor
+
+        Args:
+            low (int): lowest value
+            high (int): highest value
+        """
+
+        self.low = low
+        self.high = high
+
+
+    def draw(self, rng, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Draw innovations of every furnace stream
+
+        Args:
+            rng (CounterGenerator): furnace streams of the model
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) innovations
+        """
+
+        return rng.integers(self.low, self.high, block_size, n_channels)
+
+
+    def filter(self, innovations: np.ndarray, state: np.ndarray) -> np.ndarray:
+        """
+        Turn innovations of all furnaces into noise
+
+        Args:
+            innovations (numpy.ndarray): (block_size, n_furnaces, n_channels) innovations
+            state (numpy.ndarray): (n_furnaces, 0) unused
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) noise block
+        """
+
+        return innovations
+
+
+class Ar1Noise:
+    """
+    AR(1) colored noise model: x[t] = phi * x[t - 1] + e[t]
+    """
+
+    stateful = True
+
+    def __init__(self, phi: float, sigma) -> None:
+        """Ar1Noise class constructor
+
+        Args:
+            phi (float): autoregression coefficient, |phi| < 1
+            sigma (float | list): innovation standard deviation, scalar or per channel
+        """
+
+        if not -1.0 < phi < 1.0:
+            raise ValueError("phi must be within (-1, 1)")
+
+        self.phi = phi
+        self.sigma = np.asarray(sigma, dtype=np.float64)
+
+
+    def draw(self, rng, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Draw innovations of every furnace stream
+
+        Args:
+            rng (CounterGenerator): furnace streams of the model
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) innovations
+        """
+
+        return rng.standard_normal(block_size, n_channels) * self.sigma
+
+
+    def filter(self, innovations: np.ndarray, state: np.ndarray) -> np.ndarray:
+        """
+        Turn innovations of all furnaces into noise
+
+        Args:
+            innovations (numpy.ndarray): (block_size, n_furnaces, n_channels) innovations, filtered in place
+            state (numpy.ndarray): (n_furnaces, n_channels) last value, updated in place
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) noise block
+        """
+
+        # One vector operation per tick row, all furnaces and channels at once
+        previous = state
+        for row in innovations:
+            row += self.phi * previous
+            previous = row
+        state[:] = previous
+
+        return innovations
+
+
+class ColdJunctionError:
+    """
+    Thermocouple cold-junction compensation error model
+
+    The cold junction temperature is measured by the cold weld sensor, its
+    measurement error slowly drifts (AR(1)) and is added to the reading of
+    every thermocouple channel, including the cold weld sensor itself.
+    """
+
+    stateful = True
+
+    def __init__(self, channels: list, phi: float, sigma: float) -> None:
+        """ColdJunctionError class constructor
+
+        Args:
+            channels (list): indices of the thermocouple channels
+            phi (float): drift autoregression coefficient, |phi| < 1
+            sigma (float): drift innovation standard deviation
+        """
+
+        self.channels = list(channels)
+        self.drift = Ar1Noise(phi=phi, sigma=sigma)
+
+
+    def draw(self, rng, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Draw innovations of every furnace stream
+
+        Args:
+            rng (CounterGenerator): furnace streams of the model
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, 1) drift innovations
+        """
+
+        return self.drift.draw(rng, block_size, 1)
+
+
+    def filter(self, innovations: np.ndarray, state: np.ndarray) -> np.ndarray:
+        """
+        Turn innovations of all furnaces into noise
+
+        Args:
+            innovations (numpy.ndarray): (block_size, n_furnaces, 1) drift innovations
+            state (numpy.ndarray): (n_furnaces, n_channels) drift state, the first column is used
+
+        Returns:
+            numpy.ndarray: (block_size, n_furnaces, n_channels) noise block
+        """
+
+        drift = self.drift.filter(innovations, state[:, :1])
+
+        block = np.zeros(innovations.shape[:2] + state.shape[1:])
+        block[:, :, self.channels] = drift
+
+        return block
+
+
+class QuantizationNoise:
+    """
+    Quantization of the output reading to the converter resolution
+    """
+
+    def __init__(self, step: float) -> None:
+        """QuantizationNoise class constructor
+
+        Args:
+            step (float): converter resolution
+        """
+
+        if step <= 0:
+            raise ValueError("step must be positive")
+
+        self.step = step
+
+
+    def quantize(self, values: np.ndarray) -> np.ndarray:
+        """
+        Quantize readings in place
+
+        Args:
+            values (numpy.ndarray): readings
+
+        Returns:
+            numpy.ndarray: quantized readings
+        """
+
+        values /= self.step
+        np.round(values, out=values)
+        values *= self.step
+
+        return values
+
+
+class CounterGenerator:
+    """
+    Counter-based generator of many independent streams
+
+    Word i of a stream is the SplitMix64 mix of key + i * gamma, so a stream
+    is read from any position without stepping through the words before
+    it: the numbers of a tick do not depend on how many ticks are drawn at
+    once, and the streams of every furnace are drawn by one vector
+    operation.
+    """
+
+    def __init__(self, keys: np.ndarray, counters: np.ndarray) -> None:
+        """CounterGenerator class constructor
+
+        Args:
+            keys (numpy.ndarray): uint64 key per stream, see stream_keys()
+            counters (numpy.ndarray): uint64 first drawn tick per stream
+        """
+
+        self.keys = keys
+        self.counters = counters
+
+
+    # Private methods
+    def __words(self, block_size: int, width: int) -> np.ndarray:
+        """
+        Raw words of block_size ticks of every stream
+
+        Args:
+            block_size (int): number of ticks
+            width (int): number of words per tick
+
+        Returns:
+            numpy.ndarray: (block_size, n_streams, width) uint64 words
+        """
+
+        # key + (counter * width + i) * gamma, split into a per-stream base
+        # and a per-word offset shared by every stream
+        base = self.counters * np.uint64(width)
+        base *= SPLITMIX64_GAMMA
+        base += self.keys
+        offsets = np.arange(block_size * width, dtype=np.uint64)
+        offsets *= SPLITMIX64_GAMMA
+        words = offsets.reshape(block_size, 1, width) + base[:, None]
+
+        return mix64(words, scratch=np.empty_like(words))
+
+
+    # Public methods
+    def random(self, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Uniform numbers in [0, 1)
+
+        Args:
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_streams, n_channels) numbers
+        """
+
+        values = (self.__words(block_size, n_channels) >> np.uint64(11)).astype(np.float64)
+        values *= 2.0 ** -53
+
+        return values
+
+
+    def standard_normal(self, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Standard normal numbers, single precision Box-Muller on one word per
+        pair of numbers: 24 bits give the radius and 24 bits the angle
+        (|x| < 5.8)
+
+        Args:
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_streams, n_channels) numbers
+        """
+
+        words = self.__words(block_size, (n_channels + 1) // 2)
+
+        radius = (words >> np.uint64(40)).astype(np.float32)
+        radius += np.float32(0.5)
+        radius *= np.float32(2.0 ** -24)
+        np.log(radius, out=radius)
+        radius *= np.float32(-2.0)
+        np.sqrt(radius, out=radius)
+
+        words &= np.uint64(0xFFFFFF)
+        angle = words.astype(np.float32)
+        angle *= np.float32(2.0 * np.pi * 2.0 ** -24)
+
+        values = np.empty(words.shape + (2,), dtype=np.float32)
+        np.cos(angle, out=values[..., 0])
+        np.sin(angle, out=values[..., 1])
+        values *= radius[..., None]
+
+        return values.reshape(block_size, len(self.keys), -1)[:, :, :n_channels]
+
+
+    def integers(self, low: int, high: int, block_size: int, n_channels: int) -> np.ndarray:
+        """
+        Uniform integers, bounds inclusive
+
+        Args:
+            low (int): lowest value
+            high (int): highest value
+            block_size (int): number of ticks
+            n_channels (int): number of channels
+
+        Returns:
+            numpy.ndarray: (block_size, n_streams, n_channels) integers
+        """
+
+        values = self.random(block_size, n_channels)
+        values *= high - low + 1
+
+        return np.floor(values).astype(np.int64) + low
+
+
+class NoiseBank:
+    """
+    Block-generated noise for one channel group of several furnaces
+
+    Every furnace and model owns a counter-based stream keyed by (seed,
+    stream, model, furnace id), so the noise of a furnace depends neither
+    on the other furnaces of the bank nor on the block size. Noise of every
+    furnace is drawn block_size ticks at a time and every furnace has its
+    own read cursor, so a furnace stream only advances when the furnace is
+    stepped. The block is kept in single precision and stateless models
+    keep no per-furnace state.
+    """
+
+    def __init__(self,
+                 models: list,
+                 n_channels: int,
+                 furnace_ids: list,
+                 seed: int,
+                 stream: int = 0,
+                 block_size: int = 256) -> None:
+        """NoiseBank class constructor
+
+        Args:
+            models (list): noise models, additive models are summed, QuantizationNoise is applied last
+            n_channels (int): number of channels in the group
+            furnace_ids (list): furnace ids
+            seed (int): root seed, random entropy if None
+            stream (int): channel group stream number
+            block_size (int): number of pre-drawn ticks
+        """
+
+        self.models = [model for model in models if not isinstance(model, QuantizationNoise)]
+        self.quantizers = [model for model in models if isinstance(model, QuantizationNoise)]
+        self.n_channels = n_channels
+        self.furnace_ids = list(furnace_ids)
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.stream = stream
+        self.block_size = block_size
+
+        # Stream key per model and furnace, and the stream tick following
+        # the block of each furnace
+        self.keys = self.__keys(self.furnace_ids)
+        self.counters = np.zeros(len(self.furnace_ids), dtype=np.uint64)
+
+        # Model states after the block and at its first row, see __rewind()
+        self.states = [np.zeros((len(self.furnace_ids), self.__state_width(model))) for model in self.models]
+        self.block_states = [state.copy() for state in self.states]
+        self.block = np.zeros((block_size, len(self.furnace_ids), n_channels), dtype=np.float32)
+        self.cursors = np.full(len(self.furnace_ids), block_size, dtype=np.int64)
+
+        # Gather buffer of apply(), grown to the largest stepped row count
+        self.__noise = np.empty((0, n_channels), dtype=np.float32)
+
+
+    # Private methods
+    def __state_width(self, model) -> int:
+        """
+        Number of state columns of a model per furnace
+
+        Args:
+            model: noise model
+
+        Returns:
+            int: n_channels for stateful models, else 0
+        """
+
+        return self.n_channels if model.stateful else 0
+
+
+    def __keys(self, furnace_ids: list) -> np.ndarray:
+        """
+        Stream keys of furnaces
+
+        Args:
+            furnace_ids (list): furnace ids
+
+        Returns:
+            numpy.ndarray: (n_models, n_furnaces) uint64 keys
+        """
+
+        keys = [stream_keys(self.seed_sequence, self.stream, model_index, furnace_ids)
+                for model_index in range(len(self.models))]
+
+        return np.array(keys, dtype=np.uint64).reshape(len(self.models), len(furnace_ids))
+
+
+    def __refill(self, rows: np.ndarray) -> None:
+        """
+        Draw the next block of the furnace streams
+
+        Args:
+            rows (numpy.ndarray): furnace indices
+        """
+
+        block = np.zeros((self.block_size, len(rows), self.n_channels))
+        for model, keys, state, block_state in zip(self.models, self.keys, self.states, self.block_states):
+            rows_state = state[rows]
+            block_state[rows] = rows_state
+            innovations = model.draw(CounterGenerator(keys[rows], self.counters[rows]),
+                                     self.block_size, self.n_channels)
+            block += model.filter(innovations, rows_state)
+            state[rows] = rows_state
+
+        self.block[:, rows] = block
+        self.counters[rows] += np.uint64(self.block_size)
+        self.cursors[rows] = 0
+
+
+    def __rewind(self) -> None:
+        """
+        Move the streams and the model states back to the first unserved
+        row of every furnace block and drop the blocks, so a furnace reads
+        the same noise whenever its block is redrawn
+        """
+
+        served = self.cursors
+        first = self.counters - np.uint64(len(self.block))
+        partial = served < len(self.block)
+
+        # Furnaces served up to the same row are re-filtered together
+        for cursor in np.unique(served[partial]).tolist():
+            rows = np.flatnonzero(served == cursor)
+            for model, keys, state, block_state in zip(self.models, self.keys, self.states, self.block_states):
+                rows_state = block_state[rows].copy()
+                if cursor:
+                    model.filter(model.draw(CounterGenerator(keys[rows], first[rows]), cursor, self.n_channels),
+                                 rows_state)
+                state[rows] = rows_state
+
+        self.counters = np.where(partial, first + served.astype(np.uint64), self.counters)
+        self.cursors = np.full(len(self.furnace_ids), len(self.block), dtype=np.int64)
+
+
+    def __drop_blocks(self, block_size: int) -> None:
+        """
+        Drop the unserved rest of every block, the next step of a furnace
+        refills its stream from where it was served
+
+        Args:
+            block_size (int): number of pre-drawn ticks from now on
+        """
+
+        self.__rewind()
+        self.block_size = block_size
+        self.block_states = [state.copy() for state in self.states]
+        self.block = np.zeros((self.block_size, len(self.furnace_ids), self.n_channels), dtype=np.float32)
+        self.cursors = np.full(len(self.furnace_ids), self.block_size, dtype=np.int64)
+
+
+    def __split_states(self, states: np.ndarray, widths: list) -> list:
+        """
+        Split checkpointed model states into the state of every model
+
+        Args:
+            states (numpy.ndarray): (n_furnaces, state columns) states, or (n_models, n_furnaces, n_channels) of old checkpoints
+            widths (list): number of state columns of every model
+
+        Returns:
+            list: (n_furnaces, width) state per model
+        """
+
+        if states.ndim == 3:
+            return [state[:, :width] for state, width in zip(states, widths)]
+
+        bounds = np.cumsum([0] + widths).tolist()
+
+        return [states[:, start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+    # Public methods
+    def add_furnaces(self, furnace_ids: list, block_size: int = None) -> None:
+        """
+        Add furnace streams, the blocks of the other furnaces are kept
+        unless the block size changes
+
+        Args:
+            furnace_ids (list): furnace ids
+            block_size (int): number of pre-drawn ticks from now on, unchanged if None
+        """
+
+        furnace_ids = list(furnace_ids)
+        n_new = len(furnace_ids)
+
+        self.furnace_ids += furnace_ids
+        self.keys = np.concatenate([self.keys, self.__keys(furnace_ids)], axis=1)
+        self.counters = np.concatenate([self.counters, np.zeros(n_new, dtype=np.uint64)])
+        self.states = [np.concatenate([state, np.zeros((n_new, state.shape[1]))]) for state in self.states]
+        self.block_states = [np.concatenate([state, np.zeros((n_new, state.shape[1]))])
+                             for state in self.block_states]
+        self.block = np.concatenate([self.block, np.zeros((len(self.block), n_new, self.n_channels),
+                                                          dtype=np.float32)], axis=1)
+        self.cursors = np.concatenate([self.cursors, np.full(n_new, len(self.block), dtype=np.int64)])
+
+        if block_size is not None and block_size != len(self.block):
+            self.__drop_blocks(block_size)
+
+
+    def remove_furnaces(self, keep: np.ndarray, block_size: int = None) -> None:
+        """
+        Remove furnace streams, the blocks of the other furnaces are kept
+        unless the block size changes
+
+        Args:
+            keep (numpy.ndarray): boolean mask of the furnaces that stay
+            block_size (int): number of pre-drawn ticks from now on, unchanged if None
+        """
+
+        self.furnace_ids = [self.furnace_ids[index] for index in np.flatnonzero(keep).tolist()]
+        self.keys = self.keys[:, keep]
+        self.counters = self.counters[keep]
+        self.states = [state[keep] for state in self.states]
+        self.block_states = [state[keep] for state in self.block_states]
+        self.block = self.block[:, keep]
+        self.cursors = self.cursors[keep]
+
+        if block_size is not None and block_size != len(self.block):
+            self.__drop_blocks(block_size)
+
+
+    def apply(self, signal, rows=None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Add noise of the next tick of the furnaces to the signal and
+        quantize the result, only the streams of these furnaces advance
+
+        The noise is gathered into a buffer kept by the bank, callers
+        stepping many furnaces pass bounded row chunks and an out buffer so
+        a tick allocates no channel-sized arrays.
+
+        Args:
+            signal (numpy.ndarray): (n_rows, n_channels) or (n_channels,) noiseless signal
+            rows (numpy.ndarray): furnace indices, all furnaces if None
+            out (numpy.ndarray): (n_rows, n_channels) result buffer, may be the signal, allocated if None
+
+        Returns:
+            numpy.ndarray: (n_rows, n_channels) noisy reading
+        """
+
+        if rows is None:
+            rows = np.arange(len(self.furnace_ids))
+
+        exhausted = rows[self.cursors[rows] >= self.block_size]
+        if exhausted.size:
+            self.__refill(exhausted)
+
+        if len(self.__noise) < len(rows):
+            self.__noise = np.empty((len(rows), self.n_channels), dtype=np.float32)
+
+        # Row (cursor, furnace) of the block, gathered without a temporary
+        cursors = self.cursors[rows]
+        flat = cursors * len(self.furnace_ids)
+        flat += rows
+        noise = np.take(self.block.reshape(-1, self.n_channels), flat, axis=0,
+                        out=self.__noise[:len(rows)], mode="clip")
+        values = np.add(signal, noise, out=out)
+        cursors += 1
+        self.cursors[rows] = cursors
+        for quantizer in self.quantizers:
+            quantizer.quantize(values)
+
+        return values
+
+
+    def get_state(self) -> tuple:
+        """
+        Export bank state for checkpointing
+
+        Returns:
+            tuple: (name to numpy array dict, JSON serializable metadata dict)
+        """
+
+        # States of the models side by side, (n_furnaces, state columns)
+        empty = np.zeros((len(self.furnace_ids), 0))
+
+        arrays = {
+            "furnace_ids":np.asarray(self.furnace_ids, dtype=np.int64),
+            "counters":self.counters,
+            "cursors":self.cursors,
+            "block":self.block,
+            "model_states":np.concatenate(self.states, axis=1) if self.states else empty,
+            "block_states":np.concatenate(self.block_states, axis=1) if self.block_states else empty
+        }
+
+        meta = {
+            "entropy":str(self.seed_sequence.entropy),
+            "stream":self.stream,
+            "block_size":self.block_size
+        }
+
+        return arrays, meta
+
+
+    def set_state(self, arrays: dict, meta: dict) -> None:
+        """
+        Restore bank state exported by get_state()
+
+        Arrays are used as they are (no copy), so memory-mapped checkpoint
+        arrays are only read when the bank touches them.
+
+        Args:
+            arrays (dict): name to numpy array dict
+            meta (dict): metadata dict
+        """
+
+        widths = [self.__state_width(model) for model in self.models]
+        model_states = arrays["model_states"]
+
+        # Checkpoints written before the stateless models dropped their
+        # state stack one full-width state per model
+        stacked = model_states.ndim == 3
+        if arrays["block"].shape[2] != self.n_channels or \
+                (len(model_states) != len(self.models) if stacked else model_states.shape[1] != sum(widths)):
+            raise ValueError("Noise bank state does not match the bank configuration")
+
+        self.furnace_ids = arrays["furnace_ids"].tolist()
+        self.seed_sequence = np.random.SeedSequence(int(meta["entropy"]))
+        self.stream = meta["stream"]
+        self.block_size = meta["block_size"]
+        self.block = arrays["block"]
+        if self.block.dtype != np.float32:
+            self.block = self.block.astype(np.float32)
+        self.states = self.__split_states(model_states, widths)
+        self.keys = self.__keys(self.furnace_ids)
+
+        # Checkpoints written before the per-furnace cursors share one cursor
+        if "cursors" in arrays:
+            self.cursors = arrays["cursors"]
+        else:
+            self.cursors = np.full(len(self.furnace_ids), meta["cursor"], dtype=np.int64)
+
+        # Checkpoints of the former per-furnace PCG64 banks carry no stream
+        # counters, their streams continue from the first tick
+        if "counters" in arrays:
+            self.counters = arrays["counters"]
+            self.block_states = self.__split_states(arrays["block_states"], widths)
+        else:
+            self.counters = np.full(len(self.furnace_ids), len(self.block), dtype=np.uint64)
+            self.block_states = [np.zeros_like(state) for state in self.states]
+
+
+# SplitMix64 constants of the counter-based streams
+SPLITMIX64_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+SPLITMIX64_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+SPLITMIX64_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def mix64(words: np.ndarray, scratch: np.ndarray = None) -> np.ndarray:
+    """
+    SplitMix64 output mix, in place
+
+    Args:
+        words (numpy.ndarray): uint64 words
+        scratch (numpy.ndarray): uint64 buffer of the same shape for the shifted words, allocated if None
+
+    Returns:
+        numpy.ndarray: mixed words
+    """
+
+    if scratch is None:
+        scratch = np.empty_like(words)
+
+    for shift, multiplier in ((30, SPLITMIX64_MUL1), (27, SPLITMIX64_MUL2), (31, None)):
+        np.right_shift(words, np.uint64(shift), out=scratch)
+        words ^= scratch
+        if multiplier is not None:
+            words *= multiplier
+
+    return words
+
+
+def stream_keys(seed_sequence, stream: int, model_index: int, furnace_ids: list) -> np.ndarray:
+    """
+    Counter-based stream keys of furnaces
+
+    Args:
+        seed_sequence (numpy.random.SeedSequence): root seed sequence
+        stream (int): channel group stream number
+        model_index (int): noise model index in the bank
+        furnace_ids (list): furnace ids
+
+    Returns:
+        numpy.ndarray: uint64 key per furnace
+    """
+
+    base = np.random.SeedSequence(entropy=seed_sequence.entropy,
+                                  spawn_key=(stream, model_index)).generate_state(1, dtype=np.uint64)
+
+    keys = np.asarray(furnace_ids, dtype=np.int64).astype(np.uint64)
+    keys *= SPLITMIX64_GAMMA
+    keys += base
+
+    return mix64(keys)
@@ -0,0 +1,383 @@
+import threading
+from collections import deque
+from enum import Enum
+from time import monotonic
+
+
+class OverflowPolicy(Enum):
+    """
+    Outbound queue overflow policy enum
+
+    Args:
+        Enum (enum): behaviour of put() on a full queue
+    """
+
+    BLOCK           = 'block'
+    DROP_OLDEST     = 'drop_oldest'
+    DROP_NEWEST     = 'drop_newest'
+    COALESCE        = 'coalesce'
+
+
+class OutboundQueue:
+    """
+    Bounded outbound message queue
+
+    Holds at most max_depth messages. When the queue is full put() blocks
+    for at most block_timeout seconds (BLOCK), evicts the oldest message (DROP_OLDEST), rejects the new one
+    (DROP_NEWEST) or replaces the queued message of the same topic and
+    furnace with the new payload and evicts the oldest message otherwise (COALESCE).
+    """
+
+    def __init__(self,
+                 max_depth: int,
+                 policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 block_timeout: float = 1.0) -> None:
+        """OutboundQueue class constructor
+
+        Args:
+            max_depth (int): maximum number of queued messages
+            policy (OverflowPolicy): overflow policy
+            block_timeout (float): default maximum blocking time of the BLOCK policy
+        """
+
+        if max_depth < 1:
+            raise ValueError("max_depth must be positive")
+
+        self.max_depth = max_depth
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        self.__messages = deque()
+        self.__latest_by_topic = {}
+        self.__condition = threading.Condition()
+
+
+    # Private methods
+    def __append(self, topic: str, payload, furnace_id: int) -> None:
+        """
+        Append message, the condition lock must be held
+
+        Args:
+            topic (str): MQTT topic
+            payload (str | bytes): message payload
+            furnace_id (int): furnace id of the message, None for none
+        """
+
+        entry = [topic, payload, furnace_id]
+        self.__messages.append(entry)
+        self.__latest_by_topic[(topic, furnace_id)] = entry
+        self.enqueued += 1
+        self.__condition.notify_all()
+
+
+    def __popleft(self) -> list:
+        """
+        Remove oldest message, the condition lock must be held
+
+        Returns:
+            list: [topic, payload, furnace_id]
+        """
+
+        entry = self.__messages.popleft()
+        key = (entry[0], entry[2])
+        if self.__latest_by_topic.get(key) is entry:
+            del self.__latest_by_topic[key]
+        self.__condition.notify_all()
+
+        return entry
+
+
+    # Public methods
+    def put(self, topic: str, payload, timeout: float = None, furnace_id: int = None) -> bool:
+        """
+        Queue message according to the overflow policy
+
+        Args:
+            topic (str): MQTT topic
+            payload (str | bytes): message payload
+            timeout (float): maximum blocking time of the BLOCK policy, block_timeout if None
+            furnace_id (int): furnace id of the message, None for none
+
+        Returns:
+            bool: True if the message was queued
+        """
+
+        if timeout is None:
+            timeout = self.block_timeout
+
+        with self.__condition:
+            if len(self.__messages) < self.max_depth:
+                self.__append(topic, payload, furnace_id)
+                return True
+
+            if self.policy == OverflowPolicy.BLOCK:
+                if not self.__condition.wait_for(lambda: len(self.__messages) < self.max_depth, timeout):
+                    self.dropped += 1
+                    return False
+                self.__append(topic, payload, furnace_id)
+                return True
+
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                self.dropped += 1
+                return False
+
+            if self.policy == OverflowPolicy.COALESCE:
+                entry = self.__latest_by_topic.get((topic, furnace_id))
+                if entry is not None:
+                    entry[1] = payload
+                    self.coalesced += 1
+                    return True
+
+            self.__popleft()
+            self.dropped += 1
+            self.__append(topic, payload, furnace_id)
+
+            return True
+
+
+    def get(self, timeout: float = None) -> tuple:
+        """
+        Take oldest message
+
+        Args:
+            timeout (float): maximum waiting time, forever if None
+
+        Returns:
+            tuple: (topic, payload, furnace_id) or None on timeout
+        """
+
+        with self.__condition:
+            if not self.__condition.wait_for(lambda: self.__messages, timeout):
+                return None
+
+            return tuple(self.__popleft())
+
+
+    def wait_empty(self, timeout: float) -> bool:
+        """
+        Wait until every queued message was taken
+
+        Args:
+            timeout (float): maximum waiting time
+
+        Returns:
+            bool: True if the queue is empty
+        """
+
+        with self.__condition:
+            return self.__condition.wait_for(lambda: not self.__messages, timeout)
+
+
+    def depth(self) -> int:
+        """
+        Number of queued messages
+
+        Returns:
+            int: queue depth
+        """
+
+        return len(self.__messages)
+
+
+class OutboundPublisher:
+    """
+    Publisher thread draining an OutboundQueue into a paho client
+
+    At most max_inflight messages are handed to paho and not yet
+    acknowledged (on_publish), so paho's own queue stays bounded as well.
+    Nothing is drained while the client is disconnected: the messages stay
+    in the bounded queue, whose overflow policy applies, and the slots of
+    the messages paho keeps for resending after the reconnect stay held.
+    """
+
+    def __init__(self,
+                 outbound_queue: OutboundQueue,
+                 publish_func,
+                 max_inflight: int,
+                 is_connected=None) -> None:
+        """OutboundPublisher class constructor
+
+        Args:
+            outbound_queue (OutboundQueue): queue to drain
+            publish_func (callable): publish_func(topic, payload, furnace_id) -> (paho MQTTMessageInfo, kept),
+                kept is True if the client holds the message until it is acknowledged, also across reconnects
+            max_inflight (int): maximum number of unacknowledged messages
+            is_connected (callable): connection state, always connected if None
+        """
+
+        self.outbound_queue = outbound_queue
+        self.publish_func = publish_func
+        self.max_inflight = max_inflight
+        self.is_connected = is_connected or (lambda: True)
+
+        self.published = 0
+        self.acknowledged = 0
+        self.publish_errors = 0
+
+        self.__inflight = threading.BoundedSemaphore(max_inflight)
+        self.__inflight_mids = {}
+        self.__early_acks = set()
+        self.__publishing = False
+        self.__mids_lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+
+    # Private methods
+    def __run(self) -> None:
+        """
+        Publisher thread loop
+        """
+
+        while not self.__stop_event.is_set():
+            if not self.is_connected():
+                self.__stop_event.wait(0.1)
+                continue
+
+            if not self.__inflight.acquire(timeout=0.1):
+                continue
+
+            message = self.outbound_queue.get(timeout=0.1)
+            if message is None:
+                self.__inflight.release()
+                continue
+
+            # paho holds its own locks while it calls on_publish, so the
+            # mids lock is not held across publish_func. A message can be
+            # acknowledged before its mid is known here (QoS 0 messages are
+            # acknowledged inside publish_func), such early acks only count
+            # while the call is running.
+            with self.__mids_lock:
+                self.__publishing = True
+            try:
+                info, kept = self.publish_func(*message)
+            except (ValueError, OSError):
+                info, kept = None, False
+
+            with self.__mids_lock:
+                self.__publishing = False
+                early_acks, self.__early_acks = self.__early_acks, set()
+
+                # A message that failed and is not kept by paho is never
+                # acknowledged, e.g. QoS 0 without a connection or a full
+                # paho queue
+                failed = info is None or (info.rc != 0 and not kept)
+                acknowledged = not failed and info.mid in early_acks
+                if not failed and not acknowledged:
+                    self.__inflight_mids[info.mid] = kept
+
+            if failed:
+                self.publish_errors += 1
+                self.__inflight.release()
+                continue
+
+            if info.rc == 0:
+                self.published += 1
+            if acknowledged:
+                self.acknowledged += 1
+                self.__inflight.release()
+
+
+    # Public methods
+    def on_publish(self, mid: int) -> None:
+        """
+        Release the in-flight slot of an acknowledged message
+
+        Args:
+            mid (int): MQTT message id
+        """
+
+        with self.__mids_lock:
+            if mid not in self.__inflight_mids:
+                # Only a message being published can be acknowledged before
+                # its mid is known, any other unknown mid is stale
+                if self.__publishing:
+                    self.__early_acks.add(mid)
+                return
+            del self.__inflight_mids[mid]
+
+        self.acknowledged += 1
+        self.__inflight.release()
+
+
+    def reset_inflight(self) -> None:
+        """
+        Release the in-flight slots of the unacknowledged messages paho does
+        not resend, called on (re)connect since their acknowledgements never
+        arrive; the messages paho keeps are resent and acknowledged on the
+        new connection and hold their slots until then
+        """
+
+        with self.__mids_lock:
+            dropped = [mid for mid, kept in self.__inflight_mids.items() if not kept]
+            for mid in dropped:
+                del self.__inflight_mids[mid]
+            released = len(dropped)
+            self.__early_acks.clear()
+
+        for _ in range(released):
+            self.__inflight.release()
+
+
+    def start(self) -> None:
+        """
+        Start publisher thread
+        """
+
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name='mqtt-outbound', daemon=True)
+        self.__thread.start()
+
+
+    def stop(self, drain_timeout: float = 1.0) -> None:
+        """
+        Stop publisher thread
+
+        Args:
+            drain_timeout (float): time given to publish the queued messages
+        """
+
+        self.outbound_queue.wait_empty(drain_timeout)
+
+        deadline = monotonic() + drain_timeout
+        while self.inflight() and monotonic() < deadline:
+            self.__stop_event.wait(0.01)
+
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
+
+
+    def inflight(self) -> int:
+        """
+        Number of unacknowledged messages
+
+        Returns:
+            int: in-flight messages
+        """
+
+        return len(self.__inflight_mids)
+
+
+    def stats(self) -> dict:
+        """
+        Queue and publisher counters
+
+        Returns:
+            dict: counters
+        """
+
+        return {
+            "queue_depth":self.outbound_queue.depth(),
+            "inflight":self.inflight(),
+            "enqueued":self.outbound_queue.enqueued,
+            "published":self.published,
+            "acknowledged":self.acknowledged,
+            "dropped":self.outbound_queue.dropped,
+            "coalesced":self.outbound_queue.coalesced,
+            "publish_errors":self.publish_errors
+        }
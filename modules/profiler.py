@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+from collections import Counter
+from time import monotonic, strftime
+
+from modules.log_manager import logger
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler of every Python thread
+
+    A background thread samples the stacks of all other threads (main
+    loop, paho network thread and its callbacks, publisher threads) every
+    interval seconds for a fixed duration and writes them in the folded
+    stack format ("thread;outer;...;inner count" per line) read by
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self,
+                 output_dir: str,
+                 duration: float = 10.0,
+                 interval: float = 0.005) -> None:
+        """SamplingProfiler class constructor
+
+        Args:
+            output_dir (str): directory of the written profiles
+            duration (float): default capture time in seconds
+            interval (float): sampling interval in seconds
+        """
+
+        self.output_dir = output_dir
+        self.duration = duration
+        self.interval = interval
+
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__frame_labels = {}
+
+
+    # Private methods
+    def __frame_label(self, code) -> str:
+        """
+        Flamegraph label of a code object
+
+        Args:
+            code (code): frame code object
+
+        Returns:
+            str: "function (file:line)"
+        """
+
+        label = self.__frame_labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.__frame_labels[code] = label
+
+        return label
+
+
+    def __run(self, duration: float, path: str, on_finished) -> None:
+        """
+        Sampling thread loop
+
+        Args:
+            duration (float): capture time in seconds
+            path (str): output file
+            on_finished (callable): on_finished(path, samples), may be None
+        """
+
+        own_ident = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        deadline = monotonic() + duration
+        stop_event = threading.Event()
+
+        while monotonic() < deadline:
+            thread_names = {thread.ident:thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                stacks[(thread_names.get(ident, str(ident)), tuple(codes))] += 1
+            samples += 1
+            stop_event.wait(self.interval)
+
+        # The capture is over even if the profile cannot be written, a new
+        # capture must be possible afterwards
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as profile_file:
+                for (thread_name, codes), count in stacks.items():
+                    frames = ';'.join(self.__frame_label(code) for code in reversed(codes))
+                    profile_file.write(f"{thread_name};{frames} {count}\n")
+        except OSError as err:
+            logger.error(f"Profile not written to {path}: {err}")
+            return
+        finally:
+            with self.__lock:
+                self.__thread = None
+
+        if on_finished is not None:
+            on_finished(path, samples)
+
+
+    # Public methods
+    def start(self, duration: float = None, on_finished=None) -> str:
+        """
+        Start a capture unless one is already running
+
+        Args:
+            duration (float): capture time in seconds, default duration if None
+            on_finished (callable): on_finished(path, samples) called from the profiler thread
+
+        Returns:
+            str: output file path, None if a capture is already running
+        """
+
+        with self.__lock:
+            if self.__thread is not None:
+                return None
+
+            path = os.path.join(self.output_dir, f"profile-{strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded")
+            self.__thread = threading.Thread(target=self.__run, args=(duration or self.duration, path, on_finished),
+                                             name='sampling-profiler', daemon=True)
+            self.__thread.start()
+
+        return path
+
+
+    def is_running(self) -> bool:
+        """
+        Check for a running capture
+
+        Returns:
+            bool: True while a capture is running
+        """
+
+        return self.__thread is not None
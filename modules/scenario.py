@@ -0,0 +1,328 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from time import perf_counter
+
+from modules.clock import SimClock
+from modules.fleet import FurnaceProcessState
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+# Scenario commands and the fleet state they lead to
+SCENARIO_COMMANDS = {
+    "calibration":FurnaceProcessState.FURNACE_CALIBRATION,
+    "manufacturing":FurnaceProcessState.FURNACE_STEADY_STATE,
+    "reset":FurnaceProcessState.FURNACE_IDLE
+}
+
+SCENARIO_FAULTS = ('stuck', 'offset', 'dropout')
+
+SCENARIO_CHECKS = ('final_state', 'calibration_within', 'readings_within_bounds',
+                   'max_bound_violations', 'max_dropped_samples')
+
+SCENARIO_STATES = {
+    "idle":FurnaceProcessState.FURNACE_IDLE.value,
+    "calibration":FurnaceProcessState.FURNACE_CALIBRATION.value,
+    "steady_state":FurnaceProcessState.FURNACE_STEADY_STATE.value
+}
+
+SCENARIO_DEFAULTS = {
+    "furnaces":1,
+    "seed":0,
+    "tick_period":0.1,
+    "calibration_configs":1,
+    "bounds_margin":0.0,
+    "commands":[],
+    "profiles":[],
+    "faults":[],
+    "expect":{}
+}
+
+
+def load_scenario(path: str) -> dict:
+    """
+    Load and validate a scenario file
+
+    Args:
+        path (str): scenario JSON file
+
+    Returns:
+        dict: scenario with defaults filled in
+    """
+
+    with open(path, 'r', encoding='utf-8') as scenario_file:
+        scenario = dict(SCENARIO_DEFAULTS, **json.loads(scenario_file.read()))
+
+    scenario.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    scenario["file"] = path
+
+    if "duration" not in scenario:
+        raise ValueError(f"Scenario {path} has no duration")
+    for command in scenario["commands"]:
+        if command.get("command") not in SCENARIO_COMMANDS:
+            raise ValueError(f"Scenario {path} has an unknown command: {command.get('command')}")
+    for profile in scenario["profiles"]:
+        points = profile.get("points")
+        if "channel" not in profile or not points:
+            raise ValueError(f"Scenario {path} has a profile without channel or points")
+        times = [point[0] for point in points]
+        if times != sorted(times):
+            raise ValueError(f"Scenario {path} has a profile with unordered points")
+    for fault in scenario["faults"]:
+        if fault.get("type") not in SCENARIO_FAULTS:
+            raise ValueError(f"Scenario {path} has an unknown fault: {fault.get('type')}")
+
+    # A scenario without checks would always pass
+    if not scenario["expect"]:
+        raise ValueError(f"Scenario {path} has no expect checks")
+    for check in scenario["expect"]:
+        if check not in SCENARIO_CHECKS:
+            raise ValueError(f"Scenario {path} has an unknown check: {check}, expected one of {SCENARIO_CHECKS}")
+    final_state = scenario["expect"].get("final_state")
+    if final_state is not None and final_state not in SCENARIO_STATES:
+        raise ValueError(f"Scenario {path} has an unknown final state: {final_state}")
+
+    return scenario
+
+
+def _furnace_indices(entry: dict, n_furnaces: int):
+    """
+    Furnace indices of a command or fault
+
+    Args:
+        entry (dict): command or fault
+        n_furnaces (int): number of furnaces
+
+    Returns:
+        list: furnace indices, all furnaces if None
+    """
+
+    indices = entry.get("furnaces")
+    if indices is None:
+        return None
+
+    return [index for index in indices if 0 <= index < n_furnaces]
+
+
+def _percentiles(values: np.ndarray) -> dict:
+    """
+    Latency percentiles in milliseconds
+
+    Args:
+        values (numpy.ndarray): latencies in seconds
+
+    Returns:
+        dict: p50, p99 and max
+    """
+
+    if not values.size:
+        return {"p50":None, "p99":None, "max":None}
+
+    p50, p99, maximum = np.percentile(values, [50, 99, 100]) * 1000.0
+
+    return {"p50":round(p50, 4), "p99":round(p99, 4), "max":round(maximum, 4)}
+
+
+def run_scenario(scenario: dict, fleet_factory) -> dict:
+    """
+    Run one scenario on the accelerated clock
+
+    Args:
+        scenario (dict): scenario from load_scenario()
+        fleet_factory (callable): fleet_factory(seed, furnace_ids, calibration_configs, clock) -> FurnaceFleet
+
+    Returns:
+        dict: throughput, latency and correctness summary
+    """
+
+    clock = SimClock(accelerated=True)
+    n_furnaces = scenario["furnaces"]
+    fleet = fleet_factory(seed=scenario["seed"],
+                          furnace_ids=list(range(n_furnaces)),
+                          calibration_configs=scenario["calibration_configs"],
+                          clock=clock)
+    fleet.reset()
+
+    tick_period = scenario["tick_period"]
+    n_ticks = int(round(scenario["duration"] / tick_period))
+    commands = sorted(scenario["commands"], key=lambda command: command.get("at", 0.0))
+    faults = scenario["faults"]
+    channels = {label:index for index, label in enumerate(fleet.sensor_labels)}
+    profiles = [(np.array([point[0] for point in profile["points"]], dtype=np.float64),
+                 np.array([point[1] for point in profile["points"]], dtype=np.float64),
+                 slice(None) if profile.get("furnaces") is None else _furnace_indices(profile, n_furnaces),
+                 channels.get(profile["channel"], profile["channel"]))
+                for profile in scenario["profiles"]]
+
+    # Calibration stops at the first reading above the top boundry and the
+    # steady-state means may sit above it, the margin widens the bounds check
+    bot = fleet.sensor_bot_boundry - scenario["bounds_margin"]
+    top = fleet.sensor_top_boundry + scenario["bounds_margin"]
+
+    published = np.empty_like(fleet.readings)
+    tick_latency = np.empty(n_ticks, dtype=np.float64)
+    calibrations = []
+    samples = 0
+    dropped_samples = 0
+    bound_violations = 0
+    next_command = 0
+
+    start = perf_counter()
+    for tick in range(n_ticks):
+        tick_start = perf_counter()
+        now = clock.now()
+
+        while next_command < len(commands) and commands[next_command].get("at", 0.0) <= now + 1e-9:
+            command = commands[next_command]
+            indices = _furnace_indices(command, n_furnaces)
+            target = SCENARIO_COMMANDS[command["command"]]
+            if target == FurnaceProcessState.FURNACE_CALIBRATION:
+                fleet.start_calibration(indices)
+                calibrations.append({"at":now, "furnaces":indices, "finished":None})
+            elif target == FurnaceProcessState.FURNACE_STEADY_STATE:
+                fleet.start_steady_state(indices)
+            else:
+                fleet.reset(indices)
+            next_command += 1
+
+        # Setpoint profiles ramp linearly between their points from the
+        # first point on and hold the last setpoint
+        for times, setpoints, rows, column in profiles:
+            if now + 1e-9 >= times[0]:
+                fleet.setpoints[rows, column] = np.interp(now, times, setpoints)
+
+        np.copyto(published, fleet.step())
+
+        for fault in faults:
+            if not fault["at"] <= now < fault["at"] + fault.get("duration", scenario["duration"]):
+                continue
+            rows = slice(None) if fault.get("furnaces") is None else _furnace_indices(fault, n_furnaces)
+            channel = fault.get("channel")
+            column = slice(None) if channel is None else channels.get(channel, channel)
+            if fault["type"] == 'stuck':
+                published[rows, column] = fault["value"]
+            elif fault["type"] == 'offset':
+                published[rows, column] += fault["value"]
+            else:
+                published[rows, column] = np.nan
+
+        missing = np.isnan(published)
+        dropped_samples += int(missing.sum())
+        samples += published.size - int(missing.sum())
+        with np.errstate(invalid='ignore'):
+            bound_violations += int(((published < bot) | (published > top)).sum())
+
+        clock.sleep(tick_period)
+
+        steady = fleet.process_state == FurnaceProcessState.FURNACE_STEADY_STATE.value
+        for calibration in calibrations:
+            rows = slice(None) if calibration["furnaces"] is None else calibration["furnaces"]
+            if calibration["finished"] is None and steady[rows].all():
+                calibration["finished"] = clock.now()
+
+        tick_latency[tick] = perf_counter() - tick_start
+    wall_time = perf_counter() - start
+
+    calibration_latency = [None if calibration["finished"] is None else round(calibration["finished"] -
+                                                                               calibration["at"], 6)
+                           for calibration in calibrations]
+
+    checks = []
+    expect = scenario["expect"]
+    if "final_state" in expect:
+        passed = bool((fleet.process_state == SCENARIO_STATES[expect["final_state"]]).all())
+        checks.append({"check":"final_state", "passed":passed, "expected":expect["final_state"]})
+    if "calibration_within" in expect:
+        passed = bool(calibration_latency) and all(latency is not None and latency <= expect["calibration_within"]
+                                                   for latency in calibration_latency)
+        checks.append({"check":"calibration_within", "passed":passed, "expected":expect["calibration_within"],
+                       "actual":calibration_latency})
+    if "readings_within_bounds" in expect:
+        passed = (bound_violations == 0) == expect["readings_within_bounds"]
+        checks.append({"check":"readings_within_bounds", "passed":passed,
+                       "expected":expect["readings_within_bounds"], "actual":bound_violations})
+    if "max_bound_violations" in expect:
+        passed = bound_violations <= expect["max_bound_violations"]
+        checks.append({"check":"max_bound_violations", "passed":passed,
+                       "expected":expect["max_bound_violations"], "actual":bound_violations})
+    if "max_dropped_samples" in expect:
+        passed = dropped_samples <= expect["max_dropped_samples"]
+        checks.append({"check":"max_dropped_samples", "passed":passed,
+                       "expected":expect["max_dropped_samples"], "actual":dropped_samples})
+
+    return {
+        "name":scenario["name"],
+        "file":scenario["file"],
+        "passed":all(check["passed"] for check in checks),
+        "throughput":{
+            "furnaces":n_furnaces,
+            "ticks":n_ticks,
+            "samples":samples,
+            "dropped_samples":dropped_samples,
+            "wall_time":round(wall_time, 6),
+            "ticks_per_s":round(n_ticks / wall_time, 1) if wall_time else None,
+            "samples_per_s":round(samples / wall_time, 1) if wall_time else None,
+            "speedup":round(clock.now() / wall_time, 1) if wall_time else None
+        },
+        "latency":{
+            "tick_ms":_percentiles(tick_latency),
+            "calibration_s":calibration_latency
+        },
+        "checks":checks
+    }
+
+
+def run_scenario_file(path: str, fleet_factory) -> dict:
+    """
+    Load and run one scenario, errors are reported as a failed scenario
+
+    Args:
+        path (str): scenario JSON file
+        fleet_factory (callable): see run_scenario()
+
+    Returns:
+        dict: scenario summary
+    """
+
+    try:
+        return run_scenario(load_scenario(path), fleet_factory)
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as err:
+        return {"name":os.path.splitext(os.path.basename(path))[0], "file":path, "passed":False, "error":repr(err)}
+
+
+def run_batch(scenario_dir: str, fleet_factory, workers: int = None) -> dict:
+    """
+    Run every scenario file of a directory in a process pool
+
+    Args:
+        scenario_dir (str): directory of scenario JSON files
+        fleet_factory (callable): picklable fleet factory, see run_scenario()
+        workers (int): number of worker processes, CPU count if None
+
+    Returns:
+        dict: batch report
+    """
+
+    paths = sorted(os.path.join(scenario_dir, name) for name in os.listdir(scenario_dir)
+                   if name.endswith('.json'))
+
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(partial(run_scenario_file, fleet_factory=fleet_factory), paths))
+    wall_time = perf_counter() - start
+
+    passed = sum(1 for summary in summaries if summary["passed"])
+
+    return {
+        "scenarios":summaries,
+        "total":len(summaries),
+        "passed":passed,
+        "failed":len(summaries) - passed,
+        "wall_time":round(wall_time, 6)
+    }
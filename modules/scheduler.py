@@ -0,0 +1,275 @@
+import threading
+from time import monotonic
+
+from modules.clock import SimClock
+
+
+class ScheduledJob:
+    """
+    Periodic job handle of the TimingWheelScheduler
+    """
+
+    __slots__ = ('group', 'payload', 'period_ticks', 'due_tick', 'slot', 'active')
+
+    def __init__(self, group: str, payload, period_ticks: int, due_tick: int) -> None:
+        """ScheduledJob class constructor
+
+        Args:
+            group (str): job group, jobs of a group due in the same tick run as one batch
+            payload (any): value handed to the group callback, e.g. a furnace index
+            period_ticks (int): period in scheduler ticks
+            due_tick (int): next due tick
+        """
+
+        self.group = group
+        self.payload = payload
+        self.period_ticks = period_ticks
+        self.due_tick = due_tick
+        self.slot = None
+        self.active = True
+
+
+class TimingWheelScheduler:
+    """
+    Multi-rate periodic job scheduler on a hierarchical timing wheel
+
+    Level 0 has one slot per tick of the resolution, every further level
+    has slots spanning a whole revolution of the level below and is
+    cascaded down when the lower level wraps, so insert, remove and expire
+    are O(1). All jobs of a group that are due in the same tick are handed
+    to the group callback in one call, so a group callback can update every
+    due device with one vectorized step.
+    """
+
+    def __init__(self,
+                 resolution: float = 0.001,
+                 wheel_bits: int = 8,
+                 levels: int = 4,
+                 clock: SimClock = None) -> None:
+        """TimingWheelScheduler class constructor
+
+        Args:
+            resolution (float): tick length in seconds
+            wheel_bits (int): log2 of the number of slots per level
+            levels (int): number of wheel levels
+            clock (modules.clock.SimClock): simulation clock, set to the scheduler time on every tick
+        """
+
+        self.resolution = resolution
+        self.wheel_bits = wheel_bits
+        self.levels = levels
+        self.clock = clock or SimClock()
+
+        self.current_tick = int(round(self.clock.now() / resolution))
+
+        self.ticks = 0
+        self.jobs_run = 0
+        self.batches = 0
+        self.overruns = 0
+        self.late_ticks = 0
+
+        self.__mask = (1 << wheel_bits) - 1
+        self.__horizon = 1 << (wheel_bits * levels)
+        self.__wheels = [[set() for _ in range(1 << wheel_bits)] for _ in range(levels)]
+        self.__groups = {}
+        self.__lock = threading.RLock()
+
+
+    # Private methods
+    def __insert(self, job: ScheduledJob, earliest: int) -> None:
+        """
+        Put job into the slot of its due tick
+
+        Args:
+            job (ScheduledJob): job
+            earliest (int): earliest tick the job can still run in
+        """
+
+        tick = max(job.due_tick, earliest)
+        delta = min(tick - self.current_tick, self.__horizon - 1)
+        tick = self.current_tick + delta
+
+        level = 0
+        while delta >> (self.wheel_bits * (level + 1)):
+            level += 1
+
+        job.slot = self.__wheels[level][(tick >> (self.wheel_bits * level)) & self.__mask]
+        job.slot.add(job)
+
+
+    def __cascade(self) -> None:
+        """
+        Move the jobs of the higher level slots that start at the current
+        tick down the wheel
+        """
+
+        for level in range(1, self.levels):
+            if self.current_tick & ((1 << (self.wheel_bits * level)) - 1):
+                break
+
+            slot = self.__wheels[level][(self.current_tick >> (self.wheel_bits * level)) & self.__mask]
+            jobs = list(slot)
+            slot.clear()
+            for job in jobs:
+                # The level 0 slot of the current tick is expired right after the cascade
+                self.__insert(job, self.current_tick)
+
+
+    # Public methods
+    def add_group(self, group: str, callback) -> None:
+        """
+        Register job group
+
+        Args:
+            group (str): group name
+            callback (callable): callback(now, payloads) with the payloads of every due job of the group
+        """
+
+        self.__groups[group] = callback
+
+
+    def add_job(self, group: str, period: float, payload=None, phase: float = 0.0) -> ScheduledJob:
+        """
+        Schedule periodic job
+
+        Args:
+            group (str): registered group name
+            period (float): period in seconds
+            payload (any): value handed to the group callback
+            phase (float): delay of the first run in seconds
+
+        Returns:
+            ScheduledJob: job handle
+        """
+
+        if group not in self.__groups:
+            raise KeyError(f"Unknown job group: {group}")
+
+        with self.__lock:
+            job = ScheduledJob(group=group,
+                               payload=payload,
+                               period_ticks=max(1, int(round(period / self.resolution))),
+                               due_tick=self.current_tick + max(1, int(round(phase / self.resolution))))
+            self.__insert(job, self.current_tick + 1)
+
+        return job
+
+
+    def remove_job(self, job: ScheduledJob) -> None:
+        """
+        Cancel job
+
+        Args:
+            job (ScheduledJob): job handle
+        """
+
+        with self.__lock:
+            job.active = False
+            if job.slot is not None:
+                job.slot.discard(job)
+                job.slot = None
+
+
+    def set_period(self, job: ScheduledJob, period: float) -> None:
+        """
+        Change job period, takes effect after the next run
+
+        Args:
+            job (ScheduledJob): job handle
+            period (float): period in seconds
+        """
+
+        job.period_ticks = max(1, int(round(period / self.resolution)))
+
+
+    def advance(self) -> int:
+        """
+        Advance by one tick and run the due jobs
+
+        Returns:
+            int: number of jobs run
+        """
+
+        with self.__lock:
+            self.current_tick += 1
+            self.ticks += 1
+            self.__cascade()
+
+            slot = self.__wheels[0][self.current_tick & self.__mask]
+            if not slot:
+                return 0
+
+            jobs = list(slot)
+            slot.clear()
+
+        self.clock.time = self.current_tick * self.resolution
+
+        batches = {}
+        for job in jobs:
+            job.slot = None
+            batches.setdefault(job.group, []).append(job.payload)
+
+        now = self.clock.time
+        for group, payloads in batches.items():
+            self.__groups[group](now, payloads)
+
+        with self.__lock:
+            for job in jobs:
+                if not job.active or job.slot is not None:
+                    continue
+                job.due_tick += job.period_ticks
+                if job.due_tick <= self.current_tick:
+                    # Behind schedule, skip the missed periods
+                    missed = (self.current_tick - job.due_tick) // job.period_ticks + 1
+                    job.due_tick += missed * job.period_ticks
+                    self.overruns += missed
+                self.__insert(job, self.current_tick + 1)
+
+        self.jobs_run += len(jobs)
+        self.batches += len(batches)
+
+        return len(jobs)
+
+
+    def run(self, duration: float = None, stop_event: threading.Event = None) -> None:
+        """
+        Run the scheduler, in real time or as fast as possible with an
+        accelerated clock
+
+        Args:
+            duration (float): run time in seconds, forever if None
+            stop_event (threading.Event): stops the scheduler when set
+        """
+
+        stop_event = stop_event or threading.Event()
+        end_tick = None if duration is None else self.current_tick + int(round(duration / self.resolution))
+        start = monotonic()
+        start_tick = self.current_tick
+
+        while not stop_event.is_set() and (end_tick is None or self.current_tick < end_tick):
+            if not self.clock.accelerated:
+                delay = start + (self.current_tick + 1 - start_tick) * self.resolution - monotonic()
+                if delay > 0 and stop_event.wait(delay):
+                    break
+                if delay < -self.resolution:
+                    self.late_ticks += 1
+            self.advance()
+
+        self.clock.time = self.current_tick * self.resolution
+
+
+    def stats(self) -> dict:
+        """
+        Scheduler counters
+
+        Returns:
+            dict: counters
+        """
+
+        return {
+            "ticks":self.ticks,
+            "jobs_run":self.jobs_run,
+            "batches":self.batches,
+            "overruns":self.overruns,
+            "late_ticks":self.late_ticks
+        }
@@ -1,3 +1,4 @@
+import sys
 from enum import Enum
 
 
@@ -20,11 +21,15 @@ class Sensor:
     Sensor class
     """
 
+    __slots__ = ('sensor_label', 'sensor_type', 'sensor_number', 'sensor_bot_boundry', 'sensor_top_boundry',
+                 'sensor_readings')
+
     def __init__(self,
                  sensor_label: str,
                  sensor_number: int,
                  sensor_bot_boundry,
-                 sensor_top_boundry) -> None:
+                 sensor_top_boundry,
+                 sensor_type: str = None) -> None:
         """Sensor class constructor
 
         Args:
@@ -32,9 +37,11 @@ class Sensor:
             sensor_number (int): number of the specific sensor
             sensor_bot_boundry (_type_): sensor min value
             sensor_top_boundry (_type_): sensor max value
+            sensor_type (str): sensor model, sensors of one type and boundries calibrate alike, the label if None
         """
 
-        self.sensor_label = sensor_label
+        self.sensor_label = sys.intern(sensor_label)
+        self.sensor_type = sys.intern(sensor_type or sensor_label)
         self.sensor_number = sensor_number
         self.sensor_bot_boundry = sensor_bot_boundry
         self.sensor_top_boundry = sensor_top_boundry
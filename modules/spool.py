@@ -0,0 +1,390 @@
+import mmap
+import os
+import struct
+import threading
+
+
+# Record header: topic length, payload length, furnace id (-1 for none).
+# A zero header ends the segment data.
+SPOOL_RECORD_HEADER = struct.Struct('<IIq')
+SPOOL_NO_FURNACE = -1
+
+# Read offset checkpoint: segment index, byte offset
+SPOOL_OFFSET = struct.Struct('<QQ')
+
+SPOOL_SEGMENT_PREFIX = 'segment-'
+SPOOL_SEGMENT_SUFFIX = '.spool'
+SPOOL_OFFSET_FILE = 'read.offset'
+
+
+class SpoolSegment:
+    """
+    Preallocated, memory-mapped spool segment file
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        """SpoolSegment class constructor
+
+        Args:
+            path (str): segment file path, created and preallocated if missing
+            size (int): segment size in bytes for new segments
+        """
+
+        self.path = path
+
+        with open(path, 'ab') as segment_file:
+            if segment_file.tell() == 0:
+                segment_file.truncate(size)
+
+        self.__file = open(path, 'r+b')
+        self.buffer = mmap.mmap(self.__file.fileno(), 0)
+        self.size = len(self.buffer)
+
+
+    # Public methods
+    def read_record(self, offset: int) -> tuple:
+        """
+        Read record at offset
+
+        Args:
+            offset (int): byte offset
+
+        Returns:
+            tuple: (topic, payload, furnace id or None, next offset) or None at the end of the segment data
+        """
+
+        if offset + SPOOL_RECORD_HEADER.size > self.size:
+            return None
+
+        topic_len, payload_len, furnace_id = SPOOL_RECORD_HEADER.unpack_from(self.buffer, offset)
+        if topic_len == 0:
+            return None
+        if furnace_id == SPOOL_NO_FURNACE:
+            furnace_id = None
+
+        start = offset + SPOOL_RECORD_HEADER.size
+        topic = self.buffer[start:start + topic_len].decode('utf-8')
+        payload = self.buffer[start + topic_len:start + topic_len + payload_len]
+
+        return topic, payload, furnace_id, start + topic_len + payload_len
+
+
+    def write_record(self, offset: int, topic: bytes, payload: bytes, furnace_id: int = None) -> int:
+        """
+        Write record at offset
+
+        Args:
+            offset (int): byte offset
+            topic (bytes): encoded topic
+            payload (bytes): payload
+            furnace_id (int): furnace id of the message, None for none
+
+        Returns:
+            int: next offset or -1 if the record does not fit
+        """
+
+        end = offset + SPOOL_RECORD_HEADER.size + len(topic) + len(payload)
+        if end > self.size:
+            return -1
+
+        start = offset + SPOOL_RECORD_HEADER.size
+        self.buffer[start:start + len(topic)] = topic
+        self.buffer[start + len(topic):end] = payload
+        # Header last, so a record is never visible half written
+        SPOOL_RECORD_HEADER.pack_into(self.buffer, offset, len(topic), len(payload),
+                                      SPOOL_NO_FURNACE if furnace_id is None else furnace_id)
+
+        return end
+
+
+    def close(self) -> None:
+        """
+        Unmap and close segment file
+        """
+
+        self.buffer.flush()
+        self.buffer.close()
+        self.__file.close()
+
+
+class SegmentSpool:
+    """
+    Append-only, disk-backed message spool
+
+    Messages are appended to preallocated memory-mapped segment files and
+    read back in order. The read position is checkpointed into a small
+    memory-mapped offset file, so a restarted simulator continues replaying
+    where it stopped. Fully read segments are deleted.
+    """
+
+    def __init__(self,
+                 spool_dir: str,
+                 segment_size: int = 16 * 1024 * 1024) -> None:
+        """SegmentSpool class constructor
+
+        Args:
+            spool_dir (str): spool directory
+            segment_size (int): segment size in bytes
+        """
+
+        self.spool_dir = spool_dir
+        self.segment_size = segment_size
+
+        self.spooled = 0
+        self.replayed = 0
+
+        self.__lock = threading.Lock()
+
+        os.makedirs(spool_dir, exist_ok=True)
+
+        offset_path = os.path.join(spool_dir, SPOOL_OFFSET_FILE)
+        with open(offset_path, 'ab') as offset_file:
+            if offset_file.tell() == 0:
+                offset_file.write(SPOOL_OFFSET.pack(0, 0))
+        self.__offset_file = open(offset_path, 'r+b')
+        self.__offset_buffer = mmap.mmap(self.__offset_file.fileno(), SPOOL_OFFSET.size)
+
+        indices = self.__segment_indices()
+        self.__read_index, self.__read_offset = SPOOL_OFFSET.unpack_from(self.__offset_buffer, 0)
+        if indices and self.__read_index < indices[0]:
+            self.__read_index, self.__read_offset = indices[0], 0
+
+        self.__write_index = indices[-1] if indices else self.__read_index
+        self.__writer = SpoolSegment(self.__segment_path(self.__write_index), segment_size)
+        self.__write_offset = self.__scan_end(self.__writer)
+
+        self.__reader = self.__writer if self.__read_index == self.__write_index else \
+            SpoolSegment(self.__segment_path(self.__read_index), segment_size)
+
+
+    # Private methods
+    def __segment_path(self, index: int) -> str:
+        """
+        Segment file path
+
+        Args:
+            index (int): segment index
+
+        Returns:
+            str: file path
+        """
+
+        return os.path.join(self.spool_dir, f"{SPOOL_SEGMENT_PREFIX}{index:08d}{SPOOL_SEGMENT_SUFFIX}")
+
+
+    def __segment_indices(self) -> list:
+        """
+        Indices of the existing segment files
+
+        Returns:
+            list: sorted segment indices
+        """
+
+        return sorted(int(name[len(SPOOL_SEGMENT_PREFIX):-len(SPOOL_SEGMENT_SUFFIX)])
+                      for name in os.listdir(self.spool_dir)
+                      if name.startswith(SPOOL_SEGMENT_PREFIX) and name.endswith(SPOOL_SEGMENT_SUFFIX))
+
+
+    @staticmethod
+    def __scan_end(segment: SpoolSegment) -> int:
+        """
+        Find the end of the segment data
+
+        Args:
+            segment (SpoolSegment): segment
+
+        Returns:
+            int: offset after the last record
+        """
+
+        offset = 0
+        record = segment.read_record(offset)
+        while record is not None:
+            offset = record[3]
+            record = segment.read_record(offset)
+
+        return offset
+
+
+    def __checkpoint(self) -> None:
+        """
+        Store read position into the offset file
+        """
+
+        SPOOL_OFFSET.pack_into(self.__offset_buffer, 0, self.__read_index, self.__read_offset)
+
+
+    # Public methods
+    def append(self, topic: str, payload, furnace_id: int = None) -> None:
+        """
+        Append message to the spool
+
+        Args:
+            topic (str): MQTT topic
+            payload (str | bytes): message payload
+            furnace_id (int): furnace id of the message, None for none
+        """
+
+        topic_bytes = topic.encode('utf-8')
+        payload_bytes = payload.encode('utf-8') if isinstance(payload, str) else bytes(payload)
+
+        with self.__lock:
+            next_offset = self.__writer.write_record(self.__write_offset, topic_bytes, payload_bytes, furnace_id)
+            if next_offset < 0:
+                if self.__writer is not self.__reader:
+                    self.__writer.close()
+                self.__write_index += 1
+                record_size = SPOOL_RECORD_HEADER.size * 2 + len(topic_bytes) + len(payload_bytes)
+                self.__writer = SpoolSegment(self.__segment_path(self.__write_index),
+                                             max(self.segment_size, record_size))
+                next_offset = self.__writer.write_record(0, topic_bytes, payload_bytes, furnace_id)
+
+            self.__write_offset = next_offset
+            self.spooled += 1
+
+
+    def peek(self) -> tuple:
+        """
+        Oldest spooled message, the read position is only advanced by
+        commit() once the message was handed on
+
+        Returns:
+            tuple: (topic, payload bytes, furnace id, next read offset) or None if the spool is empty
+        """
+
+        with self.__lock:
+            record = self.__reader.read_record(self.__read_offset)
+            while record is None:
+                if self.__read_index >= self.__write_index:
+                    return None
+
+                # Segment fully read and the writer moved on
+                self.__reader.close()
+                os.remove(self.__segment_path(self.__read_index))
+                self.__read_index += 1
+                self.__read_offset = 0
+                self.__reader = self.__writer if self.__read_index == self.__write_index else \
+                    SpoolSegment(self.__segment_path(self.__read_index), self.segment_size)
+                record = self.__reader.read_record(self.__read_offset)
+
+            return record
+
+
+    def commit(self, next_offset: int) -> None:
+        """
+        Consume the peeked message and checkpoint the read position
+
+        Args:
+            next_offset (int): next read offset returned by peek()
+        """
+
+        with self.__lock:
+            self.__read_offset = next_offset
+            self.__checkpoint()
+            self.replayed += 1
+
+
+    def is_empty(self) -> bool:
+        """
+        Check for unread messages
+
+        Returns:
+            bool: True if every spooled message was read
+        """
+
+        with self.__lock:
+            return self.__read_index == self.__write_index and self.__read_offset >= self.__write_offset
+
+
+    def close(self) -> None:
+        """
+        Flush and close segment and offset files
+        """
+
+        with self.__lock:
+            if self.__reader is not self.__writer:
+                self.__reader.close()
+            self.__writer.close()
+            self.__offset_buffer.flush()
+            self.__offset_buffer.close()
+            self.__offset_file.close()
+
+
+class SpoolReplayer:
+    """
+    Replays spooled messages into the outbound queue after reconnect
+
+    Runs in its own thread at a fixed message rate and only fills the
+    outbound queue up to half of its depth, so live messages keep flowing
+    and are never dropped in favour of replayed ones. A message is only
+    consumed from the spool once the outbound queue accepted it.
+    """
+
+    def __init__(self,
+                 spool: SegmentSpool,
+                 outbound_queue,
+                 is_connected,
+                 rate: float) -> None:
+        """SpoolReplayer class constructor
+
+        Args:
+            spool (SegmentSpool): spool to drain
+            outbound_queue (modules.outbound_queue.OutboundQueue): live outbound queue
+            is_connected (callable): returns True while the broker connection is up
+            rate (float): replayed messages per second
+        """
+
+        self.spool = spool
+        self.outbound_queue = outbound_queue
+        self.is_connected = is_connected
+        self.rate = rate
+
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+
+    # Private methods
+    def __run(self) -> None:
+        """
+        Replay thread loop
+        """
+
+        interval = 0.05
+        budget = 0.0
+
+        while not self.__stop_event.wait(interval):
+            if not self.is_connected() or self.spool.is_empty():
+                budget = 0.0
+                continue
+
+            budget = min(budget + self.rate * interval, self.rate)
+            while budget >= 1.0 and self.outbound_queue.depth() < self.outbound_queue.max_depth // 2:
+                message = self.spool.peek()
+                if message is None:
+                    break
+                topic, payload, furnace_id, next_offset = message
+                if not self.outbound_queue.put(topic=topic, payload=payload, timeout=0, furnace_id=furnace_id):
+                    break
+                self.spool.commit(next_offset)
+                budget -= 1.0
+
+
+    # Public methods
+    def start(self) -> None:
+        """
+        Start replay thread
+        """
+
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name='mqtt-spool-replay', daemon=True)
+        self.__thread.start()
+
+
+    def stop(self) -> None:
+        """
+        Stop replay thread
+        """
+
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
@@ -0,0 +1,302 @@
+import math
+import struct
+import threading
+from time import monotonic, time_ns
+
+from modules.log_manager import logger
+try:
+    import numpy as np
+except ImportError:
+    logger.error("Module numpy not found. Please use pip install -r requirements.txt")
+    raise
+
+
+# Frame header: magic, version, channels, reserved, sample rate (Hz),
+# samples per channel, frame sequence number, first sample time (ns since epoch).
+# The header is followed by channels * samples little-endian float32 values,
+# channel after channel.
+WAVEFORM_FRAME_HEADER = struct.Struct('<4sBBHIIQq')
+WAVEFORM_FRAME_MAGIC = b'FVWF'
+WAVEFORM_FRAME_VERSION = 1
+
+# Frame channels
+WAVEFORM_CHANNELS = ('supply_voltage', 'heater_voltage', 'heater_current')
+
+
+class VoltageWaveform:
+    """
+    Heater supply voltage and current waveform generator
+
+    Simulates the mains supply (fundamental, harmonics and low frequency
+    ripple) and the heater side of a phase-angle controlled SCR, which
+    starts conducting at the firing angle of every half-cycle. Samples are
+    written into one preallocated frame buffer, numpy only works on
+    preallocated scratch arrays, so a frame costs no per-sample objects.
+    """
+
+    def __init__(self,
+                 sample_rate: int,
+                 frame_samples: int,
+                 mains_frequency: float,
+                 mains_voltage_rms: float,
+                 harmonics: list,
+                 ripple_depth: float,
+                 ripple_frequency: float,
+                 noise_sigma: float,
+                 heater_resistance: float,
+                 firing_angle: float,
+                 furnace_id: int = 0,
+                 seed: int = None,
+                 stream: int = 0) -> None:
+        """VoltageWaveform class constructor
+
+        Args:
+            sample_rate (int): samples per second
+            frame_samples (int): samples per channel and frame
+            mains_frequency (float): mains frequency in Hz
+            mains_voltage_rms (float): mains RMS voltage
+            harmonics (list): (harmonic order, amplitude relative to the fundamental) tuples
+            ripple_depth (float): relative amplitude modulation depth
+            ripple_frequency (float): amplitude modulation frequency in Hz
+            noise_sigma (float): measurement noise standard deviation in volts
+            heater_resistance (float): heater resistance in ohms
+            firing_angle (float): SCR firing angle in degrees, 0 is full conduction
+            furnace_id (int): furnace id selecting the noise stream
+            seed (int): root noise seed, random entropy if None
+            stream (int): noise stream number
+        """
+
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.mains_frequency = mains_frequency
+        self.mains_voltage_peak = mains_voltage_rms * math.sqrt(2.0)
+        self.harmonics = [(int(order), float(amplitude)) for order, amplitude in harmonics]
+        self.ripple_depth = ripple_depth
+        self.ripple_frequency = ripple_frequency
+        self.noise_sigma = noise_sigma
+        self.heater_resistance = heater_resistance
+        self.firing_angle = 0.0
+        self.set_firing_angle(firing_angle)
+
+        self.sequence = 0
+        self.sample_index = 0
+
+        seed_sequence = np.random.SeedSequence(entropy=np.random.SeedSequence(seed).entropy,
+                                               spawn_key=(stream, furnace_id))
+        self.__rng = np.random.Generator(np.random.PCG64(seed_sequence))
+
+        self.frame = bytearray(WAVEFORM_FRAME_HEADER.size + len(WAVEFORM_CHANNELS) * frame_samples * 4)
+        self.samples = np.frombuffer(self.frame, dtype='<f4',
+                                     offset=WAVEFORM_FRAME_HEADER.size).reshape(len(WAVEFORM_CHANNELS),
+                                                                                frame_samples)
+
+        self.__ticks = np.arange(frame_samples, dtype=np.float64)
+        self.__phase = np.empty(frame_samples, dtype=np.float64)
+        self.__voltage = np.empty(frame_samples, dtype=np.float64)
+        self.__work = np.empty(frame_samples, dtype=np.float64)
+        self.__conducting = np.empty(frame_samples, dtype=bool)
+
+
+    # Public methods
+    def set_firing_angle(self, degrees: float) -> None:
+        """
+        Set SCR firing angle
+
+        Args:
+            degrees (float): firing angle, 0 (full conduction) to 180 (off)
+        """
+
+        self.firing_angle = math.radians(min(max(degrees, 0.0), 180.0))
+
+
+    def skip(self, frames: int) -> None:
+        """
+        Skip frames, the sequence number gap marks the missing frames
+
+        Args:
+            frames (int): number of frames
+        """
+
+        self.sequence += frames
+        self.sample_index += frames * self.frame_samples
+
+
+    def next_frame(self, timestamp_ns: int) -> bytearray:
+        """
+        Generate the next frame into the frame buffer
+
+        The buffer is overwritten by the next call, copy it if it outlives
+        the call.
+
+        Args:
+            timestamp_ns (int): time of the first sample in nanoseconds since epoch
+
+        Returns:
+            bytearray: frame buffer
+        """
+
+        omega = 2.0 * math.pi * self.mains_frequency / self.sample_rate
+        phase0 = math.fmod(omega * self.sample_index, 2.0 * math.pi)
+
+        # Fundamental phase, drives the SCR half-cycle timing
+        np.multiply(self.__ticks, omega, out=self.__phase)
+        np.add(self.__phase, phase0, out=self.__phase)
+
+        np.sin(self.__phase, out=self.__voltage)
+        for order, amplitude in self.harmonics:
+            np.multiply(self.__phase, order, out=self.__work)
+            np.sin(self.__work, out=self.__work)
+            np.multiply(self.__work, amplitude, out=self.__work)
+            np.add(self.__voltage, self.__work, out=self.__voltage)
+
+        if self.ripple_depth:
+            ripple_omega = 2.0 * math.pi * self.ripple_frequency / self.sample_rate
+            np.multiply(self.__ticks, ripple_omega, out=self.__work)
+            np.add(self.__work, math.fmod(ripple_omega * self.sample_index, 2.0 * math.pi), out=self.__work)
+            np.sin(self.__work, out=self.__work)
+            np.multiply(self.__work, self.ripple_depth, out=self.__work)
+            np.add(self.__work, 1.0, out=self.__work)
+            np.multiply(self.__voltage, self.__work, out=self.__voltage)
+
+        np.multiply(self.__voltage, self.mains_voltage_peak, out=self.__voltage)
+
+        # SCR conducts from the firing angle to the end of every half-cycle
+        np.remainder(self.__phase, math.pi, out=self.__work)
+        np.greater_equal(self.__work, self.firing_angle, out=self.__conducting)
+
+        supply, heater_voltage, heater_current = self.samples
+
+        self.__rng.standard_normal(out=self.__work)
+        np.multiply(self.__work, self.noise_sigma, out=self.__work)
+        np.add(self.__voltage, self.__work, out=supply, casting='same_kind')
+
+        np.multiply(self.__voltage, self.__conducting, out=self.__voltage)
+        np.divide(self.__voltage, self.heater_resistance, out=self.__phase)
+        np.copyto(heater_current, self.__phase, casting='same_kind')
+
+        self.__rng.standard_normal(out=self.__work)
+        np.multiply(self.__work, self.noise_sigma, out=self.__work)
+        np.add(self.__voltage, self.__work, out=heater_voltage, casting='same_kind')
+
+        WAVEFORM_FRAME_HEADER.pack_into(self.frame, 0,
+                                        WAVEFORM_FRAME_MAGIC,
+                                        WAVEFORM_FRAME_VERSION,
+                                        len(WAVEFORM_CHANNELS),
+                                        0,
+                                        self.sample_rate,
+                                        self.frame_samples,
+                                        self.sequence,
+                                        timestamp_ns)
+
+        self.sequence += 1
+        self.sample_index += self.frame_samples
+
+        return self.frame
+
+
+def unpack_waveform_frame(frame: bytes) -> tuple:
+    """
+    Decode a waveform frame
+
+    Args:
+        frame (bytes): frame written by VoltageWaveform.next_frame()
+
+    Returns:
+        tuple: (header dict, (channels, samples) float32 array)
+    """
+
+    magic, version, n_channels, _, sample_rate, n_samples, sequence, timestamp_ns = \
+        WAVEFORM_FRAME_HEADER.unpack_from(frame, 0)
+    if magic != WAVEFORM_FRAME_MAGIC or version != WAVEFORM_FRAME_VERSION:
+        raise ValueError("Not a version 1 waveform frame")
+
+    header = {
+        "sample_rate":sample_rate,
+        "samples":n_samples,
+        "sequence":sequence,
+        "timestamp_ns":timestamp_ns
+    }
+    samples = np.frombuffer(frame, dtype='<f4', count=n_channels * n_samples,
+                            offset=WAVEFORM_FRAME_HEADER.size).reshape(n_channels, n_samples)
+
+    return header, samples
+
+
+class WaveformStreamer:
+    """
+    Real-time waveform frame publisher thread
+
+    Publishes one frame every frame_samples / sample_rate seconds. Frame
+    timestamps are derived from the sample counter, so consecutive frames
+    are gapless; if the thread falls more than max_lag seconds behind, it
+    skips ahead and counts the skipped frames.
+    """
+
+    def __init__(self,
+                 waveform: VoltageWaveform,
+                 publish_func,
+                 max_lag: float = 1.0) -> None:
+        """WaveformStreamer class constructor
+
+        Args:
+            waveform (VoltageWaveform): frame generator
+            publish_func (callable): publish_func(payload bytes)
+            max_lag (float): maximum lag in seconds before frames are skipped
+        """
+
+        self.waveform = waveform
+        self.publish_func = publish_func
+        self.max_lag = max_lag
+
+        self.published = 0
+        self.skipped = 0
+
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+
+    # Private methods
+    def __run(self) -> None:
+        """
+        Streamer thread loop
+        """
+
+        frame_period = self.waveform.frame_samples / self.waveform.sample_rate
+        start = monotonic()
+        start_ns = time_ns()
+        start_index = self.waveform.sample_index
+        frames = 0
+
+        while not self.__stop_event.wait(max(0.0, start + (frames + 1) * frame_period - monotonic())):
+            lag_frames = int((monotonic() - start - (frames + 1) * frame_period) / frame_period)
+            if lag_frames * frame_period > self.max_lag:
+                self.waveform.skip(lag_frames)
+                frames += lag_frames
+                self.skipped += lag_frames
+
+            elapsed_ns = (self.waveform.sample_index - start_index) * 1_000_000_000 // self.waveform.sample_rate
+            frame = self.waveform.next_frame(timestamp_ns=start_ns + elapsed_ns)
+            self.publish_func(bytes(frame))
+            self.published += 1
+            frames += 1
+
+
+    # Public methods
+    def start(self) -> None:
+        """
+        Start streamer thread
+        """
+
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(target=self.__run, name='waveform-stream', daemon=True)
+        self.__thread.start()
+
+
+    def stop(self) -> None:
+        """
+        Stop streamer thread
+        """
+
+        self.__stop_event.set()
+        if self.__thread is not None:
+            self.__thread.join()
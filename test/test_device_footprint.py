@@ -0,0 +1,38 @@
+import furnace_setup_simulation as simulation
+
+
+FOOTPRINT_SEED = 1
+
+
+def test_bytes_per_channel_within_budget():
+    """
+    The per-channel memory of the device model stays within
+    DEVICE_BYTES_PER_CHANNEL_BUDGET for small and large fleets
+    """
+
+    for n_furnaces in (1, 100, 5000):
+        bytes_per_channel = simulation.device_bytes_per_channel(seed=FOOTPRINT_SEED, n_furnaces=n_furnaces)
+        assert 0 < bytes_per_channel <= simulation.DEVICE_BYTES_PER_CHANNEL_BUDGET, n_furnaces
+
+
+def test_step_retains_no_channel_memory():
+    """
+    Stepping and encoding a fleet allocates no memory that outlives the tick
+    """
+
+    footprint = simulation.measure_device_footprint(seed=FOOTPRINT_SEED, n_furnaces=2000, ticks=20)
+
+    assert footprint["retained"] < footprint["channels"]
+
+
+def test_footprint_restores_simulator_fleet():
+    """
+    Measuring a footprint leaves the simulator fleet and payload encoder untouched
+    """
+
+    fleet, payload_encoder = simulation.simulator_fleet, simulation.thermal_payload_encoder
+
+    simulation.measure_device_footprint(seed=FOOTPRINT_SEED, n_furnaces=10)
+
+    assert simulation.simulator_fleet is fleet
+    assert simulation.thermal_payload_encoder is payload_encoder